@@ -1,4 +1,5 @@
 from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 import os
@@ -6,8 +7,16 @@ from sqlalchemy import text
 import time
 import logging
 
-from app.database import engine, Base, get_db
+from app.database import engine, Base, get_db, SessionLocal
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.query_stats import QueryStatsMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
 from app.routers import auth, users, exercises, plans, sessions, progress, admin
+from app.services.activity_tracker import activity_tracker
+from app.services.exercise_catalog import exercise_catalog
+from app.services.metrics import registry
+from app.services.password_hashing import password_hash_pool
+from app.services.slow_queries import slow_query_log
 
 # Create the database tables with retry logic
 max_retries = 5
@@ -39,6 +48,13 @@ allowed_origins_list = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").spl
 # Print loaded origins for debugging (optional, can be removed later)
 print(f"Configuring CORS with allowed origins: {allowed_origins_list}")
 
+# Count the SQL each request runs and log likely N+1 loops (innermost, around the routes only)
+app.add_middleware(QueryStatsMiddleware)
+
+# Rate limit clients and shed load before requests reach the routes.
+# Added before CORS so that CORS wraps it and 429/503 responses stay readable by the browser.
+app.add_middleware(RateLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -46,8 +62,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["Retry-After", "X-DB-Queries", "X-DB-Time"],  # Readable by the frontend
 )
 
+# Record request metrics outermost, so rate limited and shed requests are counted too
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
@@ -57,6 +77,48 @@ app.include_router(sessions.router, prefix="/api/sessions", tags=["Workout Sessi
 app.include_router(progress.router, prefix="/api/progress", tags=["Progress"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
+@app.on_event("startup")
+def load_exercise_catalog():
+    """
+    Warm the exercise catalog cache so the first exercise list request doesn't pay for it.
+    """
+    db = SessionLocal()
+    try:
+        exercise_catalog.load(db)
+    except Exception as e:
+        # The catalog loads lazily on first use if the database isn't ready yet
+        logging.warning(f"Failed to load exercise catalog at startup: {str(e)}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_activity_tracker():
+    """
+    Start writing buffered last-seen and last-login timestamps in the background.
+    """
+    activity_tracker.start(SessionLocal)
+
+@app.on_event("shutdown")
+def stop_activity_tracker():
+    """
+    Write the activity still buffered before the worker exits.
+    """
+    activity_tracker.stop()
+
+@app.on_event("shutdown")
+def stop_password_hash_pool():
+    """
+    Let in-flight password hashes finish before the worker exits.
+    """
+    password_hash_pool.shutdown()
+
+@app.on_event("shutdown")
+def stop_slow_query_log():
+    """
+    Let plans still being captured for slow queries finish.
+    """
+    slow_query_log.shutdown()
+
 @app.get("/", tags=["Root"])
 async def root():
     """
@@ -77,4 +139,11 @@ async def health_check(db: Session = Depends(get_db)):
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"Database connection failed: {str(e)}",
-        ) 
\ No newline at end of file
+        ) 
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """
+    Request, database pool and cache metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
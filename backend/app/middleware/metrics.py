@@ -0,0 +1,116 @@
+from time import perf_counter
+
+import app.database as database
+from app.services.exercise_catalog import exercise_catalog
+from app.services.metrics import (
+    CallbackCounter,
+    CallbackGauge,
+    Counter,
+    Gauge,
+    Histogram,
+    SIZE_BUCKETS,
+    registry,
+)
+from app.services.user_cache import user_cache
+
+# Route label for requests that matched no route, so unknown paths cannot create new series
+UNMATCHED_ROUTE = "unmatched"
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code",
+    ("method", "route", "status"),
+))
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last of its response",
+    ("method", "route"),
+))
+RESPONSE_SIZE = registry.register(Histogram(
+    "http_response_size_bytes", "Response body size",
+    ("method", "route"), buckets=SIZE_BUCKETS,
+))
+IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Requests being handled right now",
+)).labels()
+
+def _pool_connections():
+    pool = database.engine.pool
+    # Only queue pools report their state (SQLite tests use a static pool)
+    if not hasattr(pool, "checkedout"):
+        return
+    yield ("size",), pool.size()
+    yield ("checked_out",), pool.checkedout()
+    yield ("checked_in",), pool.checkedin()
+    yield ("overflow",), max(0, pool.overflow())
+
+_CACHES = {"users": user_cache, "exercise_catalog": exercise_catalog}
+
+def _cache_counts(attribute):
+    def collect():
+        for name, cache in _CACHES.items():
+            yield (name,), getattr(cache, attribute)
+    return collect
+
+def _cache_hit_ratio():
+    for name, cache in _CACHES.items():
+        lookups = cache.hits + cache.misses
+        yield (name,), cache.hits / lookups if lookups else 0.0
+
+registry.register(CallbackGauge(
+    "db_pool_connections", "Database connection pool state", ("state",), _pool_connections,
+))
+registry.register(CallbackCounter(
+    "cache_hits_total", "Lookups served from an in-process cache since startup", ("cache",), _cache_counts("hits"),
+))
+registry.register(CallbackCounter(
+    "cache_misses_total", "Lookups that had to go to the database since startup", ("cache",), _cache_counts("misses"),
+))
+registry.register(CallbackGauge(
+    "cache_hit_ratio", "Share of lookups served from an in-process cache since startup", ("cache",), _cache_hit_ratio,
+))
+
+def route_template(scope) -> str:
+    """Path template of the route that handled the request, prefix included."""
+    # FastAPI versions that keep included routers nested record the full path here;
+    # older ones copy routes into the app with the prefix already in route.path
+    fastapi_scope = scope.get("fastapi")
+    context = fastapi_scope.get("effective_route_context") if isinstance(fastapi_scope, dict) else None
+    if getattr(context, "path", None):
+        return context.path
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request count, latency, response size and
+    requests in flight, labeled by the matched route template (e.g.
+    /api/sessions/{session_id}) rather than the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        response = [500, 0]  # status code, body bytes
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                response[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                response[1] += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.value += 1
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            IN_FLIGHT.value -= 1
+            template = route_template(scope)
+            method = scope["method"]
+            REQUESTS.labels(method, template, response[0]).value += 1
+            REQUEST_DURATION.labels(method, template).observe(perf_counter() - started)
+            RESPONSE_SIZE.labels(method, template).observe(response[1])
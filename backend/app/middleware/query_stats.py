@@ -0,0 +1,98 @@
+import logging
+import os
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.middleware.metrics import route_template
+
+# Add X-DB-Queries and X-DB-Time headers to every response (for debugging, not production)
+DB_QUERY_DEBUG = os.getenv("DB_QUERY_DEBUG", "").lower() in ("1", "true", "yes")
+
+# Times the same statement may run in one request before it is logged as a possible N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+class QueryStats:
+    """SQL statements run while handling one request, and how long they took."""
+    __slots__ = ("scope", "count", "seconds", "statements")
+
+    def __init__(self, scope=None):
+        # The request's ASGI scope, so statements can be traced back to their route
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+        # {statement text: times run}; bound parameters are not part of the text,
+        # so a query run in a loop shows up as one statement with a high count
+        self.statements: Dict[str, int] = {}
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> Dict[str, int]:
+        """Statements run at least threshold times: likely N+1 loops."""
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+# Stats of the request being handled; copied into the threadpool that runs sync routes
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Called with (scope, stats) after every request; the max_queries test fixture hooks in here
+request_observers: List[Callable] = []
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        context._query_stats_started = perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = getattr(context, "_query_stats_started", None)
+    if stats is None or started is None:
+        return
+    stats.count += 1
+    stats.seconds += perf_counter() - started
+    stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware counting the SQL statements each request runs and the
+    time spent in them. Statements repeated N_PLUS_ONE_THRESHOLD times or more
+    are logged as N+1 suspects with the route that ran them; with
+    DB_QUERY_DEBUG set the totals are also returned in response headers.
+    """
+
+    def __init__(self, app, debug_headers: bool = DB_QUERY_DEBUG):
+        self.app = app
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = _current_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-queries", str(stats.count).encode()),
+                    (b"x-db-time", f"{stats.seconds * 1000:.2f}ms".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers if self.debug_headers else send)
+        finally:
+            _current_stats.reset(token)
+            for statement, count in stats.repeated().items():
+                logging.warning(
+                    f"Possible N+1 query in {scope['method']} {route_template(scope)}: "
+                    f"ran {count} times: {' '.join(statement.split())[:300]}"
+                )
+            for observer in request_observers:
+                observer(scope, stats)
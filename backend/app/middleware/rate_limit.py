@@ -0,0 +1,326 @@
+import asyncio
+import importlib.util
+import inspect
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from jose import JWTError, jwt
+from starlette.responses import JSONResponse
+
+from app.services.auth import SECRET_KEY, ALGORITHM
+
+class RateLimit(NamedTuple):
+    """Token bucket: refills at per_minute / 60 tokens a second, holds at most burst."""
+    per_minute: float
+    burst: int
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60
+
+def _limit_from_env(group: str, per_minute: int, burst: int) -> RateLimit:
+    prefix = f"RATE_LIMIT_{group.upper()}"
+    return RateLimit(
+        float(os.getenv(f"{prefix}_PER_MINUTE", str(per_minute))),
+        int(os.getenv(f"{prefix}_BURST", str(burst))),
+    )
+
+# Path prefix of each route group, matched in order; paths matching none use "default"
+ROUTE_GROUPS = (
+    ("auth", "/api/auth"),
+    ("sessions", "/api/sessions"),
+    ("progress", "/api/progress"),
+)
+
+# Requests a client may make per route group, e.g. RATE_LIMIT_AUTH_PER_MINUTE=20 and
+# RATE_LIMIT_AUTH_BURST=10. A per_minute of 0 turns limiting off for that group.
+# Signed-in clients are limited per user, anonymous ones per IP address; auth is
+# always per IP so a stolen token cannot lock its owner out of signing in again.
+ROUTE_GROUP_LIMITS = {
+    "auth": _limit_from_env("auth", 20, 10),
+    "sessions": _limit_from_env("sessions", 120, 60),
+    "progress": _limit_from_env("progress", 60, 30),
+    "default": _limit_from_env("default", 300, 100),
+}
+
+# Paths that are never limited or shed, so health checks and scrapes keep working under load
+EXEMPT_PATHS = {"/", "/api/health", "/metrics"}
+
+# Requests handled at once; further ones wait for a slot
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "64"))
+
+# Requests allowed to wait for a slot before new ones are shed with a 503
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "128"))
+
+# Retry-After sent with the 503 when the queue is full
+LOAD_SHED_RETRY_AFTER_SECONDS = 1
+
+# Buckets kept by the in-memory store; the least recently used are forgotten first
+MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+# Shared bucket store for multiple workers, e.g. redis://redis:6379/0 (needs the redis package)
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+
+# Longest a request waits on Redis before it is let through without being limited
+RATE_LIMIT_REDIS_TIMEOUT_SECONDS = float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT_SECONDS", "0.25"))
+
+# Errors from an unreachable or slow store; requests are allowed rather than failed when they happen
+STORE_ERRORS: Tuple[type, ...] = (ConnectionError, TimeoutError, asyncio.TimeoutError, OSError)
+if importlib.util.find_spec("redis") is not None:
+    import redis
+    STORE_ERRORS += (redis.RedisError,)
+
+class MemoryBucketStore:
+    """Token buckets in this process, bounded to max_buckets keys."""
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        # {key: [tokens, updated_at]}
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def take(self, key: str, limit: RateLimit, now: float) -> float:
+        """Take a token from the bucket; returns 0 if one was available, else seconds until one is."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(limit.burst), now]
+                while len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            tokens = min(limit.burst, bucket[0] + max(0.0, now - bucket[1]) * limit.per_second)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0.0
+            bucket[0] = tokens
+            return (1 - tokens) / limit.per_second
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+# Same algorithm as MemoryBucketStore.take, run atomically on the Redis server
+_TAKE_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+class RedisBucketStore:
+    """
+    Token buckets shared by every worker, kept in Redis (or anything speaking
+    its protocol) through a client with redis-py's eval(). Keys expire once
+    their bucket would be full again, so idle clients cost nothing. If Redis
+    is down or slow the request is allowed: limiting fails open rather than
+    taking the API down with it.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def take(self, key: str, limit: RateLimit, now: float) -> float:
+        try:
+            result = self.client.eval(
+                _TAKE_TOKEN_SCRIPT, 1, self.prefix + key, limit.per_second, limit.burst, now
+            )
+            if inspect.isawaitable(result):
+                result = await result
+        except STORE_ERRORS:
+            logging.exception("Rate limit store unavailable; allowing the request")
+            return 0.0
+        if isinstance(result, bytes):
+            result = result.decode()
+        return float(result)
+
+    def clear(self):
+        pass
+
+def build_bucket_store(redis_url: Optional[str] = RATE_LIMIT_REDIS_URL):
+    """Redis store when a URL is configured and the client is installed, in-memory otherwise."""
+    if not redis_url:
+        return MemoryBucketStore()
+    if importlib.util.find_spec("redis") is None:
+        logging.warning("RATE_LIMIT_REDIS_URL is set but the redis package is not installed; limiting per process")
+        return MemoryBucketStore()
+    import redis.asyncio
+    return RedisBucketStore(redis.asyncio.from_url(
+        redis_url,
+        socket_timeout=RATE_LIMIT_REDIS_TIMEOUT_SECONDS,
+        socket_connect_timeout=RATE_LIMIT_REDIS_TIMEOUT_SECONDS,
+    ))
+
+class ConcurrencyLimiter:
+    """
+    Caps requests in progress at max_concurrent. Up to max_queue more wait for
+    a slot; anything beyond that is rejected right away instead of piling up
+    behind a saturated database pool.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_REQUESTS, max_queue: int = MAX_QUEUED_REQUESTS):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.shed = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore belongs to one event loop; tests start a new loop per client
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+            self.in_flight = self.queued = 0
+        return self._semaphore
+
+    async def acquire(self) -> bool:
+        """Wait for a slot; returns False without waiting if the queue is already full."""
+        semaphore = self._get_semaphore()
+        if semaphore.locked():
+            if self.queued >= self.max_queue:
+                self.shed += 1
+                return False
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+            try:
+                await semaphore.acquire()
+            finally:
+                self.queued -= 1
+        else:
+            await semaphore.acquire()
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+def route_group(path: str) -> str:
+    for group, prefix in ROUTE_GROUPS:
+        if path == prefix or path.startswith(prefix + "/"):
+            return group
+    return "default"
+
+def _bearer_user_id(scope) -> Optional[int]:
+    """User id from a valid bearer token in the request headers, if any."""
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("id")
+            except JWTError:
+                return None
+    return None
+
+def _client_ip(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+class LoadLimiter:
+    """Per-client rate limits by route group plus the global concurrency cap."""
+
+    def __init__(self, store=None, limits: Dict[str, RateLimit] = None, concurrency: ConcurrencyLimiter = None):
+        self.store = store if store is not None else build_bucket_store()
+        self.limits = limits if limits is not None else ROUTE_GROUP_LIMITS
+        self.concurrency = concurrency if concurrency is not None else ConcurrencyLimiter()
+        self.rate_limited: Dict[str, int] = {}
+
+    def client_key(self, scope, group: str) -> str:
+        user_id = None if group == "auth" else _bearer_user_id(scope)
+        if user_id is not None:
+            return f"{group}:user:{user_id}"
+        return f"{group}:ip:{_client_ip(scope)}"
+
+    async def check_rate(self, scope, group: str) -> float:
+        """Seconds the client has to wait before this request is allowed (0 if allowed now)."""
+        limit = self.limits.get(group) or self.limits["default"]
+        if limit.per_minute <= 0:
+            return 0.0
+        wait = await self.store.take(self.client_key(scope, group), limit, time.time())
+        if wait > 0:
+            self.rate_limited[group] = self.rate_limited.get(group, 0) + 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        concurrency = self.concurrency
+        return {
+            "store": type(self.store).__name__,
+            "limits": {group: limit._asdict() for group, limit in self.limits.items()},
+            "rate_limited": dict(self.rate_limited),
+            "max_concurrent": concurrency.max_concurrent,
+            "max_queue": concurrency.max_queue,
+            "in_flight": concurrency.in_flight,
+            "queued": concurrency.queued,
+            "peak_queued": concurrency.peak_queued,
+            "shed": concurrency.shed,
+        }
+
+    def clear(self):
+        self.store.clear()
+        self.rate_limited.clear()
+
+load_limiter = LoadLimiter()
+
+def _retry_response(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware answering 429 to clients over their route group's rate
+    limit and 503 to everyone once MAX_QUEUED_REQUESTS are already waiting,
+    both with a Retry-After header, before the request reaches a route.
+    """
+
+    def __init__(self, app, limiter: LoadLimiter = None):
+        self.app = app
+        self.limiter = limiter or load_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        wait = await self.limiter.check_rate(scope, route_group(scope["path"]))
+        if wait > 0:
+            response = _retry_response(429, "Too many requests, please slow down", wait)
+            await response(scope, receive, send)
+            return
+
+        concurrency = self.limiter.concurrency
+        if not await concurrency.acquire():
+            response = _retry_response(503, "Server is busy, please retry shortly", LOAD_SHED_RETRY_AFTER_SECONDS)
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            concurrency.release()
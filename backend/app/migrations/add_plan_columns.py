@@ -0,0 +1,52 @@
+"""
+Add columns introduced on workout_plans to databases created before them.
+
+create_all never alters existing tables. Safe to rerun; entrypoint.sh runs it
+before seeding. Indexes on the added columns are created here too, so the
+queries using them work before create_indexes runs.
+
+Usage: python -m app.migrations.add_plan_columns
+"""
+from sqlalchemy import inspect, text
+
+from app.database import engine, Base
+import app.models.models  # noqa: F401  (registers the tables on Base.metadata)
+
+# Column name -> definition used in ALTER TABLE workout_plans ADD COLUMN
+PLAN_COLUMNS = {
+    # Existing plans start at version 1, as new ones do
+    "version": "INTEGER NOT NULL DEFAULT 1",
+    # Copy-on-write clones point at the plan they were cloned from
+    "template_plan_id": "INTEGER REFERENCES workout_plans(id)",
+}
+
+# Indexes on the columns above, by the names the model declares
+PLAN_INDEXES = {
+    "ix_workout_plans_template_plan_id": "template_plan_id",
+}
+
+def add_plan_columns(bind) -> list:
+    """Add every missing workout_plans column and index; returns the names of those added."""
+    inspector = inspect(bind)
+    existing = {column["name"] for column in inspector.get_columns("workout_plans")}
+    added = []
+    for name, definition in PLAN_COLUMNS.items():
+        if name not in existing:
+            bind.execute(text(f"ALTER TABLE workout_plans ADD COLUMN {name} {definition}"))
+            added.append(name)
+
+    existing_indexes = {index["name"] for index in inspector.get_indexes("workout_plans")}
+    for index_name, column in PLAN_INDEXES.items():
+        if index_name not in existing_indexes:
+            bind.execute(text(f"CREATE INDEX {index_name} ON workout_plans ({column})"))
+            added.append(index_name)
+    return added
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        added = add_plan_columns(connection)
+    print(f"Added to workout_plans: {', '.join(added)}." if added else "workout_plans columns and indexes already exist.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Add the users.last_seen column to databases created before it existed.
+
+create_all never alters existing tables. Safe to rerun; entrypoint.sh runs it
+before create_indexes, which then adds the column's index.
+
+Usage: python -m app.migrations.add_user_last_seen
+"""
+from sqlalchemy import inspect, text
+
+from app.database import engine, Base
+import app.models.models  # noqa: F401  (registers the tables on Base.metadata)
+
+def add_last_seen_column(bind) -> bool:
+    """Add users.last_seen if it is missing; returns whether it was added."""
+    columns = {column["name"] for column in inspect(bind).get_columns("users")}
+    if "last_seen" in columns:
+        return False
+    column_type = Base.metadata.tables["users"].c.last_seen.type.compile(dialect=bind.dialect)
+    bind.execute(text(f"ALTER TABLE users ADD COLUMN last_seen {column_type}"))
+    return True
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        added = add_last_seen_column(connection)
+    print("Added users.last_seen." if added else "users.last_seen already exists.")
+
+if __name__ == "__main__":
+    main()
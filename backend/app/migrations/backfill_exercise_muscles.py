@@ -0,0 +1,42 @@
+"""
+Backfill the muscle_groups and exercise_muscles tables.
+
+Creates any missing tables, then rebuilds every exercise's muscle
+associations from its muscle_group and secondary_muscle_groups columns.
+Safe to run repeatedly; entrypoint.sh runs it after seeding.
+
+Usage: python -m app.migrations.backfill_exercise_muscles
+"""
+from app.database import SessionLocal, engine, Base
+from app.models.models import Exercise
+from app.services.muscle_groups import sync_exercise_muscles
+
+# Exercises rebuilt per batch
+BATCH_SIZE = 500
+
+def backfill_exercise_muscles(db) -> int:
+    """Rebuild the muscle associations of every exercise. Returns the number of rows written."""
+    exercises = db.query(
+        Exercise.id, Exercise.muscle_group, Exercise.secondary_muscle_groups
+    ).order_by(Exercise.id).all()
+
+    written = 0
+    for start in range(0, len(exercises), BATCH_SIZE):
+        written += sync_exercise_muscles(db, exercises[start:start + BATCH_SIZE])
+    return written
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        written = backfill_exercise_muscles(db)
+        db.commit()
+        print(f"Backfilled {written} exercise muscle associations.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
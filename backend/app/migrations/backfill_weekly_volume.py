@@ -0,0 +1,36 @@
+"""
+Backfill the weekly_exercise_volume rollup from the logged set history.
+
+By default only runs when the rollup is empty (first deploy); pass --force
+to rebuild it from scratch. entrypoint.sh runs it after seeding.
+
+Usage: python -m app.migrations.backfill_weekly_volume [--force]
+"""
+import argparse
+
+from app.database import SessionLocal, engine, Base
+from app.models.models import WeeklyExerciseVolume
+from app.services.volume_rollup import rebuild_weekly_volume
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the weekly exercise volume rollup")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the rollup already has rows")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if not args.force and db.query(WeeklyExerciseVolume.id).first():
+            print("Weekly volume rollup already populated; use --force to rebuild.")
+            return
+        written = rebuild_weekly_volume(db)
+        db.commit()
+        print(f"Backfilled {written} weekly exercise volume rows.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Create indexes declared on the models that are missing from existing tables.
+
+create_all only creates indexes together with new tables, so indexes added to
+tables that already exist in a deployed database are created here. Safe to
+rerun; entrypoint.sh runs it before the backfills.
+
+Usage: python -m app.migrations.create_indexes
+"""
+from sqlalchemy import inspect
+
+from app.database import engine, Base
+import app.models.models  # noqa: F401  (registers the tables on Base.metadata)
+
+def create_missing_indexes(bind) -> int:
+    """Create every declared index that does not exist yet; returns how many were created."""
+    inspector = inspect(bind)
+    created = 0
+    for table in Base.metadata.tables.values():
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind)
+                created += 1
+    return created
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        created = create_missing_indexes(connection)
+    print(f"Created {created} missing indexes.")
+
+if __name__ == "__main__":
+    main()
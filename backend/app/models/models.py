@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Date, Text, Boolean, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -14,6 +14,7 @@ class User(Base):
     is_admin = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     last_login = Column(DateTime(timezone=True), nullable=True)
+    last_seen = Column(DateTime(timezone=True), nullable=True, index=True)  # Written in batches by the activity tracker
     profile_picture = Column(String, nullable=True)
     settings = Column(Text, nullable=True)  # JSON string for user settings
     active_plan_id = Column(Integer, ForeignKey("workout_plans.id"), nullable=True)
@@ -28,6 +29,14 @@ class User(Base):
     shared_plans_owned = relationship("SharedPlan", foreign_keys="SharedPlan.owner_id", back_populates="owner")
     shared_plans_received = relationship("SharedPlan", foreign_keys="SharedPlan.shared_with_id", back_populates="shared_with")
     program_progress = relationship("UserProgramProgress", back_populates="user", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # At most one first user, even when the first sign-ups race each other
+        Index(
+            'ix_users_first_user', 'is_first_user', unique=True,
+            postgresql_where=is_first_user.is_(True), sqlite_where=is_first_user.is_(True)
+        ),
+    )
 
 class Exercise(Base):
     __tablename__ = "exercises"
@@ -54,6 +63,35 @@ class Exercise(Base):
     plan_exercises = relationship("PlanExercise", back_populates="exercise")
     session_exercises = relationship("SessionExercise", back_populates="exercise")
     user_progress = relationship("UserProgramProgress", back_populates="exercise", cascade="all, delete-orphan")
+    muscles = relationship("ExerciseMuscle", back_populates="exercise", cascade="all, delete-orphan")
+
+class MuscleGroup(Base):
+    __tablename__ = "muscle_groups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True, nullable=False)  # Lowercased, whitespace-collapsed name used for lookups
+    name = Column(String, nullable=False)  # Display name as first seen, e.g. "Legs"
+    
+    # Relationships
+    exercises = relationship("ExerciseMuscle", back_populates="muscle_group")
+
+# Which muscle groups an exercise trains; kept in sync with Exercise.muscle_group/secondary_muscle_groups
+class ExerciseMuscle(Base):
+    __tablename__ = "exercise_muscles"
+    
+    exercise_id = Column(Integer, ForeignKey("exercises.id", ondelete="CASCADE"), primary_key=True)
+    muscle_group_id = Column(Integer, ForeignKey("muscle_groups.id", ondelete="CASCADE"), primary_key=True)
+    role = Column(String, nullable=False)  # 'primary' or 'secondary'
+    weight = Column(Float, nullable=False, default=1.0)  # Share of a set credited to this muscle group
+    
+    # Relationships
+    exercise = relationship("Exercise", back_populates="muscles")
+    muscle_group = relationship("MuscleGroup", back_populates="exercises")
+    
+    __table_args__ = (
+        # "Everything that hits glutes" looks up by muscle group first
+        Index("ix_exercise_muscles_muscle_role", "muscle_group_id", "role"),
+    )
 
 class WorkoutPlan(Base):
     __tablename__ = "workout_plans"
@@ -67,6 +105,8 @@ class WorkoutPlan(Base):
     is_active = Column(Boolean, default=False, nullable=False)
     days_per_week = Column(Integer, nullable=True)
     duration_weeks = Column(Integer, nullable=True)
+    version = Column(Integer, default=1, server_default="1", nullable=False)  # Bumped on every saved edit
+    template_plan_id = Column(Integer, ForeignKey("workout_plans.id"), nullable=True, index=True)  # Copy-on-write clones read this plan's exercises until edited
     
     # Relationships
     owner = relationship("User", back_populates="workout_plans", foreign_keys=[owner_id])
@@ -108,6 +148,13 @@ class WorkoutSession(Base):
     day_of_week = Column(Integer, nullable=True)
     status = Column(String, default="in_progress", nullable=False)
     
+    __table_args__ = (
+        # Newest completed sessions of a user, e.g. for last-performance lookups
+        Index("ix_workout_sessions_user_status_start", "user_id", "status", "start_time"),
+        # A user's sessions newest first, e.g. for paging through exercise history
+        Index("ix_workout_sessions_user_start", "user_id", "start_time"),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="workout_sessions")
     workout_plan = relationship("WorkoutPlan", back_populates="workout_sessions")
@@ -125,6 +172,13 @@ class SessionExercise(Base):
     rest_seconds = Column(Integer, nullable=True)
     sets_count = Column(Integer, nullable=True)
     
+    __table_args__ = (
+        # Every time a user did an exercise, joined back to their sessions
+        Index("ix_session_exercises_exercise_session", "exercise_id", "session_id"),
+        # One exercise within a session; includes id so the history walk never visits the table
+        Index("ix_session_exercises_session_exercise", "session_id", "exercise_id", postgresql_include=["id"]),
+    )
+    
     # Relationships
     session = relationship("WorkoutSession", back_populates="exercises")
     exercise = relationship("Exercise", back_populates="session_exercises")
@@ -142,6 +196,14 @@ class ExerciseSet(Base):
     is_warmup = Column(Boolean, default=False, nullable=False)
     perceived_effort = Column(Integer, nullable=True)
     
+    __table_args__ = (
+        # Covering index: a session exercise's sets in order, served from the index alone
+        Index(
+            "ix_exercise_sets_session_exercise_set", "session_exercise_id", "set_number",
+            postgresql_include=["id", "reps", "weight", "is_warmup", "perceived_effort", "completed_at"]
+        ),
+    )
+    
     # Relationships
     session_exercise = relationship("SessionExercise", back_populates="sets")
 
@@ -182,4 +244,32 @@ class UserProgramProgress(Base):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'workout_plan_id', 'exercise_id', name='_user_plan_exercise_uc'),
-    ) 
\ No newline at end of file
+    ) 
+
+# Per-user, per-week, per-exercise training volume, maintained as sets are logged
+class WeeklyExerciseVolume(Base):
+    __tablename__ = "weekly_exercise_volume"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    week_start = Column(Date, nullable=False)  # Monday of the week the session started in (UTC)
+    exercise_id = Column(Integer, ForeignKey("exercises.id", ondelete="CASCADE"), nullable=False)
+    hard_sets = Column(Integer, default=0, nullable=False)  # Non-warmup sets with at least one rep
+    tonnage = Column(Float, default=0, nullable=False)  # Sum of reps * weight (kg) over hard sets
+    
+    __table_args__ = (
+        # Also serves the (user_id, week_start) range scans of the muscle volume endpoint
+        UniqueConstraint('user_id', 'week_start', 'exercise_id', name='_user_week_exercise_uc'),
+    )
+
+# Opaque refresh tokens, stored as SHA-256 hashes; each login starts a family that rotation extends
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    family_id = Column(String(32), index=True, nullable=False)  # Shared by every token rotated from one login
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)  # Set when rotated, logged out or reused
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Dict, Any
 
 from .. import database, models
 from ..schemas.user import UserResponse
 # from ..services.auth import get_current_active_user # No longer needed directly here
 from ..services.auth import get_current_admin_user # Import the correct dependency
+from ..middleware.rate_limit import load_limiter
+from ..services.activity_tracker import activity_tracker
+from ..services.password_hashing import password_hash_pool
+from ..services.slow_queries import slow_query_log
 
+# Prefix and tags are set where main.py includes the router
 router = APIRouter(
-    prefix="/api/admin",
-    tags=["Admin"],
     responses={404: {"description": "Not found"}},
 )
 
@@ -36,4 +39,54 @@ router = APIRouter(
 #     users = db.query(models.User).order_by(models.User.id).all()
 #     return users
 
-# Add more admin routes here (e.g., delete user, update user roles) 
\ No newline at end of file
+# Add more admin routes here (e.g., delete user, update user roles) 
+
+@router.get("/password-hashing", response_model=Dict[str, Any])
+async def get_password_hashing_stats(
+    current_admin: models.User = Depends(get_current_admin_user)
+):
+    """
+    Load on the password hashing pool: hashes running and queued, the peak queue
+    depth, how long hashes waited for a thread, and how many were rejected.
+    Requires admin privileges.
+    """
+    return password_hash_pool.stats()
+
+@router.get("/activity-tracking", response_model=Dict[str, Any])
+async def get_activity_tracking_stats(
+    current_admin: models.User = Depends(get_current_admin_user)
+):
+    """
+    State of the user activity buffer: users waiting to be written, activity
+    dropped because the buffer was full, and how many flushes ran, failed and
+    how long the last one took.
+    Requires admin privileges.
+    """
+    return activity_tracker.stats()
+
+@router.get("/rate-limiting", response_model=Dict[str, Any])
+async def get_rate_limiting_stats(
+    current_admin: models.User = Depends(get_current_admin_user)
+):
+    """
+    Configured rate limits per route group and how often each was hit, plus
+    requests in progress, waiting for a slot, and shed because the queue was full.
+    Requires admin privileges.
+    """
+    return load_limiter.stats()
+
+@router.get("/slow-queries", response_model=Dict[str, Any])
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    current_admin: models.User = Depends(get_current_admin_user)
+):
+    """
+    Recent statements slower than the slow-query threshold, newest first, with
+    their duration, parameter types, the route that ran them and their plan.
+    Plans are captured in the background, so the newest may still be pending.
+    Requires admin privileges.
+    """
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "queries": slow_query_log.entries(limit),
+    }
@@ -1,64 +1,130 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from typing import Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import String, false, insert, literal, select
+from sqlalchemy.exc import IntegrityError
 
 from app.database import get_db
 from app.models.models import User
 from app.schemas.user import UserCreate, UserResponse
-from app.schemas.token import Token
+from app.schemas.token import Token, RefreshTokenRequest
 from app.services.auth import (
     authenticate_user,
     create_access_token,
-    get_password_hash,
+    get_password_hash_async,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
+from app.services.activity_tracker import activity_tracker
+from app.services.refresh_tokens import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
 
 router = APIRouter()
 
+def _token_response(user: User, refresh_token: str) -> dict:
+    """
+    A short-lived access token carrying the claims most routes authorize with,
+    returned with the refresh token that renews it.
+    """
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.username, "id": user.id, "is_admin": user.is_admin},
+        expires_delta=access_token_expires,
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
+
+# Column behind each registration conflict and the error it is reported with
+_REGISTRATION_CONFLICTS = {
+    "is_first_user": None,
+    "username": "Username already registered",
+    "email": "Email already registered",
+}
+
+# Unique indexes and constraints on users, by name, and the column each guards.
+# create_all names them ix_*; databases created otherwise may use Postgres' *_key names.
+_USER_UNIQUE_CONSTRAINTS = {
+    "ix_users_first_user": "is_first_user",
+    "ix_users_username": "username",
+    "users_username_key": "username",
+    "ix_users_email": "email",
+    "users_email_key": "email",
+}
+
+def _insert_user(db: Session, user: UserCreate, hashed_password: str, allow_first: bool) -> User:
+    """
+    Insert the user in a single INSERT ... SELECT ... RETURNING statement.
+    The user becomes the admin if the table had no rows, checked inside the
+    same statement with NOT EXISTS instead of counting users.
+    """
+    is_first = ~select(User.id).exists() if allow_first else false()
+    statement = insert(User).from_select(
+        ["username", "email", "hashed_password", "is_admin", "is_first_user", "has_completed_onboarding"],
+        select(
+            literal(user.username, String),
+            literal(user.email, String),
+            literal(hashed_password, String),
+            is_first,
+            is_first,
+            false(),
+        )
+    ).returning(User)
+    return db.scalars(statement).one()
+
+def _registration_conflict(error: IntegrityError) -> Optional[str]:
+    """Name of the unique column a failed registration collided with."""
+    # psycopg2 reports the violated constraint by name
+    diag = getattr(error.orig, "diag", None)
+    constraint_name = getattr(diag, "constraint_name", None)
+    if constraint_name:
+        return _USER_UNIQUE_CONSTRAINTS.get(constraint_name)
+    
+    # SQLite only has the message: "UNIQUE constraint failed: users.username"
+    message = str(error.orig)
+    prefix = "UNIQUE constraint failed: "
+    if not message.startswith(prefix):
+        return None
+    for column in message[len(prefix):].split(","):
+        table, _, name = column.strip().partition(".")
+        if table == "users" and name in _REGISTRATION_CONFLICTS:
+            return name
+    return None
+
 @router.post("/register", response_model=UserResponse)
 async def register(user: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user.
     The first user to register becomes an admin.
+    Duplicate usernames and emails are caught by the unique indexes on insert
+    rather than looked up beforehand.
     """
-    # Check if username already exists
-    db_user = db.query(User).filter(User.username == user.username).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered",
-        )
-    
-    # Check if email already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered",
-        )
-    
-    # Check if this is the first user (make them admin and set the flag)
-    user_count = db.query(func.count(User.id)).scalar()
-    is_first = user_count == 0
-    
-    # Create new user
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password,
-        is_admin=is_first, # First user is admin
-        is_first_user=is_first, # Set the new flag
-        has_completed_onboarding=False # Default onboarding status
-    )
+    hashed_password = await get_password_hash_async(user.password)
     
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    return db_user
+    allow_first = True
+    while True:
+        try:
+            # Serialized before commit, which would expire the returned row and reload it
+            created = UserResponse.model_validate(_insert_user(db, user, hashed_password, allow_first))
+            db.commit()
+            return created
+        except IntegrityError as e:
+            db.rollback()
+            conflict = _registration_conflict(e)
+            # Lost the race to become the first user: register as a regular one
+            if conflict == "is_first_user" and allow_first:
+                allow_first = False
+                continue
+            detail = _REGISTRATION_CONFLICTS.get(conflict)
+            if detail:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=detail,
+                )
+            raise
 
 @router.post("/login", response_model=Token)
 async def login(
@@ -68,7 +134,7 @@ async def login(
     """
     Authenticate a user and return a JWT token.
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
@@ -77,15 +143,30 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Update last login timestamp
-    user.last_login = func.now()
+    # Last login is written in the next batch of user activity
+    activity_tracker.record(user.id, login=True)
+    refresh_token = issue_refresh_token(db, user.id)
     db.commit()
     
-    # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username, "id": user.id, "is_admin": user.is_admin},
-        expires_delta=access_token_expires,
-    )
+    return _token_response(user, refresh_token)
+
+@router.post("/refresh", response_model=Token)
+async def refresh(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and refresh token.
+    The old refresh token stops working; presenting it again signs out
+    every session that descends from the same login.
+    """
+    user, refresh_token = rotate_refresh_token(db, request.refresh_token)
+    db.commit()
     
-    return {"access_token": access_token, "token_type": "bearer"} 
\ No newline at end of file
+    return _token_response(user, refresh_token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """
+    Revoke a refresh token and every token rotated from the same login.
+    Access tokens already issued stay valid until they expire.
+    """
+    if revoke_refresh_token(db, request.refresh_token):
+        db.commit() 
\ No newline at end of file
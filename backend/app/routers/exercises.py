@@ -1,16 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 
 from app.database import get_db
 from app.models.models import Exercise, User
-from app.schemas.exercise import ExerciseCreate, ExerciseUpdate, ExerciseResponse
-from app.services.auth import get_current_active_user, get_current_admin_user
+from app.schemas.exercise import (
+    ExerciseCreate,
+    ExerciseUpdate,
+    ExerciseResponse,
+    ExerciseFacetsResponse,
+    ExerciseSuggestion,
+    ExerciseSubstitute,
+)
+from app.services.auth import get_current_active_user, get_current_admin_user, get_current_identity
+from app.services.user_cache import UserIdentity
+from app.services.exercise_catalog import exercise_catalog, filter_exercises, distinct_values, facet_counts
+from app.services.exercise_search import search_exercises, exercise_usage
+from app.services.exercise_substitutes import SUBSTITUTE_TOP_K
+from app.services.exercise_import import import_exercise_rows
+from app.services.muscle_groups import sync_exercise_muscles, exercise_ids_for_muscle, PRIMARY_ROLE, SECONDARY_ROLE
+from sqlalchemy.exc import SQLAlchemyError
 import json
-from fastapi import Response, File, UploadFile
+import logging
+from fastapi import Response, File, UploadFile, Form
 
 router = APIRouter()
 
+# Clients may keep catalog responses but must revalidate them with the ETag
+CATALOG_CACHE_CONTROL = "private, no-cache"
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """
+    Return a 304 response if the client already holds this version of the catalog.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+        )
+    return None
+
+def _set_cache_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CATALOG_CACHE_CONTROL
+
 @router.post("", response_model=ExerciseResponse)
 async def create_exercise(
     exercise: ExerciseCreate,
@@ -35,49 +69,123 @@ async def create_exercise(
         category=exercise.category,
         equipment=exercise.equipment,
         muscle_group=exercise.muscle_group,
+        secondary_muscle_groups=exercise.secondary_muscle_groups,
         instructions=exercise.instructions,
         is_system=False,
         created_by=current_user.id,
     )
     
     db.add(db_exercise)
+    db.flush()
+    sync_exercise_muscles(db, [db_exercise])
     db.commit()
     db.refresh(db_exercise)
+    exercise_catalog.invalidate(user_id=current_user.id)
     
     return db_exercise
 
 @router.get("", response_model=List[ExerciseResponse])
 async def get_exercises(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     name: Optional[str] = None,
     category: Optional[str] = None,
     equipment: Optional[str] = None,
     muscle_group: Optional[str] = None,
+    muscle: Optional[str] = None,
+    muscle_role: Optional[str] = Query(None, enum=[PRIMARY_ROLE, SECONDARY_ROLE]),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Get a list of exercises with optional filtering.
+    Served from the in-process exercise catalog (system exercises + user's own exercises).
+    muscle matches exercises that train a muscle group as primary or secondary mover
+    (or only in muscle_role), while muscle_group matches the primary muscle group text.
     """
-    query = db.query(Exercise)
-    
-    # Apply filters if provided
-    if name:
-        query = query.filter(Exercise.name.ilike(f"%{name}%"))
-    if category:
-        query = query.filter(Exercise.category == category)
-    if equipment:
-        query = query.filter(Exercise.equipment == equipment)
-    if muscle_group:
-        query = query.filter(Exercise.muscle_group == muscle_group)
-    
-    # Get exercises (system exercises + user's own exercises)
-    exercises = query.filter(
-        (Exercise.is_system == True) | (Exercise.created_by == current_user.id)
-    ).offset(skip).limit(limit).all()
-    
-    return exercises
+    exercises, etag = exercise_catalog.visible_exercises(db, current_user.id)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    _set_cache_headers(response, etag)
+    
+    exercises = filter_exercises(
+        exercises,
+        name=name,
+        category=category,
+        equipment=equipment,
+        muscle_group=muscle_group
+    )
+    if muscle:
+        exercise_ids = exercise_ids_for_muscle(db, muscle, muscle_role)
+        exercises = [exercise for exercise in exercises if exercise.id in exercise_ids]
+    return exercises[skip:skip + limit]
+
+@router.get("/facets", response_model=ExerciseFacetsResponse)
+async def get_exercise_facets(
+    request: Request,
+    response: Response,
+    name: Optional[str] = None,
+    category: Optional[str] = None,
+    equipment: Optional[str] = None,
+    muscle_group: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(get_current_identity)
+):
+    """
+    Get categories, equipment and muscle groups with exercise counts in one call.
+    Counts cover the user's visible exercises narrowed by the applied filters;
+    each dimension ignores its own filter so the other values stay selectable.
+    """
+    exercises, etag = exercise_catalog.visible_exercises(db, current_user.id)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    _set_cache_headers(response, etag)
+    
+    total, facets = facet_counts(
+        exercises,
+        name=name,
+        filters={"category": category, "equipment": equipment, "muscle_group": muscle_group}
+    )
+    return {
+        "total": total,
+        **{
+            field: [{"value": value, "count": count} for value, count in counts]
+            for field, counts in facets.items()
+        }
+    }
+
+@router.get("/autocomplete", response_model=List[ExerciseSuggestion])
+async def autocomplete_exercises(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(get_current_identity)
+):
+    """
+    Suggest exercises for a partial, possibly misspelled name.
+    Matches word prefixes and trigram similarity over the user's visible exercises,
+    expands common shorthand ("db row", "ohp"), and ranks the user's frequently
+    logged exercises higher.
+    """
+    indexes = exercise_catalog.search_indexes(db, current_user.id)
+    usage = exercise_usage.get(db, current_user.id)
+    
+    return [
+        {
+            "id": exercise.id,
+            "name": exercise.name,
+            "category": exercise.category,
+            "equipment": exercise.equipment,
+            "muscle_group": exercise.muscle_group,
+            "is_system": exercise.is_system,
+            "score": score
+        }
+        for exercise, score in search_exercises(indexes, q, limit=limit, usage=usage)
+    ]
 
 @router.get("/export")
 async def export_exercises_library(
@@ -129,7 +237,7 @@ async def export_exercises_library(
 async def get_exercise(
     exercise_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Get a specific exercise by ID.
@@ -151,6 +259,46 @@ async def get_exercise(
     
     return exercise
 
+@router.get("/{exercise_id}/substitutes", response_model=List[ExerciseSubstitute])
+async def get_exercise_substitutes(
+    exercise_id: int,
+    limit: int = Query(5, ge=1, le=SUBSTITUTE_TOP_K),
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(get_current_identity)
+):
+    """
+    Suggest exercises to swap in for the given one, e.g. when its equipment is busy.
+    Ranked by shared muscle groups (primary and secondary), then matching category,
+    equipment and difficulty, from a similarity index kept with the exercise catalog.
+    """
+    exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
+    
+    if not exercise:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Exercise not found",
+        )
+    
+    if not exercise.is_system and exercise.created_by != current_user.id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this exercise",
+        )
+    
+    return [
+        {
+            "id": other.id,
+            "name": other.name,
+            "category": other.category,
+            "equipment": other.equipment,
+            "muscle_group": other.muscle_group,
+            "difficulty_level": other.difficulty_level,
+            "is_system": other.is_system,
+            "similarity": score
+        }
+        for other, score in exercise_catalog.substitutes(db, current_user.id, exercise, limit)
+    ]
+
 @router.put("/{exercise_id}", response_model=ExerciseResponse)
 async def update_exercise(
     exercise_id: int,
@@ -202,11 +350,18 @@ async def update_exercise(
         db_exercise.equipment = exercise_update.equipment
     if exercise_update.muscle_group is not None:
         db_exercise.muscle_group = exercise_update.muscle_group
+    if exercise_update.secondary_muscle_groups is not None:
+        db_exercise.secondary_muscle_groups = exercise_update.secondary_muscle_groups
     if exercise_update.instructions is not None:
         db_exercise.instructions = exercise_update.instructions
     
+    if exercise_update.muscle_group is not None or exercise_update.secondary_muscle_groups is not None:
+        db.flush()
+        sync_exercise_muscles(db, [db_exercise])
+    
     db.commit()
     db.refresh(db_exercise)
+    exercise_catalog.invalidate(user_id=db_exercise.created_by, system=db_exercise.is_system)
     
     return db_exercise
 
@@ -247,8 +402,10 @@ async def delete_exercise(
             detail="Cannot delete exercise that is used in workout plans",
         )
     
+    owner_id, is_system = db_exercise.created_by, db_exercise.is_system
     db.delete(db_exercise)
     db.commit()
+    exercise_catalog.invalidate(user_id=owner_id, system=is_system)
     
     return None
 
@@ -276,59 +433,89 @@ async def create_system_exercise(
         category=exercise.category,
         equipment=exercise.equipment,
         muscle_group=exercise.muscle_group,
+        secondary_muscle_groups=exercise.secondary_muscle_groups,
         instructions=exercise.instructions,
         is_system=True,
         created_by=None,
     )
     
     db.add(db_exercise)
+    db.flush()
+    sync_exercise_muscles(db, [db_exercise])
     db.commit()
     db.refresh(db_exercise)
+    exercise_catalog.invalidate(system=True)
     
     return db_exercise
 
 @router.get("/categories/list", response_model=List[str])
 async def get_exercise_categories(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
-    Get a list of all exercise categories.
+    Get a list of all exercise categories in the user's visible exercise set.
     """
-    categories = db.query(Exercise.category).distinct().filter(Exercise.category != None).all()
-    return [category[0] for category in categories]
+    exercises, etag = exercise_catalog.visible_exercises(db, current_user.id)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    _set_cache_headers(response, etag)
+    
+    return distinct_values(exercises, "category")
 
 @router.get("/equipment/list", response_model=List[str])
 async def get_exercise_equipment(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
-    Get a list of all exercise equipment.
+    Get a list of all exercise equipment in the user's visible exercise set.
     """
-    equipment = db.query(Exercise.equipment).distinct().filter(Exercise.equipment != None).all()
-    return [eq[0] for eq in equipment]
+    exercises, etag = exercise_catalog.visible_exercises(db, current_user.id)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    _set_cache_headers(response, etag)
+    
+    return distinct_values(exercises, "equipment")
 
 @router.get("/muscle-groups/list", response_model=List[str])
 async def get_muscle_groups(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
-    Get a list of all muscle groups.
+    Get a list of all muscle groups in the user's visible exercise set.
     """
-    muscle_groups = db.query(Exercise.muscle_group).distinct().filter(Exercise.muscle_group != None).all()
-    return [mg[0] for mg in muscle_groups]
+    exercises, etag = exercise_catalog.visible_exercises(db, current_user.id)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    _set_cache_headers(response, etag)
+    
+    return distinct_values(exercises, "muscle_group")
 
 @router.post("/import", response_model=Dict[str, Any])
 async def import_exercises(
     file: UploadFile = File(...),
+    upsert: bool = Form(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Import multiple exercises from a JSON file.
     The file should contain an array of exercise objects.
+    
+    Parameters:
+    - file: The JSON file containing the exercises
+    - upsert: Update exercises whose name already exists instead of rejecting them
     """
     # Read file contents
     try:
@@ -347,64 +534,29 @@ async def import_exercises(
             detail="Invalid file format. Expected an array of exercises."
         )
     
-    # Results tracking
-    results = {
-        "success": 0,
-        "failed": 0,
-        "failed_exercises": []
-    }
+    try:
+        results = import_exercise_rows(db, exercises_data, current_user, upsert=upsert)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        logging.exception("Error importing exercises")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to import exercises"
+        )
+    
+    if results["updated"] and current_user.is_admin:
+        # Admins may have updated system or other users' exercises
+        exercise_catalog.clear()
+    elif results["success"] or results["updated"]:
+        exercise_catalog.invalidate(user_id=current_user.id)
     
-    # Process each exercise
-    for exercise_data in exercises_data:
-        try:
-            # Skip if name is missing
-            if not exercise_data.get("name"):
-                results["failed"] += 1
-                results["failed_exercises"].append({
-                    "name": exercise_data.get("name") or "Unknown",
-                    "reason": "Missing name field"
-                })
-                continue
-            
-            # Check if exercise with same name already exists
-            existing_exercise = db.query(Exercise).filter(
-                Exercise.name == exercise_data["name"]
-            ).first()
-            
-            if existing_exercise:
-                results["failed"] += 1
-                results["failed_exercises"].append({
-                    "name": exercise_data["name"],
-                    "reason": "Exercise with this name already exists"
-                })
-                continue
-            
-            # Create new exercise
-            new_exercise = Exercise(
-                name=exercise_data["name"],
-                description=exercise_data.get("description", ""),
-                category=exercise_data.get("category", ""),
-                equipment=exercise_data.get("equipment", ""),
-                muscle_group=exercise_data.get("muscle_group", ""),
-                instructions=exercise_data.get("instructions", ""),
-                is_system=False,
-                created_by=current_user.id
-            )
-            
-            db.add(new_exercise)
-            db.commit()
-            results["success"] += 1
-            
-        except Exception as e:
-            # If any error occurs with this exercise, log it and continue
-            results["failed"] += 1
-            results["failed_exercises"].append({
-                "name": exercise_data.get("name") or "Unknown",
-                "reason": str(e)
-            })
-            db.rollback()  # Roll back the failed transaction
+    message = f"Import complete: {results['success']} exercises added, "
+    if upsert:
+        message += f"{results['updated']} updated, "
+    message += f"{results['failed']} failed"
     
     return {
-        "message": f"Import complete: {results['success']} exercises added, {results['failed']} failed",
+        "message": message,
         "results": results
-    } 
\ No newline at end of file
+    }
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import desc, insert, update, delete, select, literal
+from sqlalchemy.exc import SQLAlchemyError
+from typing import List, Optional, Union
 import json
+import logging
 from fastapi import File, UploadFile, Response, Form
+from fastapi.responses import StreamingResponse
 
 from app.database import get_db
 from app.models.models import WorkoutPlan, PlanExercise, Exercise, User, UserProgramProgress
@@ -11,14 +15,77 @@ from app.schemas.workout_plan import (
     WorkoutPlanCreate, 
     WorkoutPlanUpdate, 
     WorkoutPlanResponse,
+    WorkoutPlanBatchEdit,
+    WorkoutPlanBundleImportResponse,
     PlanExerciseCreate,
     PlanExerciseUpdate,
     PlanExerciseResponse
 )
 from app.services.auth import get_current_active_user
+from app.services.plan_exercises import (
+    exercise_source_id,
+    plan_exercises_query,
+    attach_template_exercises,
+    copy_plan_exercises,
+    materialize_plan_exercises,
+    detach_template_clones,
+)
+from app.services.upsert import insert_user_progress_ignore_existing
+from app.services.plan_bundles import (
+    IMPORT_BATCH_SIZE,
+    BundleFormat,
+    JSONDocumentStream,
+    validate_plan_document,
+    import_plan_batch,
+    iter_plan_exports,
+    ndjson_export_chunks,
+    zip_export_chunks,
+)
 
 router = APIRouter()
 
+# PlanExercise columns a client may change through the update endpoints
+PLAN_EXERCISE_UPDATE_FIELDS = (
+    "sets",
+    "reps",
+    "rest_seconds",
+    "order",
+    "day_of_week",
+    "progression_type",
+    "progression_value",
+    "progression_threshold",
+)
+
+def _bump_plan_version(db_plan: WorkoutPlan):
+    """Mark a plan as edited. Evaluated in SQL so concurrent edits never lose a bump."""
+    db_plan.version = WorkoutPlan.version + 1
+
+def _apply_plan_update(db: Session, db_plan: WorkoutPlan, plan_update: WorkoutPlanUpdate, current_user: User):
+    """Copy the metadata fields set in plan_update onto db_plan."""
+    if plan_update.name is not None:
+        db_plan.name = plan_update.name
+    if plan_update.description is not None:
+        db_plan.description = plan_update.description
+    if plan_update.is_public is not None:
+        # Prevent making a plan private if it's the active plan for other users
+        if not plan_update.is_public and db_plan.is_public:
+            active_users = db.query(User).filter(User.active_plan_id == db_plan.id).count()
+            if active_users > 1 or (active_users == 1 and db_plan.owner_id != current_user.id):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Cannot make plan private, it is active for other users"
+                )
+        db_plan.is_public = plan_update.is_public
+    
+    # Note: is_active is handled by the activate endpoint, not here
+    # if plan_update.is_active is not None:
+    #     db_plan.is_active = plan_update.is_active
+
+    if plan_update.days_per_week is not None:
+        db_plan.days_per_week = plan_update.days_per_week
+    if plan_update.duration_weeks is not None:
+        db_plan.duration_weeks = plan_update.duration_weeks
+
 @router.post("", response_model=WorkoutPlanResponse)
 async def create_workout_plan(
     plan: WorkoutPlanCreate,
@@ -118,7 +185,9 @@ async def get_workout_plans(
     plan_responses = []
     for plan in plans:
         # Count the exercises in this plan
-        exercise_count = db.query(PlanExercise).filter(PlanExercise.workout_plan_id == plan.id).count()
+        exercise_count = db.query(PlanExercise).filter(
+            PlanExercise.workout_plan_id == exercise_source_id(plan)
+        ).count()
         
         # Convert plan to dict for response
         plan_dict = {
@@ -131,6 +200,8 @@ async def get_workout_plans(
             "duration_weeks": plan.duration_weeks,
             "owner_id": plan.owner_id,
             "created_at": plan.created_at,
+            "version": plan.version,
+            "template_plan_id": plan.template_plan_id,
             "exercises": [],  # We don't need the full exercise details in the list view
             "exercises_count": exercise_count,
             "is_active_for_current_user": plan.id == current_user.active_plan_id
@@ -170,9 +241,7 @@ async def get_next_workout_plan(
         )
     
     # Count the exercises in the plan
-    exercise_count = db.query(PlanExercise).filter(
-        PlanExercise.workout_plan_id == active_plan.id
-    ).count()
+    exercise_count = plan_exercises_query(db, active_plan).count()
     
     # Set the exercises_count field
     active_plan.exercises_count = exercise_count
@@ -181,7 +250,7 @@ async def get_next_workout_plan(
     active_plan.is_active_for_current_user = True
     
     # Load exercise details for the plan exercises
-    for plan_exercise in active_plan.exercises:
+    for plan_exercise in attach_template_exercises(db, active_plan):
         exercise = db.query(Exercise).filter(Exercise.id == plan_exercise.exercise_id).first()
         if exercise:
             plan_exercise.name = exercise.name
@@ -192,6 +261,48 @@ async def get_next_workout_plan(
     
     return active_plan
 
+# Declared before /{plan_id} so "export" isn't parsed as a plan id
+@router.get("/export", response_model=None)
+async def export_workout_plan_bundle(
+    format: str = Query("ndjson", enum=["ndjson", "zip"]),
+    scope: str = Query("mine", enum=["mine", "public"]),
+    plan_ids: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Export several workout plans as one streamed download.
+    Users export their own plans; admins can export every public plan with scope=public.
+    Pass plan_ids to export only some of them. The bundle is NDJSON (one plan per line)
+    or a zip with one JSON file per plan, and either can be fed back to /import.
+    """
+    if scope == "public":
+        if not current_user.is_admin:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only admins can export all public workout plans"
+            )
+        criteria = [WorkoutPlan.is_public == True]
+    else:
+        criteria = [WorkoutPlan.owner_id == current_user.id]
+    
+    if plan_ids:
+        criteria.append(WorkoutPlan.id.in_(plan_ids))
+    
+    documents = iter_plan_exports(db, *criteria)
+    if format == "zip":
+        return StreamingResponse(
+            zip_export_chunks(documents),
+            media_type="application/zip",
+            headers={"Content-Disposition": "attachment; filename=workout_plans.zip"}
+        )
+    
+    return StreamingResponse(
+        ndjson_export_chunks(documents),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=workout_plans.ndjson"}
+    )
+
 @router.get("/{plan_id}", response_model=WorkoutPlanResponse)
 async def get_workout_plan(
     plan_id: int,
@@ -218,9 +329,7 @@ async def get_workout_plan(
         )
     
     # Count the exercises in the plan
-    exercise_count = db.query(PlanExercise).filter(
-        PlanExercise.workout_plan_id == plan.id
-    ).count()
+    exercise_count = plan_exercises_query(db, plan).count()
     
     # Set the exercises_count field
     plan.exercises_count = exercise_count
@@ -229,7 +338,7 @@ async def get_workout_plan(
     plan.is_active_for_current_user = plan.id == current_user.active_plan_id
     
     # Load exercise details for the plan exercises
-    for plan_exercise in plan.exercises:
+    for plan_exercise in attach_template_exercises(db, plan):
         exercise = db.query(Exercise).filter(Exercise.id == plan_exercise.exercise_id).first()
         if exercise:
             plan_exercise.name = exercise.name
@@ -276,29 +385,8 @@ async def update_workout_plan(
         ).update({"is_active": False})
     
     # Update plan fields
-    if plan_update.name is not None:
-        db_plan.name = plan_update.name
-    if plan_update.description is not None:
-        db_plan.description = plan_update.description
-    if plan_update.is_public is not None:
-        # Prevent making a plan private if it's the active plan for other users
-        if not plan_update.is_public and db_plan.is_public:
-            active_users = db.query(User).filter(User.active_plan_id == plan_id).count()
-            if active_users > 1 or (active_users == 1 and db_plan.owner_id != current_user.id):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Cannot make plan private, it is active for other users"
-                )
-        db_plan.is_public = plan_update.is_public
-    
-    # Note: is_active is handled by the activate endpoint, not here
-    # if plan_update.is_active is not None:
-    #     db_plan.is_active = plan_update.is_active
-
-    if plan_update.days_per_week is not None:
-        db_plan.days_per_week = plan_update.days_per_week
-    if plan_update.duration_weeks is not None:
-        db_plan.duration_weeks = plan_update.duration_weeks
+    _apply_plan_update(db, db_plan, plan_update, current_user)
+    _bump_plan_version(db_plan)
     
     db.commit()
     db.refresh(db_plan)
@@ -330,6 +418,12 @@ async def delete_workout_plan(
             detail="Not authorized to delete this workout plan"
         )
     
+    # Copy-on-write clones of this plan need their own rows before it goes away
+    detach_template_clones(db, plan_id)
+    if db_plan.template_plan_id:
+        # Never let the cascade reach the template's rows
+        db.expire(db_plan, ["exercises"])
+    
     # Delete plan (cascade will delete associated exercises)
     db.delete(db_plan)
     db.commit()
@@ -373,6 +467,10 @@ async def add_exercise_to_plan(
             detail=f"Exercise with id {exercise.exercise_id} not found"
         )
     
+    # Editing the exercise list ends any copy-on-write sharing
+    detach_template_clones(db, plan_id)
+    materialize_plan_exercises(db, db_plan)
+    
     # Determine order if not provided
     if exercise.order is None:
         # Get highest order value and add 1
@@ -399,6 +497,7 @@ async def add_exercise_to_plan(
     )
     
     db.add(db_plan_exercise)
+    _bump_plan_version(db_plan)
     db.commit()
     db.refresh(db_plan_exercise)
     
@@ -431,6 +530,10 @@ async def update_plan_exercise(
             detail="Not authorized to modify this workout plan"
         )
     
+    # Editing the exercise list ends any copy-on-write sharing
+    detach_template_clones(db, plan_id)
+    exercise_id = materialize_plan_exercises(db, db_plan).get(exercise_id, exercise_id)
+    
     # Get the plan exercise
     db_plan_exercise = db.query(PlanExercise).filter(
         PlanExercise.id == exercise_id,
@@ -461,6 +564,7 @@ async def update_plan_exercise(
     if exercise_update.progression_threshold is not None:
         db_plan_exercise.progression_threshold = exercise_update.progression_threshold
     
+    _bump_plan_version(db_plan)
     db.commit()
     db.refresh(db_plan_exercise)
     
@@ -492,6 +596,10 @@ async def remove_exercise_from_plan(
             detail="Not authorized to modify this workout plan"
         )
     
+    # Editing the exercise list ends any copy-on-write sharing
+    detach_template_clones(db, plan_id)
+    exercise_id = materialize_plan_exercises(db, db_plan).get(exercise_id, exercise_id)
+    
     # Get the plan exercise
     db_plan_exercise = db.query(PlanExercise).filter(
         PlanExercise.id == exercise_id,
@@ -506,6 +614,7 @@ async def remove_exercise_from_plan(
     
     # Delete the plan exercise
     db.delete(db_plan_exercise)
+    _bump_plan_version(db_plan)
     db.commit()
     
     return None
@@ -537,6 +646,10 @@ async def reorder_plan_exercises(
             detail="Not authorized to modify this workout plan"
         )
     
+    # Editing the exercise list ends any copy-on-write sharing
+    detach_template_clones(db, plan_id)
+    id_map = materialize_plan_exercises(db, db_plan)
+    
     # Update order for each exercise
     for item in exercise_orders:
         exercise_id = item.get("exercise_id")
@@ -547,6 +660,7 @@ async def reorder_plan_exercises(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Each item must have exercise_id and new_order"
             )
+        exercise_id = id_map.get(exercise_id, exercise_id)
         
         # Get the plan exercise
         db_plan_exercise = db.query(PlanExercise).filter(
@@ -563,21 +677,166 @@ async def reorder_plan_exercises(
         # Update order
         db_plan_exercise.order = new_order
     
+    _bump_plan_version(db_plan)
     db.commit()
     db.refresh(db_plan)
     
     return db_plan
 
+@router.patch("/{plan_id}", response_model=WorkoutPlanResponse)
+async def batch_edit_workout_plan(
+    plan_id: int,
+    changes: WorkoutPlanBatchEdit,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Apply a full set of plan edits in one transaction.
+    Accepts metadata changes plus exercises to add, update and remove.
+    Either every change is saved and the plan version is bumped once, or nothing is saved.
+    If version is given and no longer matches the stored plan, returns 409.
+    Users can only modify their own plans.
+    """
+    db_plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id).first()
+    
+    if not db_plan:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Workout plan not found"
+        )
+    
+    if db_plan.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to modify this workout plan"
+        )
+    
+    if changes.version is not None and changes.version != db_plan.version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Workout plan was modified by another request, reload and try again"
+        )
+    
+    if changes.add or changes.update or changes.remove:
+        # Editing the exercise list ends any copy-on-write sharing
+        detach_template_clones(db, plan_id)
+        id_map = materialize_plan_exercises(db, db_plan)
+        for item in changes.update:
+            item.id = id_map.get(item.id, item.id)
+        changes.remove = [id_map.get(row_id, row_id) for row_id in changes.remove]
+    
+    remove_ids = set(changes.remove)
+    update_ids = {item.id for item in changes.update}
+    
+    if remove_ids & update_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The same plan exercise cannot be both updated and removed"
+        )
+    
+    # Every updated or removed row must belong to this plan (one query)
+    referenced_ids = remove_ids | update_ids
+    if referenced_ids:
+        found_ids = {
+            row.id for row in db.query(PlanExercise.id).filter(
+                PlanExercise.workout_plan_id == plan_id,
+                PlanExercise.id.in_(referenced_ids)
+            )
+        }
+        missing_ids = referenced_ids - found_ids
+        if missing_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Exercises not found in this workout plan: {sorted(missing_ids)}"
+            )
+    
+    # Every added exercise must exist (one query)
+    exercise_ids = {item.exercise_id for item in changes.add}
+    if exercise_ids:
+        found_ids = {
+            row.id for row in db.query(Exercise.id).filter(Exercise.id.in_(exercise_ids))
+        }
+        missing_ids = exercise_ids - found_ids
+        if missing_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Exercises not found: {sorted(missing_ids)}"
+            )
+    
+    try:
+        if changes.plan is not None:
+            _apply_plan_update(db, db_plan, changes.plan, current_user)
+        
+        if remove_ids:
+            db.execute(
+                delete(PlanExercise)
+                .where(PlanExercise.id.in_(remove_ids))
+                .execution_options(synchronize_session=False)
+            )
+        
+        update_rows = []
+        for item in changes.update:
+            row = {"id": item.id}
+            for field in PLAN_EXERCISE_UPDATE_FIELDS:
+                value = getattr(item, field)
+                if value is not None:
+                    row[field] = value
+            if len(row) > 1:
+                update_rows.append(row)
+        if update_rows:
+            db.execute(update(PlanExercise), update_rows)
+        
+        if changes.add:
+            db.execute(
+                insert(PlanExercise),
+                [
+                    {"workout_plan_id": plan_id, **item.model_dump()}
+                    for item in changes.add
+                ]
+            )
+        
+        # Single version bump; the WHERE clause also guards against a concurrent save
+        result = db.execute(
+            update(WorkoutPlan)
+            .where(WorkoutPlan.id == plan_id, WorkoutPlan.version == db_plan.version)
+            .values(version=WorkoutPlan.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Workout plan was modified by another request, reload and try again"
+            )
+        
+        db.commit()
+    except HTTPException:
+        raise
+    except SQLAlchemyError:
+        db.rollback()
+        logging.exception(f"Error applying batch edit to workout plan {plan_id}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error saving workout plan"
+        )
+    
+    db.refresh(db_plan)
+    
+    return db_plan
+
 @router.post("/{plan_id}/clone", response_model=WorkoutPlanResponse)
 async def clone_workout_plan(
     plan_id: int,
     new_name: Optional[str] = None,
+    copy_on_write: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Clone a workout plan.
     Users can clone their own plans and public plans.
+    With copy_on_write, the clone shares the original's exercise list
+    and only gets its own copy the first time either plan's exercises are edited.
     """
     # Get the original plan
     original_plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id).first()
@@ -595,6 +854,9 @@ async def clone_workout_plan(
             detail="Not authorized to clone this workout plan"
         )
     
+    # Cloning a copy-on-write clone shares the same underlying template
+    source_plan_id = exercise_source_id(original_plan)
+    
     # Create new plan
     new_plan = WorkoutPlan(
         name=new_name or f"Copy of {original_plan.name}",
@@ -602,32 +864,20 @@ async def clone_workout_plan(
         owner_id=current_user.id,
         is_public=False,  # Default to private for cloned plans
         days_per_week=original_plan.days_per_week,
-        duration_weeks=original_plan.duration_weeks
+        duration_weeks=original_plan.duration_weeks,
+        template_plan_id=source_plan_id if copy_on_write else None
     )
     
     db.add(new_plan)
-    db.commit()
-    db.refresh(new_plan)
+    db.flush()  # Need the new plan id for the exercise copy
     
-    # Clone exercises
-    for exercise in original_plan.exercises:
-        new_exercise = PlanExercise(
-            workout_plan_id=new_plan.id,
-            exercise_id=exercise.exercise_id,
-            sets=exercise.sets,
-            reps=exercise.reps,
-            rest_seconds=exercise.rest_seconds,
-            order=exercise.order,
-            day_of_week=exercise.day_of_week,
-            progression_type=exercise.progression_type,
-            progression_value=exercise.progression_value,
-            progression_threshold=exercise.progression_threshold
-        )
-        
-        db.add(new_exercise)
+    # Clone exercises in one INSERT ... SELECT unless they are shared
+    if not copy_on_write:
+        copy_plan_exercises(db, source_plan_id, new_plan.id)
     
     db.commit()
     db.refresh(new_plan)
+    attach_template_exercises(db, new_plan)
     
     return new_plan
 
@@ -666,9 +916,7 @@ async def activate_workout_plan(
         db_plan.is_active_for_current_user = True
         
         # Get plan exercises to return with the response
-        plan_exercises = db.query(PlanExercise).filter(
-            PlanExercise.workout_plan_id == plan_id
-        ).order_by(PlanExercise.order).all()
+        plan_exercises = plan_exercises_query(db, db_plan).order_by(PlanExercise.order).all()
         
         # Fetch all exercises at once
         exercise_ids = [pe.exercise_id for pe in plan_exercises]
@@ -712,73 +960,35 @@ async def activate_workout_plan(
                     "muscle_group": "Unknown",
                     "category": "Unknown"
                 }
-            
-            # Debug info
-            print(f"Exercise for plan: {plan_exercise.exercise_id}, name: {plan_exercise.name}")
-        
-        # Process user program progress records
-        # Create a dictionary with exercise IDs as keys for quick lookup
-        existing_progress_records = {}
-        existing_records = db.query(UserProgramProgress).filter(
-            UserProgramProgress.user_id == current_user.id,
-            UserProgramProgress.workout_plan_id == plan_id
-        ).all()
-        
-        # Map exercise_id to its respective progress record
-        for record in existing_records:
-            existing_progress_records[record.exercise_id] = record
         
-        # Create new progress records only for exercises that don't have records yet
-        new_records = []
-        for plan_exercise in plan_exercises:
-            # Skip if this exercise already has a progress record
-            if plan_exercise.exercise_id in existing_progress_records:
-                continue
-                
-            # Find the exercise to validate it exists
-            exercise = exercise_map.get(plan_exercise.exercise_id)
-            if not exercise:
-                print(f"Warning: Exercise {plan_exercise.exercise_id} not found when activating plan {plan_id}")
-                continue
-                
-            # Debug info
-            print(f"Creating new progress record for exercise {plan_exercise.exercise_id} in plan {plan_id}")
-            
-            # Create a new progress record with null weight
-            new_progress = UserProgramProgress(
-                user_id=current_user.id,
-                workout_plan_id=plan_id,
-                exercise_id=plan_exercise.exercise_id,
-                current_weight=None,
-                current_reps=plan_exercise.reps,  # Use the target reps from the plan
-                next_weight=None,
-                next_reps=plan_exercise.reps
+        # Create progress records for exercises that don't have one yet.
+        # One INSERT ... SELECT ... ON CONFLICT DO NOTHING, so repeated exercises,
+        # existing rows and concurrent activations never hit the unique constraint.
+        insert_user_progress_ignore_existing(
+            db,
+            select(
+                literal(current_user.id),
+                literal(plan_id),
+                PlanExercise.exercise_id,
+                PlanExercise.reps,  # Use the target reps from the plan
+                PlanExercise.reps,
+                literal(0)
             )
-            new_records.append(new_progress)
-        
-        # Add all new records at once
-        if new_records:
-            try:
-                # Use individual adds with error handling instead of bulk add
-                for record in new_records:
-                    try:
-                        db.add(record)
-                        db.flush()
-                    except Exception as e:
-                        print(f"Error adding progress record: {str(e)}")
-                        # Continue with other records if one fails
-                        db.rollback()
-            except Exception as e:
-                print(f"Error adding progress records: {str(e)}")
-                # Don't let progress record errors prevent plan activation
+            .join(Exercise, Exercise.id == PlanExercise.exercise_id)  # Skip exercises that no longer exist
+            .where(PlanExercise.workout_plan_id == exercise_source_id(db_plan))
+            .order_by(PlanExercise.order),
+            ["user_id", "workout_plan_id", "exercise_id", "current_reps", "next_reps", "progression_status"]
+        )
                 
+        # Also return the exercises that need weights. The response is built
+        # before committing, which expires the rows and would reload each one.
+        set_committed_value(db_plan, "exercises", plan_exercises)
+        response = WorkoutPlanResponse.model_validate(db_plan)
+        
         # Commit all changes together
         db.commit()
         
-        # Also return the exercises that need weights
-        db_plan.exercises = plan_exercises
-        
-        return db_plan
+        return response
         
     except Exception as e:
         db.rollback()
@@ -814,43 +1024,8 @@ async def export_workout_plan(
             detail="Not authorized to export this workout plan"
         )
     
-    # Fetch the exercises for this plan
-    plan_exercises = db.query(PlanExercise).filter(
-        PlanExercise.workout_plan_id == plan_id
-    ).all()
-    
-    # Get exercise details
-    for plan_exercise in plan_exercises:
-        exercise = db.query(Exercise).filter(Exercise.id == plan_exercise.exercise_id).first()
-        if exercise:
-            plan_exercise.exercise_name = exercise.name
-            plan_exercise.muscle_group = exercise.muscle_group
-            plan_exercise.category = exercise.category
-    
-    # Create export data structure
-    export_data = {
-        "name": plan.name,
-        "description": plan.description,
-        "days_per_week": plan.days_per_week,
-        "duration_weeks": plan.duration_weeks,
-        "is_public": plan.is_public,
-        "exercises": []
-    }
-    
-    # Add exercises to export data
-    for ex in plan_exercises:
-        export_data["exercises"].append({
-            "exercise_id": ex.exercise_id,
-            "exercise_name": getattr(ex, "exercise_name", None),
-            "sets": ex.sets,
-            "reps": ex.reps,
-            "rest_seconds": ex.rest_seconds,
-            "order": ex.order,
-            "day_of_week": ex.day_of_week,
-            "progression_type": ex.progression_type,
-            "progression_value": ex.progression_value,
-            "progression_threshold": ex.progression_threshold
-        })
+    # Same document layout as bundle exports, built from one joined query
+    _, export_data = next(iter_plan_exports(db, WorkoutPlan.id == plan.id))
     
     # Return JSON response with appropriate headers for download
     return Response(
@@ -861,7 +1036,7 @@ async def export_workout_plan(
         }
     )
 
-@router.post("/import", response_model=WorkoutPlanResponse)
+@router.post("/import", response_model=Union[WorkoutPlanResponse, WorkoutPlanBundleImportResponse])
 async def import_workout_plan(
     file: UploadFile = File(...),
     weight_unit: str = Form("kg"),  # Add weight_unit parameter with Form dependency
@@ -869,84 +1044,54 @@ async def import_workout_plan(
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Import a workout plan from a JSON file.
+    Import workout plans from a JSON file.
+    
+    The file may hold a single plan (as written by the export endpoint), a JSON array
+    of plans, or NDJSON with one plan per line. Bundles are parsed incrementally and
+    imported in batches, and everything is committed together at the end.
+    A single plan returns the created plan; a bundle returns a summary per plan.
     
     Parameters:
     - file: The JSON file containing workout plan data
     - weight_unit: The unit system used in the file ("kg" or "lbs")
     """
-    # Read file contents
+    stream = JSONDocumentStream(file)
+    batch = []
+    imported = []
+    
     try:
-        contents = await file.read()
-        plan_data = json.loads(contents)
-    except Exception as e:
+        index = 0
+        async for plan_data in stream:
+            validate_plan_document(plan_data, None if stream.format == BundleFormat.SINGLE else index)
+            batch.append(plan_data)
+            index += 1
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                imported.extend(import_plan_batch(db, batch, current_user.id))
+                batch = []
+        imported.extend(import_plan_batch(db, batch, current_user.id))
+        db.commit()
+    except ValueError as e:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid JSON file: {str(e)}"
         )
-    
-    # Validate required fields
-    required_fields = ["name", "exercises"]
-    for field in required_fields:
-        if field not in plan_data:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Missing required field: {field}"
-            )
-    
-    # Create new workout plan
-    new_plan = WorkoutPlan(
-        name=plan_data["name"],
-        description=plan_data.get("description", ""),
-        days_per_week=plan_data.get("days_per_week", 0),
-        duration_weeks=plan_data.get("duration_weeks", 0),
-        is_public=plan_data.get("is_public", False),
-        owner_id=current_user.id
-    )
-    
-    db.add(new_plan)
-    db.commit()
-    db.refresh(new_plan)
-    
-    # Add exercises to the plan
-    for i, exercise_data in enumerate(plan_data["exercises"]):
-        # Verify exercise exists if exercise_id is provided
-        exercise_id = exercise_data.get("exercise_id")
-        if exercise_id:
-            exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
-            if not exercise:
-                # Try to find exercise by name if exercise_name is provided
-                exercise_name = exercise_data.get("exercise_name")
-                if exercise_name:
-                    exercise = db.query(Exercise).filter(Exercise.name == exercise_name).first()
-                
-                # If still not found, skip this exercise or create a new one
-                if not exercise:
-                    # Could either skip or create a placeholder exercise
-                    continue
-                
-                exercise_id = exercise.id
-        else:
-            # Skip exercises without an ID
-            continue
-        
-        # Create plan exercise with converted weight
-        db_plan_exercise = PlanExercise(
-            workout_plan_id=new_plan.id,
-            exercise_id=exercise_id,
-            sets=exercise_data.get("sets", 3),
-            reps=exercise_data.get("reps", 10),
-            rest_seconds=exercise_data.get("rest_seconds", 60),
-            order=exercise_data.get("order", i),
-            day_of_week=exercise_data.get("day_of_week"),
-            progression_type=exercise_data.get("progression_type", "weight"),
-            progression_value=exercise_data.get("progression_value", 2.5),
-            progression_threshold=exercise_data.get("progression_threshold", 2)
+    except HTTPException:
+        db.rollback()
+        raise
+    except SQLAlchemyError:
+        db.rollback()
+        logging.exception("Error importing workout plans")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to import workout plans"
         )
-        
-        db.add(db_plan_exercise)
     
-    db.commit()
-    db.refresh(new_plan)
+    if stream.format == BundleFormat.SINGLE:
+        return db.query(WorkoutPlan).filter(WorkoutPlan.id == imported[0]["id"]).first()
     
-    return new_plan 
\ No newline at end of file
+    return {
+        "message": f"Imported {len(imported)} workout plans",
+        "imported_count": len(imported),
+        "plans": imported
+    }
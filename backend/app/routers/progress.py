@@ -1,32 +1,41 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, and_
+from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
+import logging
 
 from app.database import get_db
 from app.models.models import (
-    User, 
     Exercise, 
     WorkoutSession, 
     SessionExercise, 
     ExerciseSet,
     UserProgramProgress,
     WorkoutPlan,
-    PlanExercise
+    PlanExercise,
+    MuscleGroup,
+    ExerciseMuscle,
+    WeeklyExerciseVolume
 )
-from app.services.auth import get_current_active_user
+from app.services.auth import get_current_identity
+from app.services.user_cache import UserIdentity
+from app.services.plan_exercises import exercise_source_id
+from app.services.upsert import upsert_user_progress
+from app.services.volume_rollup import week_start
+from app.services.performance_history import exercise_history_page, HISTORY_PAGE_SIZE, MAX_HISTORY_PAGE_SIZE
 from app.schemas.user_progress import (
     UserProgressBatchUpdatePayload,
     UserProgressBatchUpdateResponse,
     UserProgressUpdateItem,
-    UserProgressResponseItem
+    UserProgressResponseItem,
+    UserProgressItemResult,
+    MuscleVolumeResponse,
+    ExerciseHistoryPage
 )
 
-router = APIRouter(
-    prefix="/progress",
-    tags=["progress"]
-)
+router = APIRouter()
 
 @router.get("/exercises/{exercise_id}")
 async def get_exercise_progress(
@@ -34,7 +43,7 @@ async def get_exercise_progress(
     time_period: Optional[str] = Query("all", enum=["week", "month", "3months", "6months", "year", "all"]),
     metric: Optional[str] = Query("weight", enum=["weight", "volume", "reps"]),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Get progress data for a specific exercise.
@@ -143,11 +152,41 @@ async def get_exercise_progress(
         "personal_records": personal_records
     }
 
+@router.get("/exercises/{exercise_id}/history", response_model=ExerciseHistoryPage)
+async def get_exercise_history(
+    exercise_id: int,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(get_current_identity)
+):
+    """
+    Get the user's logged sets for an exercise, one session per entry, newest first.
+    Paginated with an opaque cursor: pass next_cursor from the previous page to
+    continue, until it comes back empty.
+    """
+    exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
+    if not exercise:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Exercise not found"
+        )
+    
+    try:
+        items, next_cursor = exercise_history_page(db, current_user.id, exercise_id, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    return {"exercise_id": exercise_id, "items": items, "next_cursor": next_cursor}
+
 @router.get("/volume")
 async def get_volume_progress(
     time_period: Optional[str] = Query("month", enum=["week", "month", "3months", "6months", "year", "all"]),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Get total workout volume progress over time.
@@ -212,7 +251,7 @@ async def get_volume_progress(
 async def get_workout_frequency(
     time_period: Optional[str] = Query("month", enum=["week", "month", "3months", "6months", "year", "all"]),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Get workout frequency data.
@@ -302,7 +341,7 @@ async def get_workout_frequency(
 @router.get("/records")
 async def get_personal_records(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Get personal records for all exercises the user has performed.
@@ -396,7 +435,7 @@ async def get_personal_records(
 @router.get("/summary")
 async def get_workout_summary(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Get a summary of recent workout activity and stats.
@@ -444,16 +483,65 @@ async def get_workout_summary(
         "recent_sessions": recent_sessions # Consider creating a simpler response schema here
     }
 
+@router.get("/muscle-volume", response_model=MuscleVolumeResponse)
+async def get_muscle_volume(
+    weeks: int = Query(12, ge=1, le=104),
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(get_current_identity)
+):
+    """
+    Get weekly hard sets and tonnage per muscle group for the last few weeks.
+    Read from the weekly_exercise_volume rollup joined to exercise_muscles, so
+    primary muscles get full credit and secondary muscles their fractional weight.
+    """
+    first_week = week_start(datetime.utcnow()) - timedelta(weeks=weeks - 1)
+    
+    hard_sets = func.sum(WeeklyExerciseVolume.hard_sets * ExerciseMuscle.weight)
+    tonnage = func.sum(WeeklyExerciseVolume.tonnage * ExerciseMuscle.weight)
+    rows = db.query(
+        WeeklyExerciseVolume.week_start,
+        MuscleGroup.name,
+        hard_sets,
+        tonnage
+    ).join(
+        ExerciseMuscle, ExerciseMuscle.exercise_id == WeeklyExerciseVolume.exercise_id
+    ).join(
+        MuscleGroup, MuscleGroup.id == ExerciseMuscle.muscle_group_id
+    ).filter(
+        WeeklyExerciseVolume.user_id == current_user.id,
+        WeeklyExerciseVolume.week_start >= first_week
+    ).group_by(
+        WeeklyExerciseVolume.week_start, MuscleGroup.id, MuscleGroup.name
+    ).having(
+        (hard_sets > 0) | (tonnage > 0)
+    ).order_by(
+        WeeklyExerciseVolume.week_start, MuscleGroup.name
+    ).all()
+    
+    weeks_data = []
+    for week, muscle_group, week_sets, week_tonnage in rows:
+        if not weeks_data or weeks_data[-1]["week_start"] != week:
+            weeks_data.append({"week_start": week, "muscles": []})
+        weeks_data[-1]["muscles"].append({
+            "muscle_group": muscle_group,
+            "hard_sets": round(float(week_sets or 0), 2),
+            "tonnage": round(float(week_tonnage or 0), 2)
+        })
+    
+    return {"weeks": weeks_data}
+
 @router.post("/batch-update", response_model=UserProgressBatchUpdateResponse)
 async def batch_update_user_progress(
     payload: UserProgressBatchUpdatePayload,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Updates multiple UserProgramProgress records for the current user 
     based on a workout plan ID and a list of exercise updates.
     Primarily used to set initial weights when starting a plan.
+    All changes are written with a single bulk upsert, and the response
+    reports whether each exercise was created, updated, unchanged or failed.
     """
     # Determine which plan ID to use (support both field names for backwards compatibility)
     workout_plan_id = payload.workout_plan_id
@@ -472,124 +560,94 @@ async def batch_update_user_progress(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                            detail="You don't have access to this workout plan")
 
-    updated_count = 0
-    not_found_exercises = []
-    failed_updates = []
-    
-    # Map of exercise IDs to updates for easier lookup
+    # Map of exercise IDs to updates for easier lookup (last update wins for duplicates)
     exercise_updates = {item.exercise_id: item for item in payload.updates}
     exercise_ids = list(exercise_updates.keys())
     
-    # First, get ALL existing records for these exercises
-    existing_records = db.query(UserProgramProgress).filter(
-        UserProgramProgress.user_id == current_user.id,
-        UserProgramProgress.workout_plan_id == workout_plan_id,
-        UserProgramProgress.exercise_id.in_(exercise_ids)
-    ).all()
-    
-    # Map existing records by exercise_id for easier lookup
-    existing_records_map = {record.exercise_id: record for record in existing_records}
+    # One query for the stored progress of every exercise in the payload
+    existing_records_map = {
+        record.exercise_id: record
+        for record in db.query(UserProgramProgress).filter(
+            UserProgramProgress.user_id == current_user.id,
+            UserProgramProgress.workout_plan_id == workout_plan_id,
+            UserProgramProgress.exercise_id.in_(exercise_ids)
+        )
+    }
     
-    # Identify exercises that need new records
-    missing_exercise_ids = [
-        exercise_id for exercise_id in exercise_ids 
-        if exercise_id not in existing_records_map
-    ]
+    # One query to check the exercises exist and get the plan's target reps as defaults
+    plan_reps = {
+        row.id: row.reps
+        for row in db.query(Exercise.id, func.min(PlanExercise.reps).label("reps"))
+        .outerjoin(PlanExercise, and_(
+            PlanExercise.exercise_id == Exercise.id,
+            PlanExercise.workout_plan_id == exercise_source_id(plan)
+        ))
+        .filter(Exercise.id.in_(exercise_ids))
+        .group_by(Exercise.id)
+    }
     
-    # Create records for missing exercises
-    if missing_exercise_ids:
-        # Fetch plan exercise details for these exercises
-        plan_exercises = db.query(PlanExercise).filter(
-            PlanExercise.workout_plan_id == workout_plan_id,
-            PlanExercise.exercise_id.in_(missing_exercise_ids)
-        ).all()
-        
-        # Map plan exercises by exercise_id
-        plan_exercises_map = {pe.exercise_id: pe for pe in plan_exercises}
-        
-        # Create missing records one by one with error handling
-        for exercise_id in missing_exercise_ids:
-            try:
-                # Get update item
-                update_item = exercise_updates[exercise_id]
-                
-                # Get plan exercise for default reps if available
-                plan_exercise = plan_exercises_map.get(exercise_id)
-                target_reps = plan_exercise.reps if plan_exercise else None
-                
-                # Create new record
-                new_progress = UserProgramProgress(
-                    user_id=current_user.id,
-                    workout_plan_id=workout_plan_id,
-                    exercise_id=exercise_id,
-                    current_weight=update_item.current_weight,
-                    current_reps=update_item.current_reps or target_reps,
-                    next_weight=update_item.current_weight,  # Initialize next_weight with current_weight
-                    next_reps=update_item.current_reps or target_reps,
-                    progression_status=0
-                )
-                
-                db.add(new_progress)
-                try:
-                    db.flush()  # Try to flush each record individually
-                    updated_count += 1
-                except Exception as e:
-                    db.rollback()
-                    print(f"Error creating progress record for exercise {exercise_id}: {str(e)}")
-                    failed_updates.append(exercise_id)
-                    continue
-            except Exception as e:
-                print(f"Error processing exercise {exercise_id}: {str(e)}")
-                failed_updates.append(exercise_id)
-                continue
-    
-    # Now update existing records
-    for record in existing_records:
-        exercise_id = record.exercise_id
-        update_item = exercise_updates.get(exercise_id)
+    results = []
+    upsert_rows = []
+    for exercise_id, update_item in exercise_updates.items():
+        if exercise_id not in plan_reps:
+            results.append(UserProgressItemResult(
+                exercise_id=exercise_id, status="failed", detail="Exercise not found"
+            ))
+            continue
         
-        if not update_item:
+        record = existing_records_map.get(exercise_id)
+        if record is None:
+            # New record: fall back to the plan's target reps
+            reps = update_item.current_reps or plan_reps[exercise_id]
+            upsert_rows.append({
+                "user_id": current_user.id,
+                "workout_plan_id": workout_plan_id,
+                "exercise_id": exercise_id,
+                "current_weight": update_item.current_weight,
+                "current_reps": reps,
+                "next_weight": update_item.current_weight,  # Initialize next_weight with current_weight
+                "next_reps": reps,
+                "progression_status": 0
+            })
+            results.append(UserProgressItemResult(exercise_id=exercise_id, status="created"))
             continue
-            
-        try:
-            update_made = False
-            # Update fields if they are provided in the request
-            if update_item.current_weight is not None and record.current_weight != update_item.current_weight:
-                record.current_weight = update_item.current_weight
-                # When setting initial weight, also set next_weight if it's not already set by progression
-                if record.next_weight is None:
-                     record.next_weight = update_item.current_weight
-                update_made = True
-
-            if update_item.current_reps is not None and record.current_reps != update_item.current_reps:
-                record.current_reps = update_item.current_reps
-                # When setting initial reps, also set next_reps if it's not already set by progression
-                if record.next_reps is None:
-                     record.next_reps = update_item.current_reps
-                update_made = True
-
-            if update_made:
-                updated_count += 1
-        except Exception as e:
-            print(f"Error updating progress record for exercise {exercise_id}: {str(e)}")
-            failed_updates.append(exercise_id)
+        
+        weight_changed = (update_item.current_weight is not None
+                          and record.current_weight != update_item.current_weight)
+        reps_changed = (update_item.current_reps is not None
+                        and record.current_reps != update_item.current_reps)
+        if not (weight_changed or reps_changed):
+            results.append(UserProgressItemResult(exercise_id=exercise_id, status="unchanged"))
             continue
+        
+        # Existing record: only the provided values are applied by the upsert
+        upsert_rows.append({
+            "user_id": current_user.id,
+            "workout_plan_id": workout_plan_id,
+            "exercise_id": exercise_id,
+            "current_weight": update_item.current_weight,
+            "current_reps": update_item.current_reps,
+            "next_weight": update_item.current_weight,
+            "next_reps": update_item.current_reps,
+            "progression_status": 0
+        })
+        results.append(UserProgressItemResult(exercise_id=exercise_id, status="updated"))
     
-    # Commit all successful changes
     try:
+        upsert_user_progress(db, upsert_rows)
         db.commit()
-        print(f"Committed {updated_count} progress updates.")
-    except Exception as e:
+    except SQLAlchemyError:
         db.rollback()
-        print(f"Database error during batch update: {e}")
+        logging.exception("Database error during batch update")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
-                          detail=f"Database error during update: {str(e)}")
+                          detail="Database error during update")
 
-    # Report on failures if any
-    if failed_updates:
-        print(f"Failed to update {len(failed_updates)} exercises: {failed_updates}")
+    updated_count = sum(1 for result in results if result.status in ("created", "updated"))
+    failed_count = sum(1 for result in results if result.status == "failed")
         
     return UserProgressBatchUpdateResponse(
-        message=f"Successfully updated {updated_count} progress records. Failed: {len(failed_updates)}",
-        updated_count=updated_count
-    ) 
\ No newline at end of file
+        message=f"Successfully updated {updated_count} progress records. Failed: {failed_count}",
+        updated_count=updated_count,
+        failed_count=failed_count,
+        results=results
+    )
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import desc, func
 from typing import List, Optional
+from collections import defaultdict
 from datetime import datetime
 
 from app.database import get_db
@@ -12,7 +13,6 @@ from app.models.models import (
     WorkoutPlan, 
     PlanExercise,
     Exercise,
-    User,
     UserProgramProgress
 )
 from app.schemas.workout_session import (
@@ -24,17 +24,34 @@ from app.schemas.workout_session import (
     SessionExerciseResponse,
     ExerciseSetCreate,
     ExerciseSetUpdate,
-    ExerciseSetResponse
+    ExerciseSetResponse,
+    ExerciseLastPerformance
 )
-from app.services.auth import get_current_active_user
+from app.services.auth import get_current_identity
+from app.services.user_cache import UserIdentity
+from app.services.plan_exercises import exercise_source_id
+from app.services.volume_rollup import (
+    apply_volume_deltas,
+    record_set_change,
+    remove_logged_volume,
+    set_volume,
+    week_start,
+)
+from app.services.performance_history import last_performances, MAX_PERFORMANCES
 
 router = APIRouter()
 
+def _attach_last_performance(db: Session, user_id: int, workout_session: WorkoutSession):
+    """Set last_performance on each session exercise so the client can show what was done last time."""
+    performances = last_performances(db, user_id, [sess_ex.exercise_id for sess_ex in workout_session.exercises])
+    for sess_ex in workout_session.exercises:
+        sess_ex.last_performance = performances.get(sess_ex.exercise_id, [])
+
 @router.post("", response_model=WorkoutSessionResponse)
 async def create_workout_session(
     session: WorkoutSessionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Start a new workout session.
@@ -77,6 +94,7 @@ async def create_workout_session(
                 
                 # Return the existing session instead of creating a new one
                 # This prevents duplicate entries
+                _attach_last_performance(db, current_user.id, existing_session)
                 return existing_session
     
     # Create new workout session
@@ -96,10 +114,14 @@ async def create_workout_session(
     
     # Add exercises if provided
     if session.exercises:
+        # {exercise_id: [hard sets, tonnage]} added to the weekly rollup in one upsert
+        volume_deltas = defaultdict(lambda: [0, 0.0])
         for i, exercise_data in enumerate(session.exercises):
             # Verify exercise exists
             exercise = db.query(Exercise).filter(Exercise.id == exercise_data.exercise_id).first()
             if not exercise:
+                # Drop the exercises and volume added so far, then the session itself
+                db.rollback()
                 db.delete(db_session)
                 db.commit()
                 raise HTTPException(
@@ -118,35 +140,37 @@ async def create_workout_session(
                 # We might need to decide how manually added exercises interact with progress
             )
             db.add(db_session_exercise)
-            # Commit and refresh removed from here to bulk add later
+            # Flush to get the session exercise id for its sets
+            db.flush()
 
             # Add sets if provided
             if exercise_data.sets:
-                sets_to_add = []
                 for j, set_data in enumerate(exercise_data.sets):
                     db_set = ExerciseSet(
-                        session_exercise_id=db_session_exercise.id, # Need ID first
+                        session_exercise_id=db_session_exercise.id,
                         reps=set_data.reps,
                         weight=set_data.weight, # Manual weight for this set
                         set_number=set_data.set_number if set_data.set_number is not None else j + 1,
                         is_warmup=set_data.is_warmup,
                         perceived_effort=set_data.perceived_effort
                     )
-                    sets_to_add.append(db_set)
-                # Commit needs db_session_exercise.id, so commit exercise first
-                db.commit()
-                db.refresh(db_session_exercise)
-                # Now add sets
-                db.add_all(sets_to_add)
-                db.commit()
+                    db.add(db_set)
+                    hard_sets, tonnage = set_volume(set_data.reps, set_data.weight, set_data.is_warmup)
+                    volume_deltas[exercise_data.exercise_id][0] += hard_sets
+                    volume_deltas[exercise_data.exercise_id][1] += tonnage
 
+        apply_volume_deltas(
+            db, db_session.user_id, week_start(db_session.start_time),
+            {exercise_id: tuple(delta) for exercise_id, delta in volume_deltas.items()}
+        )
+        db.commit()
         db.refresh(db_session)
     
     # If based on a workout plan but no exercises provided, auto-populate from plan
     elif session.workout_plan_id and not session.exercises:
         # Base query for plan exercises
         plan_exercises_query = db.query(PlanExercise).filter(
-            PlanExercise.workout_plan_id == session.workout_plan_id
+            PlanExercise.workout_plan_id == exercise_source_id(workout_plan)
         )
         
         # If day_of_week is provided, filter exercises by that day
@@ -234,6 +258,9 @@ async def create_workout_session(
                  sess_ex.current_weight = None
                  sess_ex.current_reps = None
 
+    if created_session:
+        _attach_last_performance(db, current_user.id, created_session)
+
     return created_session
 
 @router.get("", response_model=List[WorkoutSessionResponse])
@@ -244,7 +271,7 @@ async def get_workout_sessions(
     end_date: Optional[datetime] = None,
     workout_plan_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Get all workout sessions for the current user.
@@ -271,11 +298,29 @@ async def get_workout_sessions(
     
     return sessions
 
+@router.get("/last-performance", response_model=List[ExerciseLastPerformance])
+async def get_last_performance(
+    exercise_ids: List[int] = Query(..., min_length=1, max_length=100),
+    limit: int = Query(1, ge=1, le=MAX_PERFORMANCES),
+    db: Session = Depends(get_db),
+    current_user: UserIdentity = Depends(get_current_identity)
+):
+    """
+    Get the sets the user logged the last few times they did each exercise,
+    from completed sessions only, newest first. Exercises without history
+    come back with no performances.
+    """
+    performances = last_performances(db, current_user.id, exercise_ids, limit=limit)
+    return [
+        {"exercise_id": exercise_id, "performances": performances.get(exercise_id, [])}
+        for exercise_id in dict.fromkeys(exercise_ids)
+    ]
+
 @router.get("/{session_id}", response_model=WorkoutSessionResponse)
 async def get_workout_session(
     session_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Get a specific workout session by ID, including user progress data.
@@ -319,7 +364,7 @@ async def update_workout_session(
     session_id: int,
     session_update: WorkoutSessionUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Update a workout session.
@@ -358,7 +403,7 @@ async def update_workout_session(
 async def delete_workout_session(
     session_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Delete a workout session.
@@ -374,6 +419,9 @@ async def delete_workout_session(
             detail="Workout session not found"
         )
     
+    # Take the session's sets out of the weekly volume rollup first
+    remove_logged_volume(db, db_session)
+    
     # Delete session (cascade will delete associated exercises and sets)
     db.delete(db_session)
     db.commit()
@@ -385,7 +433,7 @@ async def get_sessions_by_plan(
     plan_id: int,
     status: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Get all workout sessions for a specific workout plan,
@@ -431,7 +479,7 @@ async def add_exercise_to_session(
     session_id: int,
     exercise: SessionExerciseCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Add an exercise to an ongoing workout session.
@@ -476,7 +524,7 @@ async def add_exercise_to_session(
     # If session is linked to a plan, get PlanExercise and UserProgramProgress details
     if db_session.workout_plan_id:
         plan_exercise_query = db.query(PlanExercise).filter(
-            PlanExercise.workout_plan_id == db_session.workout_plan_id,
+            PlanExercise.workout_plan_id == exercise_source_id(db_session.workout_plan),
             PlanExercise.exercise_id == exercise.exercise_id
         )
 
@@ -572,7 +620,7 @@ async def update_session_exercise(
     exercise_id: int,
     exercise_update: SessionExerciseUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Update an exercise in a workout session.
@@ -617,7 +665,7 @@ async def remove_exercise_from_session(
     session_id: int,
     exercise_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Remove an exercise from a workout session.
@@ -646,6 +694,9 @@ async def remove_exercise_from_session(
             detail="Exercise not found in this workout session"
         )
     
+    # Take its sets out of the weekly volume rollup first
+    remove_logged_volume(db, db_session, session_exercise_id=db_session_exercise.id)
+    
     # Delete the session exercise (cascade will delete associated sets)
     db.delete(db_session_exercise)
     db.commit()
@@ -660,7 +711,7 @@ async def add_set_to_exercise(
     exercise_id: int,
     set_data: ExerciseSetCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Add a set to an exercise in a workout session.
@@ -711,6 +762,10 @@ async def add_set_to_exercise(
     )
     
     db.add(db_set)
+    record_set_change(
+        db, db_session, db_session_exercise.exercise_id,
+        after=(set_data.reps, set_data.weight, set_data.is_warmup)
+    )
     
     # Update sets_completed count
     if not set_data.is_warmup:
@@ -728,7 +783,7 @@ async def update_exercise_set(
     set_id: int,
     set_update: ExerciseSetUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Update a set in an exercise.
@@ -769,6 +824,8 @@ async def update_exercise_set(
             detail="Set not found for this exercise"
         )
     
+    before = (db_set.reps, db_set.weight, db_set.is_warmup)
+    
     # Check if warmup status is changing
     was_warmup = db_set.is_warmup
     will_be_warmup = set_update.is_warmup if set_update.is_warmup is not None else was_warmup
@@ -789,6 +846,12 @@ async def update_exercise_set(
     elif not was_warmup and will_be_warmup:
         db_session_exercise.sets_completed -= 1
     
+    record_set_change(
+        db, db_session, db_session_exercise.exercise_id,
+        before=before,
+        after=(db_set.reps, db_set.weight, db_set.is_warmup)
+    )
+    
     db.commit()
     db.refresh(db_set)
     
@@ -800,7 +863,7 @@ async def delete_exercise_set(
     exercise_id: int,
     set_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Delete a set from an exercise.
@@ -845,6 +908,11 @@ async def delete_exercise_set(
     if not db_set.is_warmup:
         db_session_exercise.sets_completed -= 1
     
+    record_set_change(
+        db, db_session, db_session_exercise.exercise_id,
+        before=(db_set.reps, db_set.weight, db_set.is_warmup)
+    )
+    
     # Delete the set
     db.delete(db_set)
     db.commit()
@@ -855,7 +923,7 @@ async def delete_exercise_set(
 async def end_workout_session(
     session_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserIdentity = Depends(get_current_identity)
 ):
     """
     Mark a workout session as completed and apply progression logic.
@@ -887,11 +955,12 @@ async def end_workout_session(
     # Apply progression logic if the session is linked to a plan
     if db_session.workout_plan_id:
         progress_updates = [] # Collect progress records to update
+        plan_source_id = exercise_source_id(db_session.workout_plan)
 
         for sess_ex in db_session.exercises:
             # Find the corresponding PlanExercise for progression rules
             plan_exercise_query = db.query(PlanExercise).filter(
-                PlanExercise.workout_plan_id == db_session.workout_plan_id,
+                PlanExercise.workout_plan_id == plan_source_id,
                 PlanExercise.exercise_id == sess_ex.exercise_id
             )
             if db_session.day_of_week:
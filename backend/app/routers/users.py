@@ -9,7 +9,7 @@ from app.schemas.user import UserResponse, UserUpdate
 from app.services.auth import (
     get_current_active_user,
     get_current_admin_user,
-    get_password_hash,
+    get_password_hash_async,
 )
 
 router = APIRouter()
@@ -69,7 +69,7 @@ async def update_current_user(
     if user_update.email:
         current_user.email = user_update.email
     if user_update.password:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        current_user.hashed_password = await get_password_hash_async(user_update.password)
     if user_update.profile_picture is not None:
         current_user.profile_picture = user_update.profile_picture
     if user_update.settings is not None:
@@ -153,6 +153,7 @@ async def mark_onboarding_complete(
         has_completed_onboarding=current_user.has_completed_onboarding,
         created_at=current_user.created_at,
         last_login=current_user.last_login,
+        last_seen=current_user.last_seen,
         profile_picture=current_user.profile_picture,
         settings=refreshed_user_settings # Use the deserialized dictionary here
     )
@@ -220,6 +221,7 @@ async def get_users(
                 has_completed_onboarding=user.has_completed_onboarding,
                 created_at=user.created_at,
                 last_login=user.last_login,
+                last_seen=user.last_seen,
                 profile_picture=user.profile_picture,
                 settings=user_settings # Pass the processed dict/None here
             )
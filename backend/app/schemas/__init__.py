@@ -9,15 +9,23 @@ from app.schemas.exercise import (
     ExerciseCreate,
     ExerciseUpdate,
     ExerciseResponse,
+    FacetValue,
+    ExerciseFacetsResponse,
+    ExerciseSuggestion,
+    ExerciseSubstitute,
 )
 
 from app.schemas.workout_plan import (
     WorkoutPlanCreate,
     WorkoutPlanUpdate,
     WorkoutPlanResponse,
+    WorkoutPlanBatchEdit,
+    WorkoutPlanImportResult,
+    WorkoutPlanBundleImportResponse,
     PlanExerciseCreate,
     PlanExerciseUpdate,
     PlanExerciseResponse,
+    PlanExerciseBatchUpdate,
 )
 
 from app.schemas.workout_session import (
@@ -30,6 +38,8 @@ from app.schemas.workout_session import (
     ExerciseSetCreate,
     ExerciseSetUpdate,
     ExerciseSetResponse,
+    ExercisePerformance,
+    ExerciseLastPerformance,
 )
 
 from app.schemas.shared_plan import (
@@ -40,4 +50,5 @@ from app.schemas.shared_plan import (
 from app.schemas.token import (
     Token,
     TokenData,
+    RefreshTokenRequest,
 ) 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class ExerciseBase(BaseModel):
@@ -40,4 +40,35 @@ class ExerciseResponse(ExerciseBase):
     created_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+class ExerciseFacetsResponse(BaseModel):
+    # Exercises matching every applied filter
+    total: int
+    category: List[FacetValue] = []
+    equipment: List[FacetValue] = []
+    muscle_group: List[FacetValue] = []
+
+class ExerciseSuggestion(BaseModel):
+    id: int
+    name: str
+    category: Optional[str] = None
+    equipment: Optional[str] = None
+    muscle_group: Optional[str] = None
+    is_system: bool
+    # Text match plus the boost from the user's own usage
+    score: float
+
+class ExerciseSubstitute(BaseModel):
+    id: int
+    name: str
+    category: Optional[str] = None
+    equipment: Optional[str] = None
+    muscle_group: Optional[str] = None
+    difficulty_level: Optional[str] = None
+    is_system: bool
+    # Muscle overlap plus matching category, equipment and difficulty, 0 to 1
+    similarity: float
@@ -4,6 +4,12 @@ from typing import Optional
 class Token(BaseModel):
     access_token: str
     token_type: str
+    # Exchange at /api/auth/refresh for a new pair before the access token expires
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None # Access token lifetime in seconds
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -23,6 +23,7 @@ class UserResponse(UserBase):
     has_completed_onboarding: bool
     created_at: datetime
     last_login: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
     profile_picture: Optional[str] = None
     settings: Optional[Dict[str, Any]] = None
 
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, validator, Field
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Literal
+from datetime import datetime, date
+from app.schemas.workout_session import ExercisePerformance
 
 # Schema for a single progress update item in the batch request
 class UserProgressUpdateItem(BaseModel):
@@ -40,8 +41,34 @@ class UserProgressResponseItem(BaseModel):
     class Config:
         from_attributes = True
 
+# Outcome of a single item in a batch update
+class UserProgressItemResult(BaseModel):
+    exercise_id: int
+    status: Literal["created", "updated", "unchanged", "failed"]
+    detail: Optional[str] = None
+
 class UserProgressBatchUpdateResponse(BaseModel):
     message: str
     updated_count: int
-    # Optionally return the updated records
-    # updated_records: List[UserProgressResponseItem] = []
\ No newline at end of file
+    failed_count: int = 0
+    results: List[UserProgressItemResult] = []
+
+# Weekly volume per muscle group
+class MuscleVolumeEntry(BaseModel):
+    muscle_group: str
+    hard_sets: float # Secondary muscles get fractional credit
+    tonnage: float # kg
+
+class MuscleVolumeWeek(BaseModel):
+    week_start: date
+    muscles: List[MuscleVolumeEntry] = []
+
+class MuscleVolumeResponse(BaseModel):
+    weeks: List[MuscleVolumeWeek] = []
+
+# One page of an exercise's logged history, newest first
+class ExerciseHistoryPage(BaseModel):
+    exercise_id: int
+    items: List[ExercisePerformance] = []
+    # Pass back as ?cursor= for the next page; None on the last page
+    next_cursor: Optional[str] = None
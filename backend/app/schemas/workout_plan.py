@@ -72,10 +72,23 @@ class WorkoutPlanUpdate(BaseModel):
     days_per_week: Optional[int] = None
     duration_weeks: Optional[int] = None
 
+class PlanExerciseBatchUpdate(PlanExerciseUpdate):
+    id: int
+
+class WorkoutPlanBatchEdit(BaseModel):
+    # Version the client last saw; a mismatch means someone else saved in between
+    version: Optional[int] = None
+    plan: Optional[WorkoutPlanUpdate] = None
+    add: List[PlanExerciseCreate] = []
+    update: List[PlanExerciseBatchUpdate] = []
+    remove: List[int] = []
+
 class WorkoutPlanResponse(WorkoutPlanBase):
     id: int
     owner_id: int
     created_at: datetime
+    version: int = 1
+    template_plan_id: Optional[int] = None
     exercises: List[PlanExerciseResponse] = []
     exercises_count: Optional[int] = None
     is_active_for_current_user: bool = False
@@ -84,6 +97,18 @@ class WorkoutPlanResponse(WorkoutPlanBase):
         from_attributes = True
         arbitrary_types_allowed = True
 
+class WorkoutPlanImportResult(BaseModel):
+    id: int
+    name: str
+    exercises_count: int
+    # Entries whose exercise matched neither by id nor by name
+    skipped_exercises: int = 0
+
+class WorkoutPlanBundleImportResponse(BaseModel):
+    message: str
+    imported_count: int
+    plans: List[WorkoutPlanImportResult] = []
+
 # User Program Progress schemas
 class UserProgramProgressBase(BaseModel):
     user_id: int
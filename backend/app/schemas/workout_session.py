@@ -28,6 +28,18 @@ class ExerciseSetResponse(ExerciseSetBase):
     class Config:
         from_attributes = True
 
+# One earlier time the user did an exercise, with the sets they logged
+class ExercisePerformance(BaseModel):
+    session_id: int
+    session_exercise_id: int
+    start_time: datetime
+    sets: List[ExerciseSetResponse] = []
+
+class ExerciseLastPerformance(BaseModel):
+    exercise_id: int
+    # Most recent completed session first
+    performances: List[ExercisePerformance] = []
+
 # Session Exercise schemas
 class SessionExerciseBase(BaseModel):
     exercise_id: int
@@ -56,6 +68,8 @@ class SessionExerciseResponse(SessionExerciseBase):
     # target_reps: Optional[int] = None # Removed
     rest_seconds: Optional[int] = None
     sets_count: Optional[int] = None
+    # What the user did last time, filled in when a session is started
+    last_performance: List[ExercisePerformance] = []
     
     @property
     def name(self) -> Optional[str]:
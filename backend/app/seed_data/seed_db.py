@@ -16,13 +16,13 @@ Options:
 import sys
 import argparse
 from typing import List, Dict, Any, Optional
-import bcrypt
 from sqlalchemy.orm import Session
 import json
 import os
 
 from app.database import SessionLocal, engine, Base
 from app.models.models import User, Exercise, WorkoutPlan, PlanExercise, ExerciseSet, SessionExercise, WorkoutSession, SharedPlan
+from app.services.password_hashing import hash_password
 
 # Default admin user
 DEFAULT_ADMIN = {
@@ -49,13 +49,6 @@ def clear_tables(db: Session):
     # db.query(User).delete() # Comment out this line
     db.commit()
 
-def hash_password(password: str) -> str:
-    """Hash a password for storage."""
-    password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
-
 def seed_users(db: Session):
     """Finds the first created user to associate seed data with or creates a default admin if none exists."""
     # Query for the first user based on ID
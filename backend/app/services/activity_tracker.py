@@ -0,0 +1,161 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+
+from app.models.models import User
+from app.services.user_cache import user_cache
+
+# Seconds between bulk writes of buffered activity; 0 disables the background flusher
+ACTIVITY_FLUSH_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_FLUSH_INTERVAL_SECONDS", "5"))
+
+# Users buffered at once; activity from further users is dropped until the next flush
+ACTIVITY_BUFFER_SIZE = int(os.getenv("ACTIVITY_BUFFER_SIZE", "10000"))
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class ActivityTracker:
+    """
+    Buffers when each user was last seen and last logged in, so requests never
+    write to the users table themselves. Buffered timestamps are written with a
+    single UPDATE every ACTIVITY_FLUSH_INTERVAL_SECONDS and on shutdown; repeated
+    activity by the same user between flushes costs one dict assignment.
+    """
+
+    def __init__(self, max_users: int = ACTIVITY_BUFFER_SIZE, interval: float = ACTIVITY_FLUSH_INTERVAL_SECONDS):
+        self.max_users = max_users
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # {user_id: [last_seen, last_login or None]}
+        self._pending: Dict[int, list] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._dropped = 0
+        self._flushes = 0
+        self._flush_errors = 0
+        self._users_flushed = 0
+        self._last_flush_at: Optional[datetime] = None
+        self._last_flush_seconds = 0.0
+
+    def record(self, user_id: int, login: bool = False):
+        """Note that the user made a request (or logged in) just now."""
+        now = _now()
+        with self._lock:
+            entry = self._pending.get(user_id)
+            if entry is None:
+                if len(self._pending) >= self.max_users:
+                    self._dropped += 1
+                    return
+                entry = self._pending[user_id] = [now, None]
+            entry[0] = now
+            if login:
+                entry[1] = now
+
+    def flush(self, db: Session) -> int:
+        """Write the buffered timestamps in one UPDATE; returns how many users were written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            started = time.monotonic()
+            last_seen = {user_id: entry[0] for user_id, entry in pending.items()}
+            last_login = {user_id: entry[1] for user_id, entry in pending.items() if entry[1] is not None}
+            values = {"last_seen": case(last_seen, value=User.id)}
+            if last_login:
+                values["last_login"] = case(last_login, value=User.id, else_=User.last_login)
+            try:
+                db.execute(
+                    update(User).where(User.id.in_(last_seen)).values(**values),
+                    execution_options={"synchronize_session": False}
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._requeue(pending)
+                with self._lock:
+                    self._flush_errors += 1
+                raise
+
+            # last_login is shown to users; last_seen alone is not worth evicting cached users for
+            for user_id in last_login:
+                user_cache.invalidate(user_id)
+            with self._lock:
+                self._flushes += 1
+                self._users_flushed += len(pending)
+                self._last_flush_at = _now()
+                self._last_flush_seconds = time.monotonic() - started
+            return len(pending)
+
+    def _requeue(self, pending: Dict[int, list]):
+        # Keep a failed batch for the next flush, behind anything recorded since
+        with self._lock:
+            for user_id, entry in pending.items():
+                current = self._pending.get(user_id)
+                if current is not None:
+                    current[1] = current[1] or entry[1]
+                elif len(self._pending) < self.max_users:
+                    self._pending[user_id] = entry
+                else:
+                    self._dropped += 1
+
+    def _flush_with_new_session(self):
+        db = self._session_factory()
+        try:
+            self.flush(db)
+        except Exception as e:
+            logging.warning(f"Failed to flush user activity: {str(e)}")
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._flush_with_new_session()
+
+    def start(self, session_factory: Callable[[], Session]):
+        """Flush in a background thread every interval, using sessions from session_factory."""
+        self._session_factory = session_factory
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="activity-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background flusher and write whatever is still buffered."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._session_factory is not None:
+            self._flush_with_new_session()
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffer occupancy and flush totals since startup."""
+        with self._lock:
+            return {
+                "interval_seconds": self.interval,
+                "max_users": self.max_users,
+                "pending_users": len(self._pending),
+                "dropped": self._dropped,
+                "flushes": self._flushes,
+                "flush_errors": self._flush_errors,
+                "users_flushed": self._users_flushed,
+                "last_flush_at": self._last_flush_at,
+                "last_flush_seconds": round(self._last_flush_seconds, 6),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+activity_tracker = ActivityTracker()
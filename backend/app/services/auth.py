@@ -2,7 +2,6 @@ import os
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -10,29 +9,33 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.models import User
 from app.schemas.token import TokenData
+from app.services.activity_tracker import activity_tracker
+from app.services.user_cache import user_cache, UserIdentity
+from app.services import password_hashing
 
 # Debug prints for token expiry
 print(f"Token expiry from env: {os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES')}")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
 print(f"Final token expiry: {ACCESS_TOKEN_EXPIRE_MINUTES}")
 
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 def verify_password(plain_password, hashed_password):
     """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hashing.verify_password(plain_password, hashed_password)
 
 def get_password_hash(password):
     """Generate a password hash."""
-    return pwd_context.hash(password)
+    return password_hashing.hash_password(password)
+
+async def get_password_hash_async(password):
+    """Generate a password hash on the password hashing pool, off the event loop."""
+    return await password_hashing.hash_password_async(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
@@ -48,8 +51,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get the current user from the JWT token."""
+def decode_access_token(token: str) -> TokenData:
+    """Decode and validate a JWT access token, raising 401 if it is not usable."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -66,18 +69,47 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         if username is None or user_id is None:
             raise credentials_exception
             
-        token_data = TokenData(username=username, user_id=user_id, is_admin=is_admin)
+        return TokenData(username=username, user_id=user_id, is_admin=is_admin)
     except JWTError:
         raise credentials_exception
-        
-    # Get the user from the database
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+
+def _load_user(db: Session, user_id: int) -> User:
+    """Read the user from the database and cache it, raising 401 if it no longer exists."""
+    version = user_cache.version
+    user = db.query(User).filter(User.id == user_id).first()
     
     if user is None:
-        raise credentials_exception
-        
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user_cache.put(user, version)
     return user
 
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """Get the current user from the JWT token, from the user cache when possible."""
+    token_data = decode_access_token(token)
+    activity_tracker.record(token_data.user_id)
+    
+    cached = user_cache.get(token_data.user_id)
+    if cached is not None:
+        return user_cache.attach(db, cached)
+        
+    return _load_user(db, token_data.user_id)
+
+def get_current_identity(token: str = Depends(oauth2_scheme)) -> UserIdentity:
+    """
+    Get the current user's id, username and admin flag from the access token's claims.
+    For endpoints that need nothing else: no database read at all. Access tokens
+    are short-lived and re-issued from the user row on refresh, so role changes
+    and deleted accounts take effect within ACCESS_TOKEN_EXPIRE_MINUTES.
+    """
+    token_data = decode_access_token(token)
+    activity_tracker.record(token_data.user_id)
+    return UserIdentity(token_data.user_id, token_data.username, bool(token_data.is_admin))
+
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     """Get the current active user."""
     return current_user
@@ -91,14 +123,22 @@ def get_current_admin_user(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
-def authenticate_user(db: Session, username: str, password: str):
-    """Authenticate a user with username and password."""
+async def authenticate_user(db: Session, username: str, password: str):
+    """
+    Authenticate a user with username and password.
+    If the stored hash uses an outdated scheme or cost, it is replaced with a
+    fresh one; the caller's commit saves it.
+    """
     user = db.query(User).filter(User.username == username).first()
     
     if not user:
         return False
         
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hashing.verify_and_update_async(password, user.hashed_password)
+    if not valid:
         return False
+    
+    if new_hash:
+        user.hashed_password = new_hash
         
     return user 
\ No newline at end of file
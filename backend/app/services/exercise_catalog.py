@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.models import Exercise
+from app.schemas.exercise import ExerciseResponse
+from app.services.exercise_search import ExerciseSearchIndex
+from app.services.exercise_substitutes import SubstitutionIndex, exercise_features, similarity
+
+# Upper bound on how stale another worker process can leave the system catalog
+CATALOG_TTL_SECONDS = int(os.getenv("EXERCISE_CATALOG_TTL_SECONDS", "300"))
+
+# Users whose custom exercises are kept in memory at once
+USER_CACHE_SIZE = int(os.getenv("EXERCISE_CATALOG_USER_CACHE_SIZE", "1024"))
+
+# Exercise fields the browser can filter on, in the order facets are returned
+FACET_FIELDS = ("category", "equipment", "muscle_group")
+
+class _Snapshot:
+    """An immutable list of exercises plus a token that changes whenever it is reloaded."""
+
+    def __init__(self, exercises: List[ExerciseResponse]):
+        self.exercises = exercises
+        self.token = uuid.uuid4().hex[:12]
+        self.loaded_at = time.monotonic()
+        self._search_index: Optional[ExerciseSearchIndex] = None
+
+    def expired(self) -> bool:
+        return time.monotonic() - self.loaded_at > CATALOG_TTL_SECONDS
+
+    @property
+    def search_index(self) -> ExerciseSearchIndex:
+        """Autocomplete index over this snapshot, built on first use."""
+        if self._search_index is None:
+            self._search_index = ExerciseSearchIndex(self.exercises)
+        return self._search_index
+
+class ExerciseCatalog:
+    """
+    In-process cache of the exercise library.
+    System exercises are loaded once (at startup or on first use) and each user's
+    custom exercises are cached separately, so the exercise list endpoints can
+    filter in memory. Every route that writes exercises must call invalidate().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held while the system exercises reload, so concurrent misses load them once
+        self._load_lock = threading.Lock()
+        self._system: Optional[_Snapshot] = None
+        self._users: "OrderedDict[int, _Snapshot]" = OrderedDict()
+        self._substitutes: Optional[SubstitutionIndex] = None
+        # Snapshot lookups served from memory vs. reloaded from the database
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, db: Session):
+        """
+        (Re)load the system exercises from the database.
+        The substitution index is built on the first load and only updated
+        for the exercises that changed on later ones.
+        """
+        with self._load_lock:
+            return self._load(db)
+
+    def _load(self, db: Session) -> _Snapshot:
+        exercises = db.query(Exercise).filter(Exercise.is_system == True).order_by(Exercise.id).all()
+        snapshot = _Snapshot([ExerciseResponse.model_validate(exercise) for exercise in exercises])
+        substitutes = self._substitutes
+        if substitutes is None:
+            substitutes = SubstitutionIndex(snapshot.exercises)
+        else:
+            substitutes.sync(snapshot.exercises)
+        with self._lock:
+            self._system = snapshot
+            self._substitutes = substitutes
+        return snapshot
+
+    def _fresh_system_snapshot(self) -> Optional[_Snapshot]:
+        """The cached system snapshot if it has not expired, counted as a hit. Called with the lock held."""
+        snapshot = self._system
+        if snapshot is None or snapshot.expired():
+            return None
+        self.hits += 1
+        return snapshot
+
+    def _system_snapshot(self, db: Session) -> _Snapshot:
+        with self._lock:
+            snapshot = self._fresh_system_snapshot()
+        if snapshot is not None:
+            return snapshot
+
+        with self._load_lock:
+            # Requests that missed while another one was reloading use its result
+            with self._lock:
+                snapshot = self._fresh_system_snapshot()
+                if snapshot is not None:
+                    return snapshot
+                self.misses += 1
+            return self._load(db)
+
+    def _user_snapshot(self, db: Session, user_id: int) -> _Snapshot:
+        with self._lock:
+            snapshot = self._users.get(user_id)
+            if snapshot is not None and not snapshot.expired():
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        exercises = db.query(Exercise).filter(
+            Exercise.created_by == user_id,
+            Exercise.is_system == False
+        ).order_by(Exercise.id).all()
+        snapshot = _Snapshot([ExerciseResponse.model_validate(exercise) for exercise in exercises])
+        with self._lock:
+            self._users[user_id] = snapshot
+            self._users.move_to_end(user_id)
+            while len(self._users) > USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+        return snapshot
+
+    def visible_exercises(self, db: Session, user_id: int) -> Tuple[List[ExerciseResponse], str]:
+        """
+        Return the system exercises merged with the user's own, ordered by id,
+        along with an ETag that changes whenever either list is reloaded.
+        """
+        system = self._system_snapshot(db)
+        custom = self._user_snapshot(db, user_id)
+        if custom.exercises:
+            exercises = sorted(system.exercises + custom.exercises, key=lambda exercise: exercise.id)
+        else:
+            exercises = system.exercises
+        return exercises, f'W/"{system.token}-{user_id}-{custom.token}"'
+
+    def search_indexes(self, db: Session, user_id: int) -> List[ExerciseSearchIndex]:
+        """Autocomplete indexes for the system exercises and the user's own."""
+        return [self._system_snapshot(db).search_index, self._user_snapshot(db, user_id).search_index]
+
+    def substitutes(self, db: Session, user_id: int, exercise, limit: int) -> List[Tuple[ExerciseResponse, float]]:
+        """
+        The exercises visible to the user that are most similar to the given one, best first.
+        System exercises come from the precomputed index; the user's few custom
+        exercises are scored on the spot and merged in.
+        """
+        self._system_snapshot(db)
+        index = self._substitutes
+        custom = self._user_snapshot(db, user_id).exercises
+        features = exercise_features(exercise)
+
+        if exercise.is_system and exercise.id in index.exercises:
+            ranked = index.neighbors(exercise.id, limit)
+        else:
+            ranked = index.rank(features, limit, exclude_id=exercise.id)
+        candidates = [(score, -exercise_id, index.exercises[exercise_id]) for score, exercise_id in ranked]
+        for other in custom:
+            if other.id == exercise.id:
+                continue
+            score = similarity(features, exercise_features(other))
+            if score > 0:
+                candidates.append((score, -other.id, other))
+
+        best = sorted(candidates, key=lambda candidate: candidate[:2], reverse=True)[:limit]
+        return [(other, round(score, 4)) for score, _, other in best]
+
+    def invalidate(self, user_id: Optional[int] = None, system: bool = False):
+        """Drop the cached system catalog and/or one user's custom exercises."""
+        with self._lock:
+            if system:
+                self._system = None
+            if user_id is not None:
+                self._users.pop(user_id, None)
+
+    def clear(self):
+        """Drop everything that is cached, including the substitution index."""
+        with self._lock:
+            self._system = None
+            self._users.clear()
+            self._substitutes = None
+
+def filter_exercises(
+    exercises: List[ExerciseResponse],
+    name: Optional[str] = None,
+    category: Optional[str] = None,
+    equipment: Optional[str] = None,
+    muscle_group: Optional[str] = None
+) -> List[ExerciseResponse]:
+    """Apply the exercise list filters in memory; name is a case-insensitive substring match."""
+    name = name.lower() if name else None
+    return [
+        exercise for exercise in exercises
+        if (not name or name in exercise.name.lower())
+        and (not category or exercise.category == category)
+        and (not equipment or exercise.equipment == equipment)
+        and (not muscle_group or exercise.muscle_group == muscle_group)
+    ]
+
+def distinct_values(exercises: List[ExerciseResponse], field: str) -> List[str]:
+    """Sorted distinct non-empty values of one exercise field."""
+    return sorted({getattr(exercise, field) for exercise in exercises if getattr(exercise, field)})
+
+def facet_counts(
+    exercises: List[ExerciseResponse],
+    name: Optional[str] = None,
+    filters: Optional[Dict[str, Optional[str]]] = None
+) -> Tuple[int, Dict[str, List[Tuple[str, int]]]]:
+    """
+    Count exercises per value of every facet field in a single pass.
+    Each facet is narrowed by the name filter and every other facet's filter but
+    not its own, so the UI can still offer the alternatives to a selected value.
+    Returns the number of exercises matching all filters and, per field,
+    (value, count) pairs sorted by value.
+    """
+    filters = {field: value for field, value in (filters or {}).items() if value}
+    name = name.lower() if name else None
+    counters = {field: Counter() for field in FACET_FIELDS}
+    total = 0
+
+    for exercise in exercises:
+        if name and name not in exercise.name.lower():
+            continue
+        mismatched = [field for field, value in filters.items() if getattr(exercise, field) != value]
+        if not mismatched:
+            total += 1
+        if len(mismatched) > 1:
+            continue
+        for field in FACET_FIELDS:
+            # Only the field's own filter may fail for the exercise to count toward it
+            if mismatched and mismatched[0] != field:
+                continue
+            value = getattr(exercise, field)
+            if value:
+                counters[field][value] += 1
+
+    return total, {field: sorted(counters[field].items()) for field in FACET_FIELDS}
+
+exercise_catalog = ExerciseCatalog()
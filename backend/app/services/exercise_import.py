@@ -0,0 +1,132 @@
+from typing import Any, Dict, List
+
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.models import Exercise, User
+from app.schemas.exercise import ExerciseCreate
+from app.services.muscle_groups import sync_exercise_muscles
+
+# Rows per INSERT statement when bulk-inserting new exercises
+IMPORT_CHUNK_SIZE = 500
+
+def _failure(row: int, name: Any, reason: str) -> Dict[str, Any]:
+    return {"row": row, "name": name if isinstance(name, str) and name else "Unknown", "reason": reason}
+
+def _validation_reason(error: ValidationError) -> str:
+    first = error.errors()[0]
+    field = ".".join(str(part) for part in first["loc"]) or "exercise"
+    return f"Invalid {field}: {first['msg']}"
+
+def _insert_chunk(db: Session, rows: List[Dict[str, Any]], failed: List[Dict[str, Any]]) -> int:
+    """
+    Insert one chunk of new exercises in a single statement inside a savepoint.
+    If the statement fails, retry row by row so only the offending rows are reported.
+    Returns the number of rows inserted.
+    """
+    try:
+        with db.begin_nested():
+            db.execute(insert(Exercise), [row["values"] for row in rows])
+        return len(rows)
+    except SQLAlchemyError:
+        pass
+
+    inserted = 0
+    for row in rows:
+        try:
+            with db.begin_nested():
+                db.execute(insert(Exercise), [row["values"]])
+            inserted += 1
+        except SQLAlchemyError as e:
+            failed.append(_failure(row["row"], row["values"]["name"], str(e.orig if hasattr(e, "orig") else e)))
+    return inserted
+
+def import_exercise_rows(db: Session, exercises_data: List[Any], current_user: User, upsert: bool = False) -> Dict[str, Any]:
+    """
+    Validate and import a list of exercise dicts without committing.
+    Existing names are found with one IN query. New exercises are bulk-inserted
+    in chunks of IMPORT_CHUNK_SIZE; in upsert mode, existing exercises the user may
+    modify are updated with one bulk UPDATE instead of being rejected.
+    Returns counts plus a failure entry (with its row index) for every rejected row.
+    """
+    failed = []
+    valid = []
+    seen_names = set()
+
+    for index, exercise_data in enumerate(exercises_data):
+        if not isinstance(exercise_data, dict):
+            failed.append(_failure(index, None, "Expected an exercise object"))
+            continue
+        name = exercise_data.get("name")
+        if not name:
+            failed.append(_failure(index, name, "Missing name field"))
+            continue
+        try:
+            exercise = ExerciseCreate(**exercise_data)
+        except ValidationError as e:
+            failed.append(_failure(index, name, _validation_reason(e)))
+            continue
+        if exercise.name in seen_names:
+            failed.append(_failure(index, exercise.name, "Duplicate name in file"))
+            continue
+        seen_names.add(exercise.name)
+        valid.append((index, exercise))
+
+    # One query finds every name that already exists
+    existing = {}
+    if seen_names:
+        for row in db.query(Exercise.id, Exercise.name, Exercise.is_system, Exercise.created_by).filter(
+            Exercise.name.in_(seen_names)
+        ):
+            existing.setdefault(row.name, row)
+
+    new_rows = []
+    update_rows = []
+    for index, exercise in valid:
+        current = existing.get(exercise.name)
+        if current is None:
+            new_rows.append({
+                "row": index,
+                "values": {
+                    **exercise.model_dump(),
+                    "is_system": False,
+                    "created_by": current_user.id,
+                }
+            })
+            continue
+
+        if not upsert:
+            failed.append(_failure(index, exercise.name, "Exercise with this name already exists"))
+            continue
+
+        # Same rule as the update endpoint: own custom exercises, or anything for admins
+        if not current_user.is_admin and (current.is_system or current.created_by != current_user.id):
+            failed.append(_failure(index, exercise.name, "Not authorized to modify this exercise"))
+            continue
+
+        # Only fields present in the file are overwritten
+        update_rows.append({"id": current.id, **exercise.model_dump(exclude_unset=True)})
+
+    created = 0
+    for start in range(0, len(new_rows), IMPORT_CHUNK_SIZE):
+        created += _insert_chunk(db, new_rows[start:start + IMPORT_CHUNK_SIZE], failed)
+
+    if update_rows:
+        db.execute(update(Exercise), update_rows)
+
+    # Rebuild muscle associations for every exercise written above, in one pass
+    written_names = [row["values"]["name"] for row in new_rows] + [row["name"] for row in update_rows]
+    if written_names:
+        sync_exercise_muscles(db, db.query(
+            Exercise.id, Exercise.muscle_group, Exercise.secondary_muscle_groups
+        ).filter(Exercise.name.in_(written_names)).all())
+
+    failed.sort(key=lambda failure: failure["row"])
+    return {
+        "success": created,
+        "updated": len(update_rows),
+        "failed": len(failed),
+        "failed_exercises": failed,
+    }
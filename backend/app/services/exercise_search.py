@@ -0,0 +1,218 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.models import SessionExercise, WorkoutSession
+
+# Shorthand lifters type, expanded before matching ("db row" -> "dumbbell row")
+EXERCISE_ALIASES = {
+    "db": "dumbbell",
+    "dbs": "dumbbell",
+    "bb": "barbell",
+    "kb": "kettlebell",
+    "ez": "ez bar",
+    "bw": "bodyweight",
+    "ohp": "overhead press",
+    "rdl": "romanian deadlift",
+    "sldl": "stiff leg deadlift",
+    "bp": "bench press",
+    "pullup": "pull up",
+    "pullups": "pull up",
+    "chinup": "chin up",
+    "chinups": "chin up",
+    "pushup": "push up",
+    "pushups": "push up",
+    "situp": "sit up",
+    "situps": "sit up",
+    "ext": "extension",
+}
+
+# Minimum share of query trigrams found in a name for a fuzzy-only match
+TRIGRAM_THRESHOLD = 0.3
+
+# Weight of the prefix match vs. trigram similarity in the text score
+PREFIX_WEIGHT = 0.6
+
+# Most the user's own usage can add to a score; reached at USAGE_SATURATION uses
+USAGE_WEIGHT = 0.2
+USAGE_SATURATION = 20
+
+# How long a user's usage counts are reused before they are queried again
+USAGE_TTL_SECONDS = int(os.getenv("EXERCISE_USAGE_TTL_SECONDS", "60"))
+USAGE_CACHE_SIZE = 1024
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def normalize_tokens(text: str, expand_aliases: bool = False) -> List[str]:
+    """Lowercase text and split it into alphanumeric tokens, optionally expanding aliases."""
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    if not expand_aliases:
+        return tokens
+    expanded = []
+    for token in tokens:
+        expanded.extend(EXERCISE_ALIASES.get(token, token).split())
+    return expanded
+
+def trigrams(tokens: Iterable[str]) -> Set[str]:
+    """Trigrams of each token padded like pg_trgm ("  w" ... "d "), so short words still match."""
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.ids: Set[int] = set()
+
+class ExerciseSearchIndex:
+    """
+    Prefix trie plus trigram index over exercise names.
+    Every trie node stores the ids of exercises with a name token starting with
+    that prefix, so a query token is looked up in O(len(token)). The trigram
+    index finds misspelled names, scored by the share of the query's trigrams
+    present in the name (close to pg_trgm's word_similarity).
+    Built once per catalog snapshot and read-only afterwards.
+    """
+
+    def __init__(self, exercises: Iterable):
+        self.exercises = {}
+        self._root = _TrieNode()
+        self._trigrams: Dict[str, List[int]] = {}
+        self._token_counts: Dict[int, int] = {}
+        self._names: Dict[int, str] = {}
+
+        for exercise in exercises:
+            tokens = normalize_tokens(exercise.name)
+            if not tokens:
+                continue
+            self.exercises[exercise.id] = exercise
+            self._names[exercise.id] = " ".join(tokens)
+            self._token_counts[exercise.id] = len(set(tokens))
+
+            for token in set(tokens):
+                node = self._root
+                for char in token:
+                    node = node.children.setdefault(char, _TrieNode())
+                    node.ids.add(exercise.id)
+
+            for gram in trigrams(tokens):
+                self._trigrams.setdefault(gram, []).append(exercise.id)
+
+    def _prefix_ids(self, token: str) -> Set[int]:
+        node = self._root
+        for char in token:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.ids
+
+    def score(self, query_tokens: List[str]) -> Dict[int, float]:
+        """
+        Score every exercise that matches the query tokens by prefix or by trigrams.
+        Returns text scores between 0 and 1 keyed by exercise id.
+        """
+        if not query_tokens:
+            return {}
+
+        # Counter.update over the id sets/lists runs in C, which keeps this fast
+        # even for tokens and trigrams shared by thousands of names
+        query_token_set = set(query_tokens)
+        prefix_hits = Counter()
+        for token in query_token_set:
+            prefix_hits.update(self._prefix_ids(token))
+
+        query_grams = trigrams(query_tokens)
+        shared = Counter()
+        for gram in query_grams:
+            posting = self._trigrams.get(gram)
+            if posting:
+                shared.update(posting)
+
+        # Keep names matching every token by prefix, or enough trigrams to be a likely typo
+        query_token_count = len(query_token_set)
+        min_shared = TRIGRAM_THRESHOLD * len(query_grams)
+        candidates = {exercise_id for exercise_id, hits in prefix_hits.items() if hits == query_token_count}
+        candidates.update(exercise_id for exercise_id, common in shared.items() if common >= min_shared)
+
+        query_text = " ".join(query_tokens)
+        scores = {}
+        for exercise_id in candidates:
+            prefix = prefix_hits.get(exercise_id, 0) / query_token_count
+            similarity = shared.get(exercise_id, 0) / len(query_grams)
+            score = PREFIX_WEIGHT * prefix + (1 - PREFIX_WEIGHT) * similarity
+            # Prefer names that start with the query, then shorter names
+            if self._names[exercise_id].startswith(query_text):
+                score += 0.1
+            score -= 0.01 * max(self._token_counts[exercise_id] - query_token_count, 0)
+            scores[exercise_id] = min(score, 1.0)
+        return scores
+
+def search_exercises(
+    indexes: List[ExerciseSearchIndex],
+    query: str,
+    limit: int = 10,
+    usage: Optional[Dict[int, int]] = None
+) -> List[Tuple[object, float]]:
+    """
+    Return up to limit (exercise, score) pairs for a query across several indexes,
+    best first. Exercises the user logs often get up to USAGE_WEIGHT extra score.
+    """
+    query_tokens = normalize_tokens(query, expand_aliases=True)
+    usage = usage or {}
+    candidates = []
+    for index in indexes:
+        for exercise_id, score in index.score(query_tokens).items():
+            uses = usage.get(exercise_id)
+            if uses:
+                score += USAGE_WEIGHT * min(math.log1p(uses) / math.log1p(USAGE_SATURATION), 1.0)
+            candidates.append((score, -exercise_id, index.exercises[exercise_id]))
+    best = heapq.nlargest(limit, candidates, key=lambda candidate: candidate[:2])
+    return [(exercise, round(score, 4)) for score, _, exercise in best]
+
+class UsageCounts:
+    """Per-user cache of how many times each exercise was logged in a workout session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: "OrderedDict[int, Tuple[float, Dict[int, int]]]" = OrderedDict()
+
+    def get(self, db: Session, user_id: int) -> Dict[int, int]:
+        with self._lock:
+            cached = self._counts.get(user_id)
+            if cached and time.monotonic() - cached[0] < USAGE_TTL_SECONDS:
+                return cached[1]
+
+        rows = db.query(
+            SessionExercise.exercise_id,
+            func.count(SessionExercise.id)
+        ).join(
+            WorkoutSession, SessionExercise.session_id == WorkoutSession.id
+        ).filter(
+            WorkoutSession.user_id == user_id
+        ).group_by(SessionExercise.exercise_id).all()
+        counts = {exercise_id: count for exercise_id, count in rows}
+
+        with self._lock:
+            self._counts[user_id] = (time.monotonic(), counts)
+            self._counts.move_to_end(user_id)
+            while len(self._counts) > USAGE_CACHE_SIZE:
+                self._counts.popitem(last=False)
+        return counts
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+exercise_usage = UsageCounts()
@@ -0,0 +1,192 @@
+import heapq
+import math
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.services.muscle_groups import muscle_key, parse_exercise_muscles
+
+# Share of the similarity score contributed by each exercise attribute
+MUSCLE_WEIGHT = 0.6
+CATEGORY_WEIGHT = 0.15
+EQUIPMENT_WEIGHT = 0.1
+DIFFICULTY_WEIGHT = 0.15
+
+# Neighbours kept per exercise; lookups can ask for at most this many
+SUBSTITUTE_TOP_K = 20
+
+DIFFICULTY_LEVELS = {"beginner": 0, "intermediate": 1, "advanced": 2}
+
+class ExerciseFeatures(NamedTuple):
+    """The attributes substitutions are based on, normalized for comparison."""
+    muscles: Tuple[Tuple[str, float], ...]
+    norm: float
+    category: Optional[str]
+    equipment: Optional[str]
+    difficulty: Optional[int]
+
+def _normalized(value: Optional[str]) -> Optional[str]:
+    return muscle_key(value) or None
+
+def exercise_features(exercise) -> ExerciseFeatures:
+    """Muscle weight vector (primary 1.0, secondary 0.5) plus category, equipment and difficulty."""
+    muscles = tuple(sorted(
+        (muscle_key(name), weight)
+        for name, _, weight in parse_exercise_muscles(exercise.muscle_group, exercise.secondary_muscle_groups)
+    ))
+    return ExerciseFeatures(
+        muscles=muscles,
+        norm=math.sqrt(sum(weight * weight for _, weight in muscles)),
+        category=_normalized(exercise.category),
+        equipment=_normalized(exercise.equipment),
+        difficulty=DIFFICULTY_LEVELS.get(_normalized(exercise.difficulty_level)),
+    )
+
+def attribute_similarity(a: ExerciseFeatures, b: ExerciseFeatures) -> float:
+    """Category, equipment and difficulty part of the score; unknown difficulty counts as half a match."""
+    score = 0.0
+    if a.category and a.category == b.category:
+        score += CATEGORY_WEIGHT
+    if a.equipment and a.equipment == b.equipment:
+        score += EQUIPMENT_WEIGHT
+    if a.difficulty is None or b.difficulty is None:
+        score += DIFFICULTY_WEIGHT * 0.5
+    else:
+        score += DIFFICULTY_WEIGHT * (1 - abs(a.difficulty - b.difficulty) / 2)
+    return score
+
+def similarity(a: ExerciseFeatures, b: ExerciseFeatures) -> float:
+    """
+    Similarity between two exercises in [0, 1]: cosine of their muscle vectors
+    plus matching attributes. Exercises sharing no muscle group score 0.
+    """
+    if not a.norm or not b.norm:
+        return 0.0
+    b_muscles = dict(b.muscles)
+    dot = sum(weight * b_muscles.get(key, 0.0) for key, weight in a.muscles)
+    if not dot:
+        return 0.0
+    return MUSCLE_WEIGHT * dot / (a.norm * b.norm) + attribute_similarity(a, b)
+
+def _top(scores: Dict[int, float], k: int) -> List[Tuple[float, int]]:
+    """The k best (score, id) pairs, best first; ties go to the lower id."""
+    best = heapq.nsmallest(k, ((-score, exercise_id) for exercise_id, score in scores.items()))
+    return [(-negated, exercise_id) for negated, exercise_id in best]
+
+class SubstitutionIndex:
+    """
+    Precomputed top-SUBSTITUTE_TOP_K similar exercises for every exercise in a catalog.
+    Muscle vectors are stored as a sparse muscle -> {exercise id: weight} matrix,
+    so each exercise's row of dot products is accumulated from the postings of
+    its own muscles only, rather than compared against the whole catalog.
+    sync() applies catalog changes by recomputing just the affected rows.
+    """
+
+    def __init__(self, exercises: Iterable, top_k: int = SUBSTITUTE_TOP_K):
+        self.top_k = top_k
+        self.exercises = {}
+        self._lock = threading.Lock()
+        self._features: Dict[int, ExerciseFeatures] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._neighbors: Dict[int, List[Tuple[float, int]]] = {}
+
+        for exercise in exercises:
+            self.exercises[exercise.id] = exercise
+            self._add_features(exercise.id, exercise_features(exercise))
+        for exercise_id in self._features:
+            self._neighbors[exercise_id] = _top(self._scores(self._features[exercise_id], exercise_id), top_k)
+
+    def _add_features(self, exercise_id: int, features: ExerciseFeatures):
+        self._features[exercise_id] = features
+        for key, weight in features.muscles:
+            self._postings.setdefault(key, {})[exercise_id] = weight
+
+    def _remove_features(self, exercise_id: int):
+        features = self._features.pop(exercise_id)
+        for key, _ in features.muscles:
+            posting = self._postings[key]
+            posting.pop(exercise_id, None)
+            if not posting:
+                del self._postings[key]
+
+    def _scores(self, features: ExerciseFeatures, exclude_id: Optional[int] = None) -> Dict[int, float]:
+        """Similarity of features to every indexed exercise sharing a muscle group with it."""
+        if not features.norm:
+            return {}
+        dots: Dict[int, float] = {}
+        for key, weight in features.muscles:
+            for exercise_id, other_weight in self._postings.get(key, {}).items():
+                dots[exercise_id] = dots.get(exercise_id, 0.0) + weight * other_weight
+        dots.pop(exclude_id, None)
+
+        scores = {}
+        for exercise_id, dot in dots.items():
+            other = self._features[exercise_id]
+            scores[exercise_id] = MUSCLE_WEIGHT * dot / (features.norm * other.norm) + attribute_similarity(features, other)
+        return scores
+
+    def neighbors(self, exercise_id: int, k: int) -> List[Tuple[float, int]]:
+        """Precomputed best (score, id) pairs for an indexed exercise; empty if unknown."""
+        return self._neighbors.get(exercise_id, [])[:k]
+
+    def rank(self, features: ExerciseFeatures, k: int, exclude_id: Optional[int] = None) -> List[Tuple[float, int]]:
+        """Best (score, id) pairs for an exercise that is not part of the index."""
+        with self._lock:
+            return _top(self._scores(features, exclude_id), k)
+
+    def sync(self, exercises: Iterable) -> int:
+        """
+        Bring the index in line with a fresh list of the catalog's exercises.
+        Only exercises that were added, removed or had their features changed
+        are rescored, along with the rows that listed them as a neighbour.
+        Returns the number of exercises whose features changed.
+        """
+        with self._lock:
+            current = {exercise.id: exercise for exercise in exercises}
+            changed = {}
+            for exercise_id, exercise in current.items():
+                features = exercise_features(exercise)
+                if self._features.get(exercise_id) != features:
+                    changed[exercise_id] = features
+            removed = set(self._features) - set(current)
+            self.exercises = current
+            if not changed and not removed:
+                return 0
+
+            for exercise_id in removed | (set(changed) & set(self._features)):
+                self._remove_features(exercise_id)
+            for exercise_id, features in changed.items():
+                self._add_features(exercise_id, features)
+
+            neighbors = dict(self._neighbors)
+            for exercise_id in removed:
+                neighbors.pop(exercise_id, None)
+
+            # Rows that listed a changed or removed exercise may now be missing a
+            # neighbour, so they are recomputed in full along with the changed rows
+            affected = removed | set(changed)
+            stale = set(changed) | {
+                exercise_id for exercise_id, row in neighbors.items()
+                if any(other_id in affected for _, other_id in row)
+            }
+            changed_scores = {}
+            for exercise_id in stale:
+                scores = self._scores(self._features[exercise_id], exercise_id)
+                neighbors[exercise_id] = _top(scores, self.top_k)
+                if exercise_id in changed:
+                    changed_scores[exercise_id] = scores
+
+            # Similarity is symmetric, so the changed rows tell every other row
+            # whether a changed exercise now belongs among its neighbours
+            for changed_id, scores in changed_scores.items():
+                for exercise_id, score in scores.items():
+                    if exercise_id in stale:
+                        continue
+                    row = neighbors[exercise_id]
+                    if len(row) < self.top_k or (-score, changed_id) < (-row[-1][0], row[-1][1]):
+                        neighbors[exercise_id] = _top(
+                            {other_id: other_score for other_score, other_id in row} | {changed_id: score},
+                            self.top_k
+                        )
+
+            self._neighbors = neighbors
+            return len(changed)
@@ -0,0 +1,110 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.models import MuscleGroup, ExerciseMuscle
+from app.services.upsert import dialect_insert
+
+PRIMARY_ROLE = "primary"
+SECONDARY_ROLE = "secondary"
+
+# Share of a set credited to each muscle group, by role
+MUSCLE_ROLE_WEIGHTS = {
+    PRIMARY_ROLE: 1.0,
+    SECONDARY_ROLE: 0.5,
+}
+
+def muscle_key(name: str) -> str:
+    """Normalize a muscle group name for lookups ("  Upper  Back" -> "upper back")."""
+    return " ".join((name or "").lower().split())
+
+def parse_exercise_muscles(muscle_group: Optional[str], secondary_muscle_groups: Optional[str]) -> List[Tuple[str, str, float]]:
+    """
+    Turn an exercise's muscle_group and comma-separated secondary_muscle_groups
+    into (name, role, weight) entries, one per distinct muscle group.
+    A muscle listed as both primary and secondary counts as primary.
+    """
+    entries = []
+    seen = set()
+    names = [(muscle_group, PRIMARY_ROLE)] + [
+        (name, SECONDARY_ROLE) for name in (secondary_muscle_groups or "").split(",")
+    ]
+    for name, role in names:
+        key = muscle_key(name)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        entries.append((" ".join(name.split()), role, MUSCLE_ROLE_WEIGHTS[role]))
+    return entries
+
+def ensure_muscle_groups(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Make sure a muscle_groups row exists for every name and return their ids by key.
+    Runs one INSERT ... ON CONFLICT DO NOTHING and one SELECT, whatever the count.
+    """
+    display_names = {}
+    for name in names:
+        display_names.setdefault(muscle_key(name), " ".join(name.split()))
+    display_names.pop("", None)
+    if not display_names:
+        return {}
+
+    db.execute(
+        dialect_insert(db, MuscleGroup)
+        .values([{"key": key, "name": name} for key, name in display_names.items()])
+        .on_conflict_do_nothing(index_elements=["key"])
+    )
+    return {
+        row.key: row.id
+        for row in db.execute(
+            select(MuscleGroup.id, MuscleGroup.key).where(MuscleGroup.key.in_(display_names))
+        )
+    }
+
+def sync_exercise_muscles(db: Session, exercises: Iterable) -> int:
+    """
+    Rebuild the exercise_muscles rows of the given exercises from their
+    muscle_group / secondary_muscle_groups columns. Accepts ORM objects or rows
+    with id, muscle_group and secondary_muscle_groups. Does not commit.
+    Returns the number of association rows written.
+    """
+    parsed = {
+        exercise.id: parse_exercise_muscles(exercise.muscle_group, exercise.secondary_muscle_groups)
+        for exercise in exercises
+    }
+    if not parsed:
+        return 0
+
+    ids_by_key = ensure_muscle_groups(db, [name for entries in parsed.values() for name, _, _ in entries])
+    db.execute(
+        delete(ExerciseMuscle)
+        .where(ExerciseMuscle.exercise_id.in_(parsed))
+        .execution_options(synchronize_session=False)
+    )
+
+    rows = [
+        {
+            "exercise_id": exercise_id,
+            "muscle_group_id": ids_by_key[muscle_key(name)],
+            "role": role,
+            "weight": weight,
+        }
+        for exercise_id, entries in parsed.items()
+        for name, role, weight in entries
+    ]
+    if rows:
+        db.execute(insert(ExerciseMuscle), rows)
+    return len(rows)
+
+def exercise_ids_for_muscle(db: Session, muscle: str, role: Optional[str] = None) -> Set[int]:
+    """
+    Ids of exercises that train a muscle group, optionally only in one role.
+    Served by the (muscle_group_id, role) index on exercise_muscles.
+    """
+    query = select(ExerciseMuscle.exercise_id).join(
+        MuscleGroup, MuscleGroup.id == ExerciseMuscle.muscle_group_id
+    ).where(MuscleGroup.key == muscle_key(muscle))
+    if role:
+        query = query.where(ExerciseMuscle.role == role)
+    return set(db.execute(query).scalars())
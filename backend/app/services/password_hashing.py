@@ -0,0 +1,182 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# Scheme for new hashes: "bcrypt" or "argon2" (argon2id, needs argon2-cffi).
+# Hashes in the other scheme still verify and are upgraded on the next login.
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt").lower()
+
+# bcrypt cost factor; each step doubles the time per hash
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# argon2id cost: memory in KiB, passes over it, and lanes
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+SUPPORTED_SCHEMES = ("bcrypt", "argon2")
+
+# Threads running password hashes at once; bcrypt releases the GIL, so each
+# one keeps a core busy without blocking the event loop. 0 runs hashes inline.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Hashes allowed to wait for a free thread before new ones are turned away with a 503
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+# Retry-After sent with the 503 when the queue is full
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+def build_password_context(
+    scheme: str = PASSWORD_HASH_SCHEME,
+    bcrypt_rounds: int = BCRYPT_ROUNDS,
+    argon2_memory_cost: int = ARGON2_MEMORY_COST,
+    argon2_time_cost: int = ARGON2_TIME_COST,
+    argon2_parallelism: int = ARGON2_PARALLELISM
+) -> CryptContext:
+    """
+    CryptContext that hashes with the configured scheme and cost and verifies
+    every supported scheme. Hashes in another scheme or with other cost
+    parameters are reported as needing an update.
+    """
+    if scheme not in SUPPORTED_SCHEMES:
+        raise ValueError(f"Unsupported PASSWORD_HASH_SCHEME {scheme!r}; use one of {', '.join(SUPPORTED_SCHEMES)}")
+    if scheme == "argon2" and importlib.util.find_spec("argon2") is None:
+        logging.warning("PASSWORD_HASH_SCHEME=argon2 but argon2-cffi is not installed; hashing with bcrypt")
+        scheme = "bcrypt"
+
+    schemes = [scheme] + [other for other in SUPPORTED_SCHEMES if other != scheme]
+    return CryptContext(
+        schemes=schemes,
+        default=scheme,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__rounds=argon2_time_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+pwd_context = build_password_context()
+
+def hash_password(password: str) -> str:
+    """Hash a password with the configured scheme and cost."""
+    return pwd_context.hash(password)
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """Check a password against a stored hash of any supported scheme."""
+    return pwd_context.verify(password, hashed_password)
+
+def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password and, if it matches a hash made with outdated parameters,
+    return a fresh hash to store in its place (otherwise None).
+    """
+    return pwd_context.verify_and_update(password, hashed_password)
+
+class PasswordHashPool:
+    """
+    Bounded thread pool for CPU-heavy password hashing and verification.
+    Keeps a login burst from freezing the event loop: at most `workers`
+    hashes run at once, up to `max_queue` more wait their turn, and anything
+    beyond that is rejected instead of piling up. stats() reports queue depth
+    and wait times.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._peak_queued = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-ins in progress, please retry shortly",
+                    headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+                )
+            self._pending += 1
+            self._peak_queued = max(self._peak_queued, self._pending - self._running)
+
+    def _run_tracked(self, submitted_at: float, fn: Callable, args: tuple) -> Any:
+        waited = time.monotonic() - submitted_at
+        with self._lock:
+            self._running += 1
+            self._wait_seconds_total += waited
+            self._wait_seconds_max = max(self._wait_seconds_max, waited)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._completed += 1
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) on the pool and await its result; raises 503 if the queue is full."""
+        if self.workers <= 0:
+            return fn(*args)
+        self._admit()
+        submitted_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._get_executor(), self._run_tracked, submitted_at, fn, args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load and totals since startup."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "peak_queued": self._peak_queued,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_seconds_total": round(self._wait_seconds_total, 6),
+                "wait_seconds_max": round(self._wait_seconds_max, 6),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+password_hash_pool = PasswordHashPool()
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the pool, off the event loop."""
+    return await password_hash_pool.run(hash_password, password)
+
+async def verify_and_update_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update on the pool, off the event loop."""
+    return await password_hash_pool.run(verify_and_update, password, hashed_password)
@@ -0,0 +1,143 @@
+import base64
+import binascii
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.models import ExerciseSet, SessionExercise, WorkoutSession
+
+# Earlier performances returned per exercise when a session is started
+PERFORMANCES_ON_START = 1
+
+# Most performances a client can ask for per exercise
+MAX_PERFORMANCES = 10
+
+# History entries per page by default, and the most a client can ask for
+HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
+
+def last_performances(
+    db: Session,
+    user_id: int,
+    exercise_ids: Iterable[int],
+    limit: int = PERFORMANCES_ON_START
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    The user's most recent completed performances of each exercise, newest first.
+    A performance is a session exercise with at least one logged set. Ranks them
+    with ROW_NUMBER() per exercise in one query, then loads their sets in a second,
+    whatever the number of exercises.
+    Returns {exercise_id: [{session_id, session_exercise_id, start_time, sets}]}.
+    """
+    exercise_ids = set(exercise_ids)
+    if not exercise_ids:
+        return {}
+
+    ranked = select(
+        SessionExercise.id.label("session_exercise_id"),
+        SessionExercise.exercise_id,
+        WorkoutSession.id.label("session_id"),
+        WorkoutSession.start_time,
+        func.row_number().over(
+            partition_by=SessionExercise.exercise_id,
+            order_by=(WorkoutSession.start_time.desc(), SessionExercise.id.desc())
+        ).label("position")
+    ).join(
+        WorkoutSession, SessionExercise.session_id == WorkoutSession.id
+    ).where(
+        WorkoutSession.user_id == user_id,
+        WorkoutSession.status == "completed",
+        SessionExercise.exercise_id.in_(exercise_ids),
+        exists().where(ExerciseSet.session_exercise_id == SessionExercise.id)
+    ).subquery()
+
+    rows = db.execute(
+        select(ranked).where(ranked.c.position <= limit).order_by(ranked.c.exercise_id, ranked.c.position)
+    ).all()
+    if not rows:
+        return {}
+
+    performances = defaultdict(list)
+    for row, performance in zip(rows, _with_sets(db, rows)):
+        performances[row.exercise_id].append(performance)
+    return dict(performances)
+
+def encode_cursor(start_time: datetime, session_exercise_id: int) -> str:
+    """Opaque cursor pointing just past the given history entry."""
+    payload = json.dumps([start_time.isoformat(), session_exercise_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        start_time, session_exercise_id = json.loads(payload)
+        return datetime.fromisoformat(start_time), int(session_exercise_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+def exercise_history_page(
+    db: Session,
+    user_id: int,
+    exercise_id: int,
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of the user's logged performances of an exercise, newest first.
+    Uses keyset pagination on (start_time, session exercise id): each page
+    continues strictly after the cursor's entry, so deep pages cost the same
+    as the first and entries logged meanwhile never shift the pages.
+    Returns the entries and the cursor of the next page (None on the last page).
+    """
+    query = select(
+        SessionExercise.id.label("session_exercise_id"),
+        WorkoutSession.id.label("session_id"),
+        WorkoutSession.start_time
+    ).join(
+        WorkoutSession, SessionExercise.session_id == WorkoutSession.id
+    ).where(
+        WorkoutSession.user_id == user_id,
+        SessionExercise.exercise_id == exercise_id,
+        exists().where(ExerciseSet.session_exercise_id == SessionExercise.id)
+    )
+    if cursor:
+        after_time, after_id = decode_cursor(cursor)
+        query = query.where(or_(
+            WorkoutSession.start_time < after_time,
+            and_(WorkoutSession.start_time == after_time, SessionExercise.id < after_id)
+        ))
+
+    # One extra row tells whether there is a next page
+    rows = db.execute(
+        query.order_by(WorkoutSession.start_time.desc(), SessionExercise.id.desc()).limit(limit + 1)
+    ).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].start_time, rows[-1].session_exercise_id)
+    return _with_sets(db, rows), next_cursor
+
+def _with_sets(db: Session, rows: List[Any]) -> List[Dict[str, Any]]:
+    """Performance dicts for rows of (session_exercise_id, session_id, start_time), sets loaded in one query."""
+    if not rows:
+        return []
+    sets_by_session_exercise = defaultdict(list)
+    for exercise_set in db.query(ExerciseSet).filter(
+        ExerciseSet.session_exercise_id.in_([row.session_exercise_id for row in rows])
+    ).order_by(ExerciseSet.session_exercise_id, ExerciseSet.set_number):
+        sets_by_session_exercise[exercise_set.session_exercise_id].append(exercise_set)
+
+    return [
+        {
+            "session_id": row.session_id,
+            "session_exercise_id": row.session_exercise_id,
+            "start_time": row.start_time,
+            "sets": sets_by_session_exercise[row.session_exercise_id],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,365 @@
+import codecs
+import json
+import re
+import zipfile
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.models import WorkoutPlan, PlanExercise, Exercise
+
+# Bytes read from the upload per chunk while parsing
+READ_CHUNK_SIZE = 64 * 1024
+
+# Plans resolved and inserted together; bounds memory for large bundles
+IMPORT_BATCH_SIZE = 50
+
+# Rows fetched per round trip when exporting; PostgreSQL streams them via a server-side cursor
+EXPORT_YIELD_PER = 500
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+class BundleFormat:
+    SINGLE = "single"  # One plan object, as written by the single-plan export
+    ARRAY = "array"  # A JSON array of plan objects
+    NDJSON = "ndjson"  # One plan object per line (or simply concatenated objects)
+
+class JSONDocumentStream:
+    """
+    Incrementally parse plan documents from an uploaded file.
+    Accepts a single JSON object, a JSON array of objects, or NDJSON, and
+    only keeps the current document (plus one read chunk) in memory.
+    After iteration, format tells which of the three layouts was found.
+    """
+
+    def __init__(self, file: UploadFile):
+        self.file = file
+        self.format: Optional[str] = None
+        self._text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    async def _fill(self) -> bool:
+        """Read the next chunk into the buffer. Returns False at end of file."""
+        if self._eof:
+            return False
+        chunk = await self.file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            self._buffer = self._buffer[self._pos:] + self._text_decoder.decode(b"", final=True)
+            self._pos = 0
+            return False
+        # Drop what was already parsed so the buffer only holds unread text
+        self._buffer = self._buffer[self._pos:] + self._text_decoder.decode(chunk)
+        self._pos = 0
+        return True
+
+    async def _peek(self) -> Optional[str]:
+        """Skip whitespace and return the next character without consuming it."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not await self._fill():
+                return None
+
+    async def _decode_value(self) -> Any:
+        """Decode the JSON value starting at the current position, reading more as needed."""
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if await self._fill():
+                    continue
+                raise ValueError(f"Invalid JSON: {e.msg} (line {e.lineno} column {e.colno})")
+            self._pos = end
+            return value
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        first = await self._peek()
+        if first is None:
+            raise ValueError("File is empty")
+
+        if first == "[":
+            self.format = BundleFormat.ARRAY
+            self._pos += 1
+            expect_value = True
+            while True:
+                char = await self._peek()
+                if char is None:
+                    raise ValueError("Invalid JSON: unterminated array")
+                if char == "]":
+                    self._pos += 1
+                    break
+                if char == ",":
+                    if expect_value:
+                        raise ValueError("Invalid JSON: unexpected ','")
+                    self._pos += 1
+                    expect_value = True
+                    continue
+                if not expect_value:
+                    raise ValueError("Invalid JSON: expected ',' between array items")
+                yield await self._decode_value()
+                expect_value = False
+            if await self._peek() is not None:
+                raise ValueError("Invalid JSON: extra data after array")
+            return
+
+        document = await self._decode_value()
+        if await self._peek() is None:
+            self.format = BundleFormat.SINGLE
+            yield document
+            return
+
+        self.format = BundleFormat.NDJSON
+        yield document
+        while await self._peek() is not None:
+            yield await self._decode_value()
+
+def _as_int(value) -> Optional[int]:
+    """Coerce an exercise id from an import file, returning None if it isn't an integer."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+def validate_plan_document(plan_data: Any, index: Optional[int] = None):
+    """Raise a 400 if an imported plan is missing required fields."""
+    where = f" in plan #{index + 1}" if index is not None else ""
+    if not isinstance(plan_data, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid plan{where}: expected a JSON object"
+        )
+    required_fields = ["name", "exercises"]
+    for field in required_fields:
+        if field not in plan_data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Missing required field{where}: {field}"
+            )
+    if not isinstance(plan_data["exercises"], list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid field{where}: exercises must be a list"
+        )
+
+def import_plan_batch(db: Session, plans_data: List[Dict[str, Any]], owner_id: int) -> List[Dict[str, Any]]:
+    """
+    Insert a batch of validated plan documents without committing.
+    Exercises are resolved with one IN query by id and one by name for the
+    whole batch, and plans and plan exercises are each inserted in bulk.
+    Entries whose exercise can't be found are skipped, as before.
+    Returns one summary dict per plan, in input order.
+    """
+    if not plans_data:
+        return []
+
+    # Resolve exercise ids first, then names for whatever is still unresolved
+    requested_ids = {
+        exercise_id
+        for plan_data in plans_data
+        for exercise_data in plan_data["exercises"]
+        if isinstance(exercise_data, dict)
+        and (exercise_id := _as_int(exercise_data.get("exercise_id"))) is not None
+    }
+    known_ids = set()
+    if requested_ids:
+        known_ids = {row.id for row in db.query(Exercise.id).filter(Exercise.id.in_(requested_ids))}
+
+    requested_names = {
+        exercise_data["exercise_name"]
+        for plan_data in plans_data
+        for exercise_data in plan_data["exercises"]
+        if isinstance(exercise_data, dict)
+        and _as_int(exercise_data.get("exercise_id")) not in known_ids
+        and isinstance(exercise_data.get("exercise_name"), str)
+    }
+    ids_by_name = {}
+    if requested_names:
+        # Lowest id wins if several exercises share a name
+        for row in db.query(Exercise.id, Exercise.name).filter(
+            Exercise.name.in_(requested_names)
+        ).order_by(Exercise.id.desc()):
+            ids_by_name[row.name] = row.id
+
+    plan_ids = db.execute(
+        insert(WorkoutPlan).returning(WorkoutPlan.id, sort_by_parameter_order=True),
+        [
+            {
+                "name": plan_data["name"],
+                "description": plan_data.get("description", ""),
+                "days_per_week": plan_data.get("days_per_week", 0),
+                "duration_weeks": plan_data.get("duration_weeks", 0),
+                "is_public": plan_data.get("is_public", False),
+                "owner_id": owner_id,
+            }
+            for plan_data in plans_data
+        ]
+    ).scalars().all()
+
+    exercise_rows = []
+    summaries = []
+    for plan_id, plan_data in zip(plan_ids, plans_data):
+        added = 0
+        skipped = 0
+        for i, exercise_data in enumerate(plan_data["exercises"]):
+            if not isinstance(exercise_data, dict):
+                skipped += 1
+                continue
+            exercise_id = _as_int(exercise_data.get("exercise_id"))
+            if exercise_id not in known_ids:
+                exercise_id = ids_by_name.get(exercise_data.get("exercise_name"))
+            if exercise_id is None:
+                skipped += 1
+                continue
+
+            exercise_rows.append({
+                "workout_plan_id": plan_id,
+                "exercise_id": exercise_id,
+                "sets": exercise_data.get("sets", 3),
+                "reps": exercise_data.get("reps", 10),
+                "rest_seconds": exercise_data.get("rest_seconds", 60),
+                "order": exercise_data.get("order", i),
+                "day_of_week": exercise_data.get("day_of_week"),
+                "progression_type": exercise_data.get("progression_type", "weight"),
+                "progression_value": exercise_data.get("progression_value", 2.5),
+                "progression_threshold": exercise_data.get("progression_threshold", 2),
+            })
+            added += 1
+
+        summaries.append({
+            "id": plan_id,
+            "name": plan_data["name"],
+            "exercises_count": added,
+            "skipped_exercises": skipped,
+        })
+
+    if exercise_rows:
+        db.execute(insert(PlanExercise), exercise_rows)
+
+    return summaries
+
+def iter_plan_exports(db: Session, *criteria) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (plan_id, export document) for every plan matching criteria, ordered by id.
+    Plans, their exercises and exercise names come from one joined query read in
+    chunks of EXPORT_YIELD_PER rows, so only the current plan is held in memory.
+    Documents have the same layout as the single-plan export and can be re-imported.
+    """
+    stmt = (
+        select(
+            WorkoutPlan.id,
+            WorkoutPlan.name,
+            WorkoutPlan.description,
+            WorkoutPlan.days_per_week,
+            WorkoutPlan.duration_weeks,
+            WorkoutPlan.is_public,
+            PlanExercise.id.label("plan_exercise_id"),
+            PlanExercise.exercise_id,
+            Exercise.name.label("exercise_name"),
+            PlanExercise.sets,
+            PlanExercise.reps,
+            PlanExercise.rest_seconds,
+            PlanExercise.order,
+            PlanExercise.day_of_week,
+            PlanExercise.progression_type,
+            PlanExercise.progression_value,
+            PlanExercise.progression_threshold,
+        )
+        .select_from(WorkoutPlan)
+        # Copy-on-write clones export their template's rows
+        .outerjoin(
+            PlanExercise,
+            PlanExercise.workout_plan_id == func.coalesce(WorkoutPlan.template_plan_id, WorkoutPlan.id)
+        )
+        .outerjoin(Exercise, Exercise.id == PlanExercise.exercise_id)
+        .where(*criteria)
+        .order_by(WorkoutPlan.id, PlanExercise.order, PlanExercise.id)
+        .execution_options(yield_per=EXPORT_YIELD_PER)
+    )
+
+    current_id = None
+    document = None
+    for row in db.execute(stmt):
+        if row.id != current_id:
+            if document is not None:
+                yield current_id, document
+            current_id = row.id
+            document = {
+                "name": row.name,
+                "description": row.description,
+                "days_per_week": row.days_per_week,
+                "duration_weeks": row.duration_weeks,
+                "is_public": row.is_public,
+                "exercises": []
+            }
+        if row.plan_exercise_id is not None:
+            document["exercises"].append({
+                "exercise_id": row.exercise_id,
+                "exercise_name": row.exercise_name,
+                "sets": row.sets,
+                "reps": row.reps,
+                "rest_seconds": row.rest_seconds,
+                "order": row.order,
+                "day_of_week": row.day_of_week,
+                "progression_type": row.progression_type,
+                "progression_value": row.progression_value,
+                "progression_threshold": row.progression_threshold
+            })
+    if document is not None:
+        yield current_id, document
+
+def ndjson_export_chunks(documents: Iterator[Tuple[int, Dict[str, Any]]]) -> Iterator[bytes]:
+    """Encode exported plans as NDJSON, one plan per line."""
+    for _, document in documents:
+        yield (json.dumps(document) + "\n").encode("utf-8")
+
+class _ZipChunkWriter:
+    """Write-only file object that hands zip output back to a generator chunk by chunk."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _export_filename(plan_id: int, name: str) -> str:
+    """Build a safe, unique file name for a plan inside a zip bundle."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", name or "").strip("_").lower()[:50]
+    return f"workout_plan_{plan_id}_{slug}.json" if slug else f"workout_plan_{plan_id}.json"
+
+def zip_export_chunks(documents: Iterator[Tuple[int, Dict[str, Any]]]) -> Iterator[bytes]:
+    """
+    Encode exported plans as a zip of JSON files, one per plan.
+    The archive is written to an unseekable buffer that is drained after each
+    plan, so zipfile uses data descriptors and nothing accumulates in memory.
+    """
+    writer = _ZipChunkWriter()
+    with zipfile.ZipFile(writer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for plan_id, document in documents:
+            archive.writestr(_export_filename(plan_id, document["name"]), json.dumps(document, indent=2))
+            chunk = writer.drain()
+            if chunk:
+                yield chunk
+    # Closing the archive writes the central directory
+    chunk = writer.drain()
+    if chunk:
+        yield chunk
@@ -0,0 +1,111 @@
+from typing import Dict, List
+
+from sqlalchemy import insert, literal, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.models import WorkoutPlan, PlanExercise
+
+# Columns copied when one plan's exercise list is duplicated into another
+PLAN_EXERCISE_COPY_COLUMNS = (
+    "exercise_id",
+    "sets",
+    "reps",
+    "rest_seconds",
+    "order",
+    "day_of_week",
+    "progression_type",
+    "progression_value",
+    "progression_threshold",
+)
+
+def exercise_source_id(plan: WorkoutPlan) -> int:
+    """
+    Return the id of the plan whose plan_exercises rows describe this plan.
+    Copy-on-write clones read their template's rows until their first edit.
+    """
+    return plan.template_plan_id or plan.id
+
+def plan_exercises_query(db: Session, plan: WorkoutPlan):
+    """Query for the exercise rows that make up a plan, following copy-on-write templates."""
+    return db.query(PlanExercise).filter(
+        PlanExercise.workout_plan_id == exercise_source_id(plan)
+    )
+
+def attach_template_exercises(db: Session, plan: WorkoutPlan) -> List[PlanExercise]:
+    """
+    Make plan.exercises return the template's rows for a copy-on-write clone.
+    The value is set without change history, so flushing never moves the rows.
+    """
+    if plan.template_plan_id:
+        rows = plan_exercises_query(db, plan).order_by(PlanExercise.order).all()
+        set_committed_value(plan, "exercises", rows)
+    return plan.exercises
+
+def copy_plan_exercises(db: Session, source_plan_id: int, target_plan_id: int):
+    """Copy every exercise row of one plan into another with a single INSERT ... SELECT."""
+    columns = [getattr(PlanExercise, name) for name in PLAN_EXERCISE_COPY_COLUMNS]
+    db.execute(
+        insert(PlanExercise).from_select(
+            ["workout_plan_id", *PLAN_EXERCISE_COPY_COLUMNS],
+            select(literal(target_plan_id), *columns).where(
+                PlanExercise.workout_plan_id == source_plan_id
+            )
+        )
+    )
+
+def materialize_plan_exercises(db: Session, plan: WorkoutPlan) -> Dict[int, int]:
+    """
+    Give a copy-on-write clone its own exercise rows before it is edited.
+    Returns a mapping of template row ids to the clone's new row ids, so callers
+    can translate ids the client read while the clone still pointed at its template.
+    """
+    if not plan.template_plan_id:
+        return {}
+
+    template_rows = db.query(PlanExercise).filter(
+        PlanExercise.workout_plan_id == plan.template_plan_id
+    ).order_by(PlanExercise.id).all()
+
+    id_map = {}
+    if template_rows:
+        new_ids = db.execute(
+            insert(PlanExercise).returning(PlanExercise.id, sort_by_parameter_order=True),
+            [
+                {
+                    "workout_plan_id": plan.id,
+                    **{name: getattr(row, name) for name in PLAN_EXERCISE_COPY_COLUMNS}
+                }
+                for row in template_rows
+            ]
+        ).scalars().all()
+        id_map = dict(zip([row.id for row in template_rows], new_ids))
+
+    plan.template_plan_id = None
+    db.expire(plan, ["exercises"])
+    return id_map
+
+def detach_template_clones(db: Session, plan_id: int):
+    """
+    Give every copy-on-write clone of a plan its own exercise rows.
+    Must run before the plan's exercise list is edited or the plan is deleted,
+    so clones keep the list they were cloned from.
+    """
+    clones = db.query(WorkoutPlan).filter(WorkoutPlan.template_plan_id == plan_id).all()
+    if not clones:
+        return
+
+    # One INSERT ... SELECT fans the template rows out to every clone
+    columns = [getattr(PlanExercise, name) for name in PLAN_EXERCISE_COPY_COLUMNS]
+    db.execute(
+        insert(PlanExercise).from_select(
+            ["workout_plan_id", *PLAN_EXERCISE_COPY_COLUMNS],
+            select(WorkoutPlan.id, *columns)
+            .join(WorkoutPlan, WorkoutPlan.template_plan_id == PlanExercise.workout_plan_id)
+            .where(PlanExercise.workout_plan_id == plan_id)
+        )
+    )
+
+    for clone in clones:
+        clone.template_plan_id = None
+        db.expire(clone, ["exercises"])
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.models.models import RefreshToken, User
+
+# How long a refresh token stays usable; each rotation issues a new one with a fresh expiry
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+
+def _token_hash(token: str) -> str:
+    # Tokens are 384 random bits, so a fast unsalted hash is enough to keep them unusable from a DB dump
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def issue_refresh_token(db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+    """
+    Create a refresh token for the user and return its plaintext; only the hash is stored.
+    Pass the family_id of the token being rotated, or None to start a new family at login.
+    Does not commit.
+    """
+    token = secrets.token_urlsafe(48)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=_token_hash(token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=_now() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+def revoke_family(db: Session, family_id: str) -> int:
+    """Revoke every live token descended from the same login. Does not commit."""
+    return db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({"revoked_at": _now()}, synchronize_session=False)
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[User, str]:
+    """
+    Exchange a refresh token for its user and a new refresh token, revoking the old one.
+    Presenting a token that was already rotated means it leaked, so its whole
+    family is revoked and the legitimate holder has to sign in again.
+    Does not commit on success.
+    """
+    stored = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == _token_hash(token)
+    ).with_for_update().first()
+    if stored is None:
+        raise _invalid_refresh_token()
+
+    if stored.revoked_at is not None:
+        revoke_family(db, stored.family_id)
+        db.commit()
+        raise _invalid_refresh_token()
+
+    expires_at = stored.expires_at
+    if expires_at.tzinfo is None:
+        # SQLite hands back naive datetimes
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at <= _now():
+        raise _invalid_refresh_token()
+
+    user = db.query(User).filter(User.id == stored.user_id).first()
+    if user is None:
+        raise _invalid_refresh_token()
+
+    stored.revoked_at = _now()
+    return user, issue_refresh_token(db, user.id, stored.family_id)
+
+def revoke_refresh_token(db: Session, token: str) -> bool:
+    """Revoke the family of a refresh token (logout). Returns False if the token is unknown."""
+    stored = db.query(RefreshToken).filter(RefreshToken.token_hash == _token_hash(token)).first()
+    if stored is None:
+        return False
+    revoke_family(db, stored.family_id)
+    return True
@@ -0,0 +1,171 @@
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from app.middleware.metrics import route_template
+from app.middleware.query_stats import current_query_stats
+
+# Statements taking longer than this are logged with their plan; 0 turns the log off
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+
+# Recent slow queries kept for GET /api/admin/slow-queries
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+
+# EXPLAINs allowed to wait for the background thread; slow queries beyond that are logged without a plan
+MAX_PENDING_EXPLAINS = 8
+
+# Only statements whose plain EXPLAIN never runs them or changes data
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+# Execution option marking the log's own EXPLAIN statements, so they are never logged themselves
+_SKIP_OPTION = "skip_slow_query_log"
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """The types of the bound parameters, without their values (which may be personal data)."""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+def _explain_prefix(dialect_name: str) -> Optional[str]:
+    if dialect_name == "postgresql":
+        return "EXPLAIN (ANALYZE off) "
+    if dialect_name == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    return None
+
+class SlowQueryLog:
+    """
+    Ring buffer of the most recent statements slower than the threshold, with
+    where they came from. Their plans are captured with EXPLAIN on a
+    background thread and a separate connection, so the request that ran the
+    slow statement never waits for it.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS, size: int = SLOW_QUERY_LOG_SIZE):
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        self._entries: deque = deque(maxlen=size)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = set()
+        # {url: engine} used for EXPLAINs, one per application engine
+        self._explain_engines: Dict[str, Engine] = {}
+
+    def record(self, conn, statement: str, parameters: Any, executemany: bool, duration_ms: float):
+        stats = current_query_stats()
+        scope = stats.scope if stats is not None else None
+        entry = {
+            "recorded_at": datetime.now(timezone.utc),
+            "duration_ms": round(duration_ms, 3),
+            "statement": " ".join(statement.split()),
+            "parameters": parameter_shape(parameters, executemany),
+            "route": f"{scope['method']} {route_template(scope)}" if scope else None,
+            "plan": None,
+            "plan_status": "unavailable",
+        }
+        logging.warning(
+            f"Slow query ({duration_ms:.1f} ms) from {entry['route'] or 'outside a request'}: "
+            f"{entry['statement'][:500]} parameters={entry['parameters']}"
+        )
+
+        prefix = _explain_prefix(conn.dialect.name)
+        if prefix and not executemany and entry["statement"].split(" ", 1)[0].upper() in _EXPLAINABLE:
+            self._submit_explain(conn.engine, prefix + statement, parameters, entry)
+        with self._lock:
+            self._entries.append(entry)
+
+    def _submit_explain(self, engine: Engine, statement: str, parameters: Any, entry: Dict[str, Any]):
+        with self._lock:
+            if len(self._pending) >= MAX_PENDING_EXPLAINS:
+                entry["plan_status"] = "skipped"
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            # Set before submitting: the EXPLAIN may finish before submit() returns
+            entry["plan_status"] = "pending"
+            future = self._executor.submit(self._explain, self._explain_engine(engine), statement, parameters, entry)
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _explain_engine(self, engine: Engine) -> Engine:
+        """
+        Engine opening a fresh connection for every EXPLAIN, so a plan is never
+        captured on a connection a request is using (a static pool hands every
+        checkout the same one). Called with the lock held.
+        """
+        key = str(engine.url)
+        explain_engine = self._explain_engines.get(key)
+        if explain_engine is None:
+            explain_engine = self._explain_engines[key] = create_engine(engine.url, poolclass=NullPool)
+        return explain_engine
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _explain(self, engine: Engine, statement: str, parameters: Any, entry: Dict[str, Any]):
+        try:
+            with engine.connect() as connection:
+                rows = connection.execution_options(**{_SKIP_OPTION: True}).exec_driver_sql(
+                    statement, parameters or ()
+                ).all()
+            plan = [" ".join(str(column) for column in row) for row in rows]
+            entry["plan"], entry["plan_status"] = plan, "captured"
+        except Exception as e:
+            entry["plan_status"] = "failed"
+            logging.warning(f"Failed to capture plan for slow query: {str(e)}")
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Logged slow queries, newest first."""
+        with self._lock:
+            entries = list(reversed(self._entries))
+        return entries[:limit] if limit else entries
+
+    def wait_for_plans(self, timeout: float = 5.0):
+        """Block until the queued EXPLAINs finish (for tests and shutdown)."""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending, timeout=timeout)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            explain_engines, self._explain_engines = self._explain_engines, {}
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for explain_engine in explain_engines.values():
+            explain_engine.dispose()
+
+slow_query_log = SlowQueryLog()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    if slow_query_log.threshold_ms > 0:
+        context._slow_query_started = perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _check_duration(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_slow_query_started", None)
+    if started is None:
+        return
+    duration_ms = (perf_counter() - started) * 1000
+    if duration_ms < slow_query_log.threshold_ms or conn.get_execution_options().get(_SKIP_OPTION):
+        return
+    slow_query_log.record(conn, statement, parameters, executemany, duration_ms)
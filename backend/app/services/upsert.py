@@ -0,0 +1,55 @@
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.models import UserProgramProgress
+
+# Columns covered by the _user_plan_exercise_uc unique constraint
+USER_PROGRESS_CONFLICT_COLUMNS = ["user_id", "workout_plan_id", "exercise_id"]
+
+def dialect_insert(db: Session, model):
+    """
+    Return an INSERT construct for model that supports ON CONFLICT clauses.
+    PostgreSQL is used in production and SQLite in tests; both accept
+    on_conflict_do_nothing / on_conflict_do_update with index_elements.
+    """
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        return postgresql.insert(model)
+    if dialect_name == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Upserts are not supported on {dialect_name}")
+
+def insert_user_progress_ignore_existing(db: Session, select_stmt, columns):
+    """
+    Create UserProgramProgress rows from select_stmt, skipping rows that already exist.
+    Runs as one INSERT ... SELECT ... ON CONFLICT DO NOTHING on _user_plan_exercise_uc,
+    so concurrent callers and duplicate exercises in the select are both safe.
+    """
+    stmt = dialect_insert(db, UserProgramProgress).from_select(columns, select_stmt)
+    return db.execute(
+        stmt.on_conflict_do_nothing(index_elements=USER_PROGRESS_CONFLICT_COLUMNS)
+    )
+
+def upsert_user_progress(db: Session, rows):
+    """
+    Insert or update UserProgramProgress rows with one bulk INSERT ... ON CONFLICT DO UPDATE.
+    Each row must carry every column of the progress record. On conflict, a non-null
+    current_weight/current_reps replaces the stored value, and next_weight/next_reps
+    are only filled in when progression has not set them yet.
+    """
+    if not rows:
+        return
+    stmt = dialect_insert(db, UserProgramProgress)
+    existing = UserProgramProgress.__table__.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=USER_PROGRESS_CONFLICT_COLUMNS,
+        set_={
+            "current_weight": func.coalesce(stmt.excluded.current_weight, existing.current_weight),
+            "next_weight": func.coalesce(existing.next_weight, stmt.excluded.current_weight),
+            "current_reps": func.coalesce(stmt.excluded.current_reps, existing.current_reps),
+            "next_reps": func.coalesce(existing.next_reps, stmt.excluded.current_reps),
+            "last_updated": func.now(),
+        }
+    )
+    db.execute(stmt, rows)
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.models.models import User
+
+# Upper bound on how stale another worker process can leave a cached user
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+# Users kept in memory at once
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+# Column values of the users table, copied so cached entries never share ORM state
+_USER_COLUMNS = [column.key for column in User.__table__.columns]
+
+class UserIdentity(NamedTuple):
+    """What most endpoints need to know about the caller, without an ORM object."""
+    id: int
+    username: str
+    is_admin: bool
+
+class UserCache:
+    """
+    Bounded TTL cache of users table rows keyed by user id, used by the auth
+    dependencies so authenticated requests do not re-read the user every time.
+    Entries are dropped whenever a User is updated or deleted through the ORM
+    (see the listeners below); other processes catch up within the TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # Bumped by every invalidation, so a read that raced with a write is not cached
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Cached column values of a user, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.monotonic() - entry[0] > USER_CACHE_TTL_SECONDS:
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user: User, version: int):
+        """Cache a freshly loaded user, unless an invalidation happened since version was read."""
+        values = {key: getattr(user, key) for key in _USER_COLUMNS}
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[user.id] = (time.monotonic(), values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def attach(self, db: Session, values: Dict[str, Any]) -> User:
+        """
+        Turn cached values into a User that belongs to the request's session,
+        without a SELECT. Routes can read, modify and commit it like a loaded one.
+        """
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._version += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+user_cache = UserCache()
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_row_written(mapper, connection, target):
+    # Drop the entry at flush, and again after commit in case a concurrent
+    # request re-read the row before this transaction committed
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("written_user_ids", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop("written_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop("written_user_ids", None)
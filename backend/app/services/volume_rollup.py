@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.models import (
+    ExerciseSet,
+    SessionExercise,
+    WeeklyExerciseVolume,
+    WorkoutSession,
+)
+from app.services.upsert import dialect_insert
+
+# A hard set is a working (non-warmup) set with at least one rep
+HARD_SET = and_(ExerciseSet.is_warmup == False, ExerciseSet.reps > 0)
+HARD_SET_COUNT = func.sum(case((HARD_SET, 1), else_=0))
+HARD_SET_TONNAGE = func.sum(case((HARD_SET, ExerciseSet.reps * func.coalesce(ExerciseSet.weight, 0)), else_=0))
+
+VOLUME_CONFLICT_COLUMNS = ["user_id", "week_start", "exercise_id"]
+
+def week_start(moment: Optional[datetime]) -> date:
+    """Monday of the (UTC) week a session started in."""
+    if moment is None:
+        moment = datetime.now(timezone.utc)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.date() - timedelta(days=moment.weekday())
+
+def set_volume(reps: Optional[int], weight: Optional[float], is_warmup: bool) -> Tuple[int, float]:
+    """(hard sets, tonnage) contributed by one set; mirrors HARD_SET in Python."""
+    if is_warmup or not reps or reps <= 0:
+        return 0, 0.0
+    return 1, reps * (weight or 0)
+
+def apply_volume_deltas(db: Session, user_id: int, week: date, deltas: Dict[int, Tuple[float, float]]):
+    """
+    Add (hard sets, tonnage) deltas per exercise to a user's week with one
+    INSERT ... ON CONFLICT DO UPDATE. Negative deltas remove volume.
+    """
+    rows = [
+        {
+            "user_id": user_id,
+            "week_start": week,
+            "exercise_id": exercise_id,
+            "hard_sets": hard_sets,
+            "tonnage": tonnage,
+        }
+        for exercise_id, (hard_sets, tonnage) in deltas.items()
+        if hard_sets or tonnage
+    ]
+    if not rows:
+        return
+    stmt = dialect_insert(db, WeeklyExerciseVolume)
+    existing = WeeklyExerciseVolume.__table__.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=VOLUME_CONFLICT_COLUMNS,
+        set_={
+            "hard_sets": existing.hard_sets + stmt.excluded.hard_sets,
+            "tonnage": existing.tonnage + stmt.excluded.tonnage,
+        }
+    )
+    db.execute(stmt, rows)
+
+def record_set_change(
+    db: Session,
+    workout_session: WorkoutSession,
+    exercise_id: int,
+    before: Tuple[Optional[int], Optional[float], bool] = None,
+    after: Tuple[Optional[int], Optional[float], bool] = None
+):
+    """
+    Update the rollup for one set being added (after only), edited (both) or
+    deleted (before only). before/after are (reps, weight, is_warmup).
+    """
+    hard_sets, tonnage = set_volume(*after) if after else (0, 0.0)
+    if before:
+        old_sets, old_tonnage = set_volume(*before)
+        hard_sets -= old_sets
+        tonnage -= old_tonnage
+    apply_volume_deltas(
+        db,
+        workout_session.user_id,
+        week_start(workout_session.start_time),
+        {exercise_id: (hard_sets, tonnage)}
+    )
+
+def remove_logged_volume(db: Session, workout_session: WorkoutSession, session_exercise_id: Optional[int] = None):
+    """
+    Subtract the volume of every set in a session (or one of its exercises)
+    before those rows are deleted. One grouped query plus one upsert.
+    """
+    query = select(
+        SessionExercise.exercise_id, HARD_SET_COUNT, HARD_SET_TONNAGE
+    ).join(
+        ExerciseSet, ExerciseSet.session_exercise_id == SessionExercise.id
+    ).where(
+        SessionExercise.session_id == workout_session.id
+    ).group_by(SessionExercise.exercise_id)
+    if session_exercise_id is not None:
+        query = query.where(SessionExercise.id == session_exercise_id)
+
+    deltas = {
+        exercise_id: (-(hard_sets or 0), -(tonnage or 0.0))
+        for exercise_id, hard_sets, tonnage in db.execute(query)
+    }
+    apply_volume_deltas(db, workout_session.user_id, week_start(workout_session.start_time), deltas)
+
+def rebuild_weekly_volume(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute the rollup from the full set history, for everyone or some users.
+    Sets are aggregated per session in SQL and bucketed into weeks in Python,
+    which keeps the week arithmetic independent of the database dialect.
+    Returns the number of rollup rows written. Does not commit.
+    """
+    query = select(
+        WorkoutSession.user_id,
+        WorkoutSession.start_time,
+        SessionExercise.exercise_id,
+        HARD_SET_COUNT,
+        HARD_SET_TONNAGE,
+    ).join(
+        SessionExercise, SessionExercise.session_id == WorkoutSession.id
+    ).join(
+        ExerciseSet, ExerciseSet.session_exercise_id == SessionExercise.id
+    ).group_by(
+        WorkoutSession.id, WorkoutSession.user_id, WorkoutSession.start_time, SessionExercise.exercise_id
+    )
+    clear = delete(WeeklyExerciseVolume)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        query = query.where(WorkoutSession.user_id.in_(user_ids))
+        clear = clear.where(WeeklyExerciseVolume.user_id.in_(user_ids))
+
+    totals = defaultdict(lambda: [0, 0.0])
+    for user_id, started, exercise_id, hard_sets, tonnage in db.execute(query):
+        entry = totals[(user_id, week_start(started), exercise_id)]
+        entry[0] += hard_sets or 0
+        entry[1] += tonnage or 0.0
+
+    db.execute(clear)
+    rows = [
+        {"user_id": user_id, "week_start": week, "exercise_id": exercise_id, "hard_sets": hard_sets, "tonnage": tonnage}
+        for (user_id, week, exercise_id), (hard_sets, tonnage) in totals.items()
+        if hard_sets or tonnage
+    ]
+    if rows:
+        db.execute(insert(WeeklyExerciseVolume), rows)
+    return len(rows)
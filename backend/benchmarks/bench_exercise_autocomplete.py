@@ -0,0 +1,71 @@
+"""
+Benchmark exercise autocomplete over a 5,000-exercise catalog.
+
+Builds the search index from synthetic exercise names and times
+search_exercises for prefixes, typos and shorthand queries, with usage counts
+for a few hundred exercises. The target is a p99 under 5 ms per query.
+"""
+import itertools
+import random
+import time
+from types import SimpleNamespace
+
+from benchmarks.harness import summarize, time_calls
+from app.services.exercise_search import ExerciseSearchIndex, search_exercises
+
+CATALOG_SIZE = 5000
+ITERATIONS = 200
+P99_TARGET_MS = 5.0
+
+EQUIPMENT = ["Barbell", "Dumbbell", "Cable", "Machine", "Kettlebell", "Smith Machine", "Band", "Bodyweight"]
+VARIANTS = ["", "Incline", "Decline", "Seated", "Standing", "Single Arm", "Close Grip", "Wide Grip", "Paused", "Tempo"]
+MOVEMENTS = [
+    "Bench Press", "Row", "Squat", "Deadlift", "Overhead Press", "Curl", "Lunge", "Fly",
+    "Lateral Raise", "Tricep Extension", "Pulldown", "Hip Thrust", "Shrug", "Calf Raise",
+    "Romanian Deadlift", "Split Squat", "Pullover", "Face Pull", "Good Morning", "Step Up",
+]
+
+QUERIES = [
+    "bench", "bench pres", "bnech press", "db row", "ohp", "rdl", "sqaut", "incline db",
+    "lat pull", "cable fly", "hip thr", "tricep ext", "single arm row", "calf", "goblet",
+]
+
+def build_catalog():
+    names = [
+        " ".join(part for part in (variant, equipment, movement) if part)
+        for variant, equipment, movement in itertools.product(VARIANTS, EQUIPMENT, MOVEMENTS)
+    ]
+    # Numbered variations top the catalog up to CATALOG_SIZE
+    for i in itertools.count():
+        if len(names) >= CATALOG_SIZE:
+            break
+        names.append(f"{random.choice(VARIANTS)} {random.choice(MOVEMENTS)} Variation {i}".strip())
+    return [SimpleNamespace(id=i + 1, name=name) for i, name in enumerate(names[:CATALOG_SIZE])]
+
+def main():
+    random.seed(7)
+    exercises = build_catalog()
+
+    start = time.perf_counter()
+    index = ExerciseSearchIndex(exercises)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Indexed {len(exercises)} exercises in {build_ms:.1f} ms")
+
+    usage = {exercise.id: random.randint(1, 50) for exercise in random.sample(exercises, 300)}
+
+    print(f"{'query':>16} {'median ms':>10} {'p95 ms':>8} {'p99 ms':>8}  top result")
+    worst_p99 = 0.0
+    for query in QUERIES:
+        results = search_exercises([index], query, limit=10, usage=usage)
+        median, p95, p99 = summarize(
+            time_calls(lambda: search_exercises([index], query, limit=10, usage=usage), ITERATIONS)
+        )
+        worst_p99 = max(worst_p99, p99)
+        top = results[0][0].name if results else "-"
+        print(f"{query:>16} {median:>10.2f} {p95:>8.2f} {p99:>8.2f}  {top}")
+
+    verdict = "OK" if worst_p99 < P99_TARGET_MS else "OVER TARGET"
+    print(f"Worst p99: {worst_p99:.2f} ms (target < {P99_TARGET_MS} ms) {verdict}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark set-logging latency during a login storm.
+
+One member keeps logging sets while a burst of members sign in at once,
+as happens when a class ends. Runs the storm twice: with password hashing
+inline on the event loop (PASSWORD_HASH_WORKERS=0, the old behaviour) and on
+the password hashing pool. Inline, every bcrypt call stalls the set requests
+queued behind it; on the pool their latency should stay close to the idle
+baseline.
+"""
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.harness import (
+    BenchSessionLocal,
+    app,
+    create_user,
+    reset_database,
+    summarize,
+    use_bench_database,
+)
+from app.models.models import Exercise, SessionExercise, WorkoutSession
+from app.services.password_hashing import password_hash_pool, PASSWORD_HASH_WORKERS
+
+STORM_LOGINS = 24
+BASELINE_SETS = 30
+SET_INTERVAL_SECONDS = 0.02
+
+def seed():
+    """Create the storm's member and a lifter with a session in progress; return the set URL and headers."""
+    db = BenchSessionLocal()
+    create_user(db, "storm")
+    lifter, headers = create_user(db, "lifter")
+    exercise = Exercise(name="Bench Squat", created_by=lifter.id)
+    db.add(exercise)
+    db.flush()
+    session = WorkoutSession(user_id=lifter.id)
+    db.add(session)
+    db.flush()
+    session_exercise = SessionExercise(session_id=session.id, exercise_id=exercise.id, sets_completed=0, order=0)
+    db.add(session_exercise)
+    db.commit()
+    url = f"/api/sessions/{session.id}/exercises/{session_exercise.id}/sets"
+    db.close()
+    return url, headers
+
+async def log_sets(client, url, headers, latencies, keep_going):
+    set_number = 0
+    while keep_going():
+        set_number += 1
+        start = time.perf_counter()
+        response = await client.post(
+            url, json={"reps": 5, "weight": 100.0, "set_number": set_number}, headers=headers
+        )
+        assert response.status_code == 200, response.text
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(SET_INTERVAL_SECONDS)
+
+async def login(client):
+    response = await client.post("/api/auth/login", data={"username": "storm", "password": "Password123!"})
+    assert response.status_code == 200, response.text
+
+async def run(url, headers):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        baseline = []
+        await log_sets(client, url, headers, baseline, lambda: len(baseline) < BASELINE_SETS)
+
+        storm_latencies = []
+        done = asyncio.Event()
+        logger = asyncio.create_task(log_sets(client, url, headers, storm_latencies, lambda: not done.is_set()))
+        start = time.perf_counter()
+        await asyncio.gather(*(login(client) for _ in range(STORM_LOGINS)))
+        storm_seconds = time.perf_counter() - start
+        done.set()
+        await logger
+    return baseline, storm_latencies, storm_seconds
+
+def main():
+    reset_database()
+    use_bench_database()
+    url, headers = seed()
+
+    print(f"{STORM_LOGINS} concurrent logins while logging a set every {SET_INTERVAL_SECONDS * 1000:.0f} ms")
+    print(f"{'hashing':>14} {'phase':>9} {'sets':>5} {'median ms':>10} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for label, workers in (("inline", 0), (f"pool x{PASSWORD_HASH_WORKERS}", PASSWORD_HASH_WORKERS)):
+        password_hash_pool.shutdown()
+        password_hash_pool.workers = workers
+        baseline, storm, storm_seconds = asyncio.run(run(url, headers))
+        for phase, latencies in (("idle", baseline), ("storm", storm)):
+            median, p95, p99 = summarize(latencies)
+            print(f"{label:>14} {phase:>9} {len(latencies):>5} {median:>10.1f} {p95:>8.1f} {p99:>8.1f} {max(latencies):>8.1f}")
+        print(f"{label:>14} storm took {storm_seconds:.2f} s; pool stats {password_hash_pool.stats()}")
+    password_hash_pool.shutdown()
+
+if __name__ == "__main__":
+    main()
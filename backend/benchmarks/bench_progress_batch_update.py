@@ -0,0 +1,74 @@
+"""
+Benchmark POST /api/progress/batch-update for 10- to 200-item payloads.
+
+Each payload size runs against a plan with that many exercises. The first
+call creates the progress rows, later calls alternate weights so every item
+is updated. Reports latency and the number of SQL statements per request,
+which should stay constant as the payload grows.
+"""
+from benchmarks.harness import (
+    BenchSessionLocal,
+    count_statements,
+    create_user,
+    make_client,
+    reset_database,
+    summarize,
+    time_calls,
+)
+from app.models.models import Exercise, PlanExercise, WorkoutPlan
+
+PAYLOAD_SIZES = (10, 25, 50, 100, 200)
+ITERATIONS = 30
+
+def seed_plan(db, owner_id, size):
+    plan = WorkoutPlan(name=f"Bench Plan {size}", owner_id=owner_id)
+    db.add(plan)
+    db.flush()
+    exercises = [Exercise(name=f"Bench Exercise {size}-{i}", created_by=owner_id) for i in range(size)]
+    db.add_all(exercises)
+    db.flush()
+    db.add_all([
+        PlanExercise(workout_plan_id=plan.id, exercise_id=exercise.id, sets=3, reps=10, order=i)
+        for i, exercise in enumerate(exercises)
+    ])
+    db.commit()
+    return plan.id, [exercise.id for exercise in exercises]
+
+def main():
+    reset_database()
+    client = make_client()
+    url = client.app.url_path_for("batch_update_user_progress")
+
+    db = BenchSessionLocal()
+    user, headers = create_user(db)
+
+    print(f"{'items':>6} {'median ms':>10} {'p95 ms':>8} {'p99 ms':>8} {'statements':>11}")
+    for size in PAYLOAD_SIZES:
+        plan_id, exercise_ids = seed_plan(db, user.id, size)
+        state = {"weight": 20.0}
+
+        def call():
+            state["weight"] += 2.5
+            response = client.post(
+                url,
+                json={
+                    "workout_plan_id": plan_id,
+                    "updates": [
+                        {"exercise_id": exercise_id, "current_weight": state["weight"]}
+                        for exercise_id in exercise_ids
+                    ],
+                },
+                headers=headers,
+            )
+            assert response.status_code == 200, response.text
+
+        call()  # Creates the rows; the timed calls below are updates
+        with count_statements() as counter:
+            call()
+        median, p95, p99 = summarize(time_calls(call, ITERATIONS))
+        print(f"{size:>6} {median:>10.2f} {p95:>8.2f} {p99:>8.2f} {counter['statements']:>11}")
+
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Shared setup for the API benchmarks.
+
+Points the app at a throwaway SQLite database (the same way tests/conftest.py
+does) and provides small timing helpers. Run a benchmark from the backend
+directory, e.g. `python -m benchmarks.bench_progress_batch_update`.
+"""
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.database as db_module
+
+_db_dir = tempfile.mkdtemp(prefix="workout-bench-")
+bench_engine = create_engine(
+    f"sqlite:///{os.path.join(_db_dir, 'bench.db')}",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+BenchSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=bench_engine)
+
+# Override the engine and SessionLocal before the app is imported
+db_module.engine = bench_engine
+db_module.SessionLocal = BenchSessionLocal
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import Base, get_db  # noqa: E402
+from app.models.models import User  # noqa: E402
+from app.services.auth import create_access_token, get_password_hash  # noqa: E402
+
+def reset_database():
+    """Drop and recreate every table."""
+    Base.metadata.drop_all(bind=bench_engine)
+    Base.metadata.create_all(bind=bench_engine)
+
+def use_bench_database():
+    """Make the app's requests use the benchmark database."""
+    def override_get_db():
+        db = BenchSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+
+def make_client():
+    """Return a TestClient whose requests use the benchmark database."""
+    use_bench_database()
+    return TestClient(app)
+
+def create_user(db, username="bench"):
+    """Create a user and return (user, auth headers)."""
+    user = User(
+        username=username,
+        email=f"{username}@example.com",
+        hashed_password=get_password_hash("Password123!"),
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    token = create_access_token(data={"sub": user.username, "id": user.id, "is_admin": user.is_admin})
+    return user, {"Authorization": f"Bearer {token}"}
+
+@contextmanager
+def count_statements():
+    """Count SQL statements executed on the benchmark engine inside the block."""
+    counter = {"statements": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    event.listen(bench_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(bench_engine, "before_cursor_execute", before_cursor_execute)
+
+def time_calls(fn, iterations):
+    """Call fn repeatedly and return per-call latencies in milliseconds."""
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def summarize(latencies):
+    """Return (median, p95, p99) for a list of latencies."""
+    ordered = sorted(latencies)
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+    return statistics.median(ordered), percentile(95), percentile(99)
@@ -21,6 +21,11 @@ wait_for_db
 # echo "Running database migrations..."
 # alembic upgrade head
 
+# Add columns introduced since the database was first created (before seeding queries them)
+echo "Adding missing columns..."
+python -m app.migrations.add_user_last_seen || echo "Warning: adding users.last_seen failed. Continuing with startup..."
+python -m app.migrations.add_plan_columns || echo "Warning: adding workout_plans columns failed. Continuing with startup..."
+
 # Run database seeding - but don't stop if it fails
 # Add checks here if you only want to seed once (e.g., check for a specific table/flag)
 echo "Running database seeding (keeping existing data)..."
@@ -37,6 +42,15 @@ else
     echo "Database seeding finished successfully."
 fi
 
+# Create indexes added to existing tables since the database was first created
+echo "Creating missing indexes..."
+python -m app.migrations.create_indexes || echo "Warning: index creation failed. Continuing with startup..."
+
+# Rebuild exercise muscle associations and fill the weekly volume rollup (both idempotent)
+echo "Backfilling exercise muscle groups and weekly volume..."
+python -m app.migrations.backfill_exercise_muscles || echo "Warning: muscle group backfill failed. Continuing with startup..."
+python -m app.migrations.backfill_weekly_volume || echo "Warning: weekly volume backfill failed. Continuing with startup..."
+
 # Start the main application (Uvicorn)
 echo "Starting Uvicorn server..."
 # Use exec to replace the shell process with the uvicorn process
@@ -1,11 +1,18 @@
 import os
 import pytest
+from contextlib import contextmanager
 from typing import Generator, Dict, Any
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+# Activity is flushed explicitly by the tests that check it, not by a background thread
+os.environ.setdefault("ACTIVITY_FLUSH_INTERVAL_SECONDS", "0")
+
+# Responses carry X-DB-Queries / X-DB-Time so tests can check them
+os.environ.setdefault("DB_QUERY_DEBUG", "1")
+
 # Patch the database connection before importing app
 import app.database as db_module
 
@@ -28,6 +35,13 @@ from app.main import app
 from app.database import Base, get_db
 from app.models.models import User
 from app.services.auth import create_access_token
+from app.middleware.query_stats import request_observers
+from app.middleware.rate_limit import load_limiter
+from app.services.activity_tracker import activity_tracker
+from app.services.exercise_catalog import exercise_catalog
+from app.services.exercise_search import exercise_usage
+from app.services.slow_queries import slow_query_log
+from app.services.user_cache import user_cache
 
 @pytest.fixture(scope="function")
 def db() -> Generator:
@@ -63,6 +77,15 @@ def client(db) -> Generator:
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
+    
+    # Tables are dropped after each test, so cached exercises and users must go too,
+    # and every test starts with full rate limit buckets
+    exercise_catalog.clear()
+    exercise_usage.clear()
+    user_cache.clear()
+    activity_tracker.clear()
+    load_limiter.clear()
+    slow_query_log.clear()
 
 @pytest.fixture(scope="function")
 def test_user(db) -> Dict[str, Any]:
@@ -156,4 +179,30 @@ def admin_headers(admin_token) -> Dict[str, str]:
     """
     Returns authorization headers for the test admin user
     """
-    return {"Authorization": f"Bearer {admin_token}"}
\ No newline at end of file
+    return {"Authorization": f"Bearer {admin_token}"}
+
+@pytest.fixture(scope="function")
+def max_queries():
+    """
+    Returns a context manager asserting that every request made inside it runs
+    at most `limit` SQL statements, e.g. `with max_queries(4): client.get(...)`.
+    Yields the list of (method, path, QueryStats) recorded so far.
+    """
+    @contextmanager
+    def check(limit: int):
+        recorded = []
+        def observe(scope, stats):
+            recorded.append((scope["method"], scope["path"], stats))
+        
+        request_observers.append(observe)
+        try:
+            yield recorded
+        finally:
+            request_observers.remove(observe)
+        
+        for method, path, stats in recorded:
+            assert stats.count <= limit, (
+                f"{method} {path} ran {stats.count} SQL statements (max {limit}); "
+                f"repeated statements: {stats.repeated(2)}"
+            )
+    return check
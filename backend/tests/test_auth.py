@@ -70,6 +70,67 @@ def test_register_duplicate_username(client):
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert "Username already registered" in response.json()["detail"]
 
+def test_register_is_a_single_insert(client, db):
+    """Test that registration relies on the unique indexes instead of looking users up first"""
+    from sqlalchemy import event
+    from sqlalchemy.exc import IntegrityError
+    from app.models.models import User
+    
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.lstrip().split()[0].upper())
+    
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    try:
+        response = client.post(
+            "/api/auth/register",
+            json={"username": "first", "email": "first@example.com", "password": "Password123!"}
+        )
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", record)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["is_admin"] is True
+    assert statements == ["INSERT"]
+    
+    response = client.post(
+        "/api/auth/register",
+        json={"username": "second", "email": "first@example.com", "password": "Password123!"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Email already registered"
+    
+    # Column names inside the duplicate value do not confuse the mapping
+    client.post(
+        "/api/auth/register",
+        json={"username": "third", "email": "username@example.com", "password": "Password123!"}
+    )
+    response = client.post(
+        "/api/auth/register",
+        json={"username": "fourth", "email": "username@example.com", "password": "Password123!"}
+    )
+    assert response.json()["detail"] == "Email already registered"
+    
+    # Two sign-ups racing on an empty table cannot both become the first user
+    db.add(User(username="racer", email="racer@example.com", hashed_password="x", is_first_user=True))
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+
+def test_registration_conflict_uses_constraint_name():
+    """Test that Postgres conflicts are mapped by the violated constraint, not by the error text"""
+    from types import SimpleNamespace
+    from sqlalchemy.exc import IntegrityError
+    from app.routers.auth import _registration_conflict
+    
+    class PostgresError(Exception):
+        diag = SimpleNamespace(constraint_name="ix_users_email")
+    
+    error = IntegrityError("INSERT", {}, PostgresError("Key (email)=(username@example.com) already exists."))
+    assert _registration_conflict(error) == "email"
+    
+    error = IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed: users.is_first_user"))
+    assert _registration_conflict(error) == "is_first_user"
+
 def test_login_success(client):
     """Test successful login"""
     # Register a user first
@@ -94,6 +155,59 @@ def test_login_success(client):
     data = response.json()
     assert "access_token" in data
     assert data["token_type"] == "bearer"
+    assert data["refresh_token"]
+    assert data["expires_in"] > 0
+
+def login_tokens(client, test_user):
+    """Helper function to log the test user in and return the token response"""
+    response = client.post(
+        "/api/auth/login",
+        data={"username": test_user["username"], "password": test_user["password"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+def test_refresh_rotates_token(client, test_user):
+    """Test that a refresh token buys a working access token once, and reuse revokes the whole login"""
+    first = login_tokens(client, test_user)
+    
+    response = client.post("/api/auth/refresh", json={"refresh_token": first["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+    second = response.json()
+    assert second["refresh_token"] != first["refresh_token"]
+    headers = {"Authorization": f"Bearer {second['access_token']}"}
+    assert client.get("/api/plans", headers=headers).status_code == status.HTTP_200_OK
+    
+    # Replaying the rotated token is treated as theft: it fails and so does its successor
+    response = client.post("/api/auth/refresh", json={"refresh_token": first["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post("/api/auth/refresh", json={"refresh_token": second["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    response = client.post("/api/auth/refresh", json={"refresh_token": "not-a-token"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_logout_and_expiry_revoke_refresh_tokens(client, db, test_user):
+    """Test that logging out or letting a refresh token expire stops it from working"""
+    from datetime import datetime, timedelta
+    from app.models.models import RefreshToken
+    
+    tokens = login_tokens(client, test_user)
+    response = client.post("/api/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    tokens = login_tokens(client, test_user)
+    db.query(RefreshToken).filter(RefreshToken.revoked_at.is_(None)).update(
+        {"expires_at": datetime.utcnow() - timedelta(minutes=1)}
+    )
+    db.commit()
+    response = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    # Only hashes are stored
+    assert db.query(RefreshToken).filter(RefreshToken.token_hash == tokens["refresh_token"]).count() == 0
 
 def test_login_invalid_username(client):
     """Test login with invalid username"""
@@ -153,4 +267,161 @@ def test_update_user_settings(client, user_headers):
     )
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
-    assert data["settings"]["unitSystem"] == "imperial" 
\ No newline at end of file
+    assert data["settings"]["unitSystem"] == "imperial" 
+def test_authenticated_user_cache(client, user_headers, admin_headers, db, test_user):
+    """Test that repeated requests reuse the cached user and user writes invalidate it"""
+    from sqlalchemy import event
+    from app.services.user_cache import user_cache
+    
+    user_queries = []
+    def count_user_queries(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            user_queries.append(statement)
+    
+    event.listen(db.get_bind(), "before_cursor_execute", count_user_queries)
+    try:
+        assert client.get("/api/plans", headers=user_headers).status_code == status.HTTP_200_OK
+        user_queries.clear()
+        assert client.get("/api/plans", headers=user_headers).status_code == status.HTTP_200_OK
+        # Routes needing only the caller's identity read it from the token claims
+        assert client.get("/api/exercises", headers=user_headers).status_code == status.HTTP_200_OK
+        assert user_queries == []
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", count_user_queries)
+    
+    # A role change drops the cached row, so the new flag applies immediately
+    response = client.patch(f"/api/users/{test_user['id']}/role", params={"is_admin": True}, headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert user_cache.get(test_user["id"]) is None
+    assert client.get("/api/users/me", headers=user_headers).json()["is_admin"] is True
+    
+    # Deleted users are rejected even though their token is still valid
+    response = client.delete(f"/api/users/{test_user['id']}", headers=admin_headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert client.get("/api/users/me", headers=user_headers).status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_password_hashing_runs_on_bounded_pool(client, admin_headers, test_user):
+    """Test that logins hash on the pool and its load is reported to admins"""
+    from app.services.password_hashing import password_hash_pool
+    
+    completed = password_hash_pool.stats()["completed"]
+    response = client.post(
+        "/api/auth/login",
+        data={"username": test_user["username"], "password": test_user["password"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    response = client.get("/api/admin/password-hashing", headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    stats = response.json()
+    assert stats["completed"] == completed + 1
+    assert stats["running"] == 0 and stats["queued"] == 0
+
+def test_password_hash_pool_rejects_when_queue_full():
+    """Test that hashes beyond the workers plus the queue limit are turned away with a 503"""
+    import asyncio
+    import threading
+    from fastapi import HTTPException
+    from app.services.password_hashing import PasswordHashPool
+    
+    pool = PasswordHashPool(workers=1, max_queue=1)
+    release = threading.Event()
+    
+    async def storm():
+        slow = [asyncio.ensure_future(pool.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert pool.stats()["running"] == 1 and pool.stats()["queued"] == 1
+        with pytest.raises(HTTPException) as excinfo:
+            await pool.run(release.wait, 5)
+        release.set()
+        await asyncio.gather(*slow)
+        return excinfo.value
+    
+    try:
+        error = asyncio.run(storm())
+    finally:
+        pool.shutdown()
+    assert error.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert error.headers["Retry-After"] == "1"
+    stats = pool.stats()
+    assert (stats["completed"], stats["rejected"], stats["peak_queued"]) == (2, 1, 1)
+
+def test_login_rehashes_outdated_password_hash(client, db, test_user):
+    """Test that a hash made with an outdated cost is replaced on the next successful login"""
+    from app.models.models import User
+    from app.services.password_hashing import build_password_context, BCRYPT_ROUNDS
+    
+    user = db.query(User).filter(User.id == test_user["id"]).first()
+    user.hashed_password = build_password_context(bcrypt_rounds=4).hash(test_user["password"])
+    db.commit()
+    
+    form = {"username": test_user["username"], "password": test_user["password"]}
+    assert client.post("/api/auth/login", data=form).status_code == status.HTTP_200_OK
+    
+    db.refresh(user)
+    assert user.hashed_password.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+    assert client.post("/api/auth/login", data=form).status_code == status.HTTP_200_OK
+    
+    # A wrong password never touches the stored hash
+    stored = user.hashed_password
+    response = client.post("/api/auth/login", data={**form, "password": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    db.refresh(user)
+    assert user.hashed_password == stored
+
+def test_password_context_configuration():
+    """Test that hashes in other schemes or costs are flagged and unknown schemes are refused"""
+    from app.services.password_hashing import build_password_context
+    
+    context = build_password_context(scheme="bcrypt", bcrypt_rounds=5)
+    assert context.hash("secret").startswith("$2b$05$")
+    assert context.needs_update(build_password_context(bcrypt_rounds=4).hash("secret"))
+    assert not context.needs_update(context.hash("secret"))
+    
+    with pytest.raises(ValueError):
+        build_password_context(scheme="md5")
+
+def test_activity_is_flushed_in_one_update(client, user_headers, admin_headers, db, test_user, test_admin):
+    """Test that last login and last seen are buffered and written together in a single UPDATE"""
+    from sqlalchemy import event
+    from app.models.models import User
+    from app.services.activity_tracker import activity_tracker
+    
+    form = {"username": test_user["username"], "password": test_user["password"]}
+    assert client.post("/api/auth/login", data=form).status_code == status.HTTP_200_OK
+    assert client.get("/api/exercises", headers=user_headers).status_code == status.HTTP_200_OK
+    assert client.get("/api/exercises", headers=admin_headers).status_code == status.HTTP_200_OK
+    
+    user = db.query(User).filter(User.id == test_user["id"]).first()
+    assert user.last_login is None and user.last_seen is None
+    
+    before = activity_tracker.stats()
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.lstrip().split()[0].upper())
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    try:
+        assert activity_tracker.flush(db) == 2
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", record)
+    assert statements == ["UPDATE"]
+    
+    db.expire_all()
+    user = db.query(User).filter(User.id == test_user["id"]).first()
+    admin = db.query(User).filter(User.id == test_admin["id"]).first()
+    assert user.last_login is not None and user.last_seen >= user.last_login
+    assert admin.last_seen is not None and admin.last_login is None
+    
+    stats = client.get("/api/admin/activity-tracking", headers=admin_headers).json()
+    assert stats["flushes"] - before["flushes"] == 1
+    assert stats["users_flushed"] - before["users_flushed"] == 2
+
+def test_activity_buffer_is_bounded():
+    """Test that activity from users beyond the buffer size is dropped and counted"""
+    from app.services.activity_tracker import ActivityTracker
+    
+    tracker = ActivityTracker(max_users=2, interval=0)
+    for user_id in (1, 2, 3, 1):
+        tracker.record(user_id)
+    stats = tracker.stats()
+    assert (stats["pending_users"], stats["dropped"]) == (2, 1)
@@ -0,0 +1,363 @@
+import pytest
+from fastapi import status
+from app.models.models import Exercise
+from app.services.exercise_catalog import exercise_catalog
+
+def create_exercise(db, name, is_system=False, created_by=None, **fields):
+    """Helper function to create an exercise directly in the database"""
+    exercise = Exercise(name=name, is_system=is_system, created_by=created_by, **fields)
+    db.add(exercise)
+    db.commit()
+    db.refresh(exercise)
+    # Writes that bypass the routes must invalidate the catalog themselves
+    exercise_catalog.invalidate(user_id=created_by, system=is_system)
+    return exercise
+
+def test_get_exercises_merges_system_and_own(client, user_headers, db, test_user, test_admin):
+    """Test that the list shows system exercises plus the user's own, filtered in memory"""
+    create_exercise(db, "Bench Press", is_system=True, category="strength", equipment="barbell")
+    create_exercise(db, "Incline Bench", created_by=test_user["id"], category="strength", equipment="dumbbell")
+    create_exercise(db, "Admin Bench", created_by=test_admin["id"], category="strength")
+    
+    response = client.get("/api/exercises", params={"name": "bench"}, headers=user_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert [ex["name"] for ex in response.json()] == ["Bench Press", "Incline Bench"]
+    
+    response = client.get("/api/exercises", params={"equipment": "dumbbell"}, headers=user_headers)
+    assert [ex["name"] for ex in response.json()] == ["Incline Bench"]
+    
+    response = client.get("/api/exercises/equipment/list", headers=user_headers)
+    assert response.json() == ["barbell", "dumbbell"]
+
+def test_get_exercises_etag_and_invalidation(client, user_headers, db, test_user):
+    """Test that unchanged catalogs return 304 and writes change the ETag"""
+    create_exercise(db, "Squat", is_system=True, category="strength")
+    
+    response = client.get("/api/exercises", headers=user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["cache-control"] == "private, no-cache"
+    etag = response.headers["etag"]
+    
+    response = client.get("/api/exercises", headers={**user_headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    
+    # Creating an exercise invalidates the user's part of the catalog
+    response = client.post(
+        "/api/exercises",
+        json={"name": "Goblet Squat", "category": "strength"},
+        headers=user_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    response = client.get("/api/exercises", headers={**user_headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] != etag
+    assert [ex["name"] for ex in response.json()] == ["Squat", "Goblet Squat"]
+
+def test_system_exercise_changes_invalidate_catalog(client, user_headers, admin_headers, db):
+    """Test that admin edits to system exercises show up immediately"""
+    squat = create_exercise(db, "Squat", is_system=True, muscle_group="quads")
+    
+    response = client.get("/api/exercises/muscle-groups/list", headers=user_headers)
+    assert response.json() == ["quads"]
+    
+    response = client.put(
+        f"/api/exercises/{squat.id}",
+        json={"muscle_group": "glutes"},
+        headers=admin_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    response = client.get("/api/exercises/muscle-groups/list", headers=user_headers)
+    assert response.json() == ["glutes"]
+    
+    response = client.delete(f"/api/exercises/{squat.id}", headers=admin_headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    
+    response = client.get("/api/exercises", headers=user_headers)
+    assert response.json() == []
+
+def test_exercise_facets_with_counts(client, user_headers, db, test_user, test_admin):
+    """Test that facets count visible exercises and ignore each dimension's own filter"""
+    create_exercise(db, "Bench Press", is_system=True, category="strength", equipment="barbell", muscle_group="chest")
+    create_exercise(db, "Dumbbell Press", is_system=True, category="strength", equipment="dumbbell", muscle_group="chest")
+    create_exercise(db, "Barbell Row", is_system=True, category="strength", equipment="barbell", muscle_group="back")
+    create_exercise(db, "Rowing", is_system=True, category="cardio", equipment="machine", muscle_group="back")
+    create_exercise(db, "My Press", created_by=test_user["id"], category="strength", equipment="dumbbell", muscle_group="shoulders")
+    create_exercise(db, "Admin Press", created_by=test_admin["id"], category="strength", equipment="cable", muscle_group="chest")
+    
+    response = client.get("/api/exercises/facets", headers=user_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["total"] == 5
+    assert data["category"] == [{"value": "cardio", "count": 1}, {"value": "strength", "count": 4}]
+    assert {item["value"] for item in data["equipment"]} == {"barbell", "dumbbell", "machine"}
+    
+    response = client.get(
+        "/api/exercises/facets",
+        params={"equipment": "barbell", "category": "strength"},
+        headers=user_headers
+    )
+    data = response.json()
+    assert data["total"] == 2
+    # Equipment counts ignore the equipment filter but respect the category filter
+    assert data["equipment"] == [
+        {"value": "barbell", "count": 2},
+        {"value": "dumbbell", "count": 2}
+    ]
+    assert data["category"] == [{"value": "strength", "count": 2}]
+    assert data["muscle_group"] == [{"value": "back", "count": 1}, {"value": "chest", "count": 1}]
+
+def test_autocomplete_tolerates_typos_and_shorthand(client, user_headers, db, test_user):
+    """Test that autocomplete finds prefixes, misspellings and expanded shorthand"""
+    create_exercise(db, "Bench Press", is_system=True)
+    create_exercise(db, "Incline Bench Press", is_system=True)
+    create_exercise(db, "Dumbbell Row", is_system=True)
+    create_exercise(db, "Barbell Squat", is_system=True)
+    
+    response = client.get("/api/exercises/autocomplete", params={"q": "bench pres"}, headers=user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [ex["name"] for ex in response.json()][:2] == ["Bench Press", "Incline Bench Press"]
+    
+    response = client.get("/api/exercises/autocomplete", params={"q": "db row"}, headers=user_headers)
+    assert response.json()[0]["name"] == "Dumbbell Row"
+    
+    response = client.get("/api/exercises/autocomplete", params={"q": "sqaut"}, headers=user_headers)
+    assert response.json()[0]["name"] == "Barbell Squat"
+
+def test_autocomplete_boosts_frequently_used(client, user_headers, db, test_user):
+    """Test that exercises the user logs often rank above equally good matches"""
+    from app.models.models import WorkoutSession, SessionExercise
+    create_exercise(db, "Bench Press", is_system=True)
+    close_grip = create_exercise(db, "Bench Press Close Grip", created_by=test_user["id"])
+    
+    session = WorkoutSession(user_id=test_user["id"], status="completed")
+    db.add(session)
+    db.commit()
+    db.add_all([SessionExercise(session_id=session.id, exercise_id=close_grip.id, order=i) for i in range(10)])
+    db.commit()
+    
+    response = client.get("/api/exercises/autocomplete", params={"q": "bench"}, headers=user_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert [ex["name"] for ex in response.json()] == ["Bench Press Close Grip", "Bench Press"]
+
+def test_import_exercises_reports_per_row_failures(client, user_headers, db, test_user):
+    """Test that import inserts new rows in bulk and reports each rejected row"""
+    import json
+    create_exercise(db, "Squat", is_system=True)
+    payload = [
+        {"name": "Goblet Squat", "category": "strength", "muscle_group": "quads"},
+        {"name": "Squat"},
+        {"description": "No name"},
+        {"name": "Goblet Squat"},
+        {"name": "Step Up", "starting_weight_kg": "heavy"},
+        {"name": "Box Jump", "category": "plyometric"}
+    ]
+    
+    response = client.post(
+        "/api/exercises/import",
+        files={"file": ("exercises.json", json.dumps(payload), "application/json")},
+        headers=user_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()["results"]
+    assert results["success"] == 2
+    assert results["failed"] == 4
+    assert [(failure["row"], failure["reason"]) for failure in results["failed_exercises"]][:4] == [
+        (1, "Exercise with this name already exists"),
+        (2, "Missing name field"),
+        (3, "Duplicate name in file"),
+        (4, results["failed_exercises"][3]["reason"])
+    ]
+    assert results["failed_exercises"][3]["reason"].startswith("Invalid starting_weight_kg")
+    
+    # The catalog picks up the new exercises right away
+    response = client.get("/api/exercises", params={"name": "goblet"}, headers=user_headers)
+    assert [ex["name"] for ex in response.json()] == ["Goblet Squat"]
+
+def test_import_exercises_upsert(client, user_headers, db, test_user):
+    """Test that upsert mode updates the user's own exercises but not system ones"""
+    import json
+    own = create_exercise(db, "My Curl", created_by=test_user["id"], category="strength", equipment="dumbbell")
+    create_exercise(db, "Squat", is_system=True)
+    payload = [
+        {"name": "My Curl", "equipment": "cable"},
+        {"name": "Squat", "category": "legs"},
+        {"name": "Hammer Curl"}
+    ]
+    
+    response = client.post(
+        "/api/exercises/import",
+        files={"file": ("exercises.json", json.dumps(payload), "application/json")},
+        data={"upsert": "true"},
+        headers=user_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()["results"]
+    assert (results["success"], results["updated"], results["failed"]) == (1, 1, 1)
+    assert results["failed_exercises"][0]["reason"] == "Not authorized to modify this exercise"
+    
+    db.expire_all()
+    curl = db.query(Exercise).filter(Exercise.id == own.id).first()
+    assert curl.equipment == "cable"
+    assert curl.category == "strength"
+
+def test_filter_exercises_by_muscle_association(client, user_headers, db, test_user):
+    """Test that muscle filtering covers primary and secondary movers via exercise_muscles"""
+    from app.models.models import ExerciseMuscle, MuscleGroup
+    
+    response = client.post(
+        "/api/exercises",
+        json={"name": "Hip Thrust", "muscle_group": "Glutes"},
+        headers=user_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    squat = client.post(
+        "/api/exercises",
+        json={"name": "Back Squat", "muscle_group": "Quads"},
+        headers=user_headers
+    ).json()
+    client.post("/api/exercises", json={"name": "Curl", "muscle_group": "Biceps"}, headers=user_headers)
+    
+    # Secondary muscles come in through an update
+    response = client.put(
+        f"/api/exercises/{squat['id']}",
+        json={"secondary_muscle_groups": "glutes, Hamstrings, quads"},
+        headers=user_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    roles = {
+        (row.muscle_group.key, row.role, row.weight)
+        for row in db.query(ExerciseMuscle).filter(ExerciseMuscle.exercise_id == squat["id"])
+    }
+    assert roles == {("quads", "primary", 1.0), ("glutes", "secondary", 0.5), ("hamstrings", "secondary", 0.5)}
+    assert db.query(MuscleGroup).filter(MuscleGroup.key == "glutes").count() == 1
+    
+    response = client.get("/api/exercises", params={"muscle": "GLUTES"}, headers=user_headers)
+    assert sorted(ex["name"] for ex in response.json()) == ["Back Squat", "Hip Thrust"]
+    
+    response = client.get(
+        "/api/exercises",
+        params={"muscle": "glutes", "muscle_role": "primary"},
+        headers=user_headers
+    )
+    assert [ex["name"] for ex in response.json()] == ["Hip Thrust"]
+
+def test_backfill_exercise_muscles(db, test_user):
+    """Test that the backfill rebuilds associations from the text columns and can be rerun"""
+    from app.migrations.backfill_exercise_muscles import backfill_exercise_muscles
+    from app.models.models import ExerciseMuscle
+    create_exercise(db, "Deadlift", is_system=True, muscle_group="Back", secondary_muscle_groups="Glutes,Hamstrings")
+    create_exercise(db, "Plank", is_system=True, muscle_group="Core")
+    create_exercise(db, "Mystery", is_system=True)
+    
+    assert backfill_exercise_muscles(db) == 4
+    assert backfill_exercise_muscles(db) == 4
+    db.commit()
+    
+    assert db.query(ExerciseMuscle).count() == 4
+
+def test_exercise_substitutes_ranked_by_similarity(client, user_headers, admin_headers, db, test_user, test_admin):
+    """Test that substitutes favour shared muscles, then matching equipment and difficulty"""
+    bench = create_exercise(db, "Bench Press", is_system=True, category="strength", equipment="barbell",
+                            muscle_group="Chest", secondary_muscle_groups="Triceps,Shoulders",
+                            difficulty_level="intermediate")
+    create_exercise(db, "Dumbbell Bench", is_system=True, category="strength", equipment="dumbbell",
+                    muscle_group="Chest", secondary_muscle_groups="Triceps,Shoulders", difficulty_level="intermediate")
+    create_exercise(db, "Dip", is_system=True, category="strength", equipment="bodyweight",
+                    muscle_group="Triceps", secondary_muscle_groups="Chest", difficulty_level="advanced")
+    create_exercise(db, "Squat", is_system=True, category="strength", equipment="barbell", muscle_group="Quads")
+    create_exercise(db, "Machine Press", created_by=test_user["id"], category="strength", equipment="machine",
+                    muscle_group="Chest", secondary_muscle_groups="Triceps", difficulty_level="beginner")
+    create_exercise(db, "Admin Press", created_by=test_admin["id"], muscle_group="Chest")
+    
+    response = client.get(f"/api/exercises/{bench.id}/substitutes", headers=user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    substitutes = response.json()
+    # Exercises sharing no muscle group and other users' exercises are never offered
+    assert [ex["name"] for ex in substitutes] == ["Dumbbell Bench", "Machine Press", "Dip"]
+    assert substitutes[0]["similarity"] > substitutes[1]["similarity"] > substitutes[2]["similarity"]
+    
+    response = client.get(f"/api/exercises/{bench.id}/substitutes", params={"limit": 1}, headers=user_headers)
+    assert [ex["name"] for ex in response.json()] == ["Dumbbell Bench"]
+    
+    # A change to a system exercise is picked up by the index on the next load
+    response = client.put(
+        f"/api/exercises/{bench.id + 1}",
+        json={"muscle_group": "Back", "secondary_muscle_groups": ""},
+        headers=admin_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get(f"/api/exercises/{bench.id}/substitutes", headers=user_headers)
+    assert [ex["name"] for ex in response.json()] == ["Machine Press", "Dip"]
+    
+    admin_press = db.query(Exercise).filter(Exercise.name == "Admin Press").first()
+    response = client.get(f"/api/exercises/{admin_press.id}/substitutes", headers=user_headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+def test_substitution_index_sync_matches_rebuild():
+    """Test that incrementally synced neighbours equal a full rebuild"""
+    import random
+    from types import SimpleNamespace
+    from app.services.exercise_substitutes import SubstitutionIndex
+    
+    rng = random.Random(7)
+    muscles = ["Chest", "Back", "Quads", "Glutes", "Hamstrings", "Shoulders", "Triceps", "Biceps"]
+    
+    def random_exercise(exercise_id):
+        return SimpleNamespace(
+            id=exercise_id,
+            name=f"Exercise {exercise_id}",
+            muscle_group=rng.choice(muscles),
+            secondary_muscle_groups=",".join(rng.sample(muscles, rng.randint(0, 2))),
+            category=rng.choice(["strength", "hypertrophy", None]),
+            equipment=rng.choice(["barbell", "dumbbell", "cable", None]),
+            difficulty_level=rng.choice(["beginner", "intermediate", "advanced", None]),
+        )
+    
+    exercises = {exercise_id: random_exercise(exercise_id) for exercise_id in range(1, 121)}
+    index = SubstitutionIndex(exercises.values(), top_k=5)
+    for _ in range(10):
+        for exercise_id in rng.sample(sorted(exercises), 5):
+            del exercises[exercise_id]
+        for exercise_id in rng.sample(sorted(exercises), 5):
+            exercises[exercise_id] = random_exercise(exercise_id)
+        new_id = max(exercises) + 1
+        exercises[new_id] = random_exercise(new_id)
+        
+        index.sync(exercises.values())
+        rebuilt = SubstitutionIndex(exercises.values(), top_k=5)
+        for exercise_id in exercises:
+            assert index.neighbors(exercise_id, 5) == pytest.approx(rebuilt.neighbors(exercise_id, 5))
+
+def test_concurrent_catalog_misses_load_once(monkeypatch):
+    """Test that requests missing the system catalog at the same time reload it only once"""
+    import threading
+    import time
+    from app.services.exercise_catalog import ExerciseCatalog, _Snapshot
+    
+    catalog = ExerciseCatalog()
+    loads = []
+    def slow_load(db):
+        loads.append(db)
+        time.sleep(0.05)
+        snapshot = catalog._system = _Snapshot([])
+        return snapshot
+    monkeypatch.setattr(catalog, "_load", slow_load)
+    
+    snapshots = []
+    threads = [threading.Thread(target=lambda: snapshots.append(catalog._system_snapshot(None))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(loads) == 1
+    assert len({id(snapshot) for snapshot in snapshots}) == 1
+    assert (catalog.hits, catalog.misses) == (7, 1)
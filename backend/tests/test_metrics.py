@@ -0,0 +1,34 @@
+import pytest
+from fastapi import status
+
+def sample(text, line_prefix):
+    """Helper function to read the value of the first metrics line starting with line_prefix"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+def test_metrics_are_labeled_by_route_template(client, user_headers):
+    """Test that request metrics use route templates, not raw paths, in the Prometheus format"""
+    before = client.get("/metrics").text
+    for session_id in (101, 102, 103):
+        client.get(f"/api/sessions/{session_id}", headers=user_headers)
+    client.get("/api/not-a-route")
+
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+
+    series = 'http_requests_total{method="GET",route="/api/sessions/{session_id}",status="404"}'
+    assert sample(text, series) - (sample(before, series) or 0) == 3
+    assert "/api/sessions/101" not in text
+    assert sample(text, 'http_requests_total{method="GET",route="unmatched",status="404"}') >= 1
+
+    histogram = 'http_request_duration_seconds_bucket{method="GET",route="/api/sessions/{session_id}",le="+Inf"}'
+    assert sample(text, histogram) == sample(text, 'http_request_duration_seconds_count{method="GET",route="/api/sessions/{session_id}"}')
+    # The scrape itself is in progress while it renders
+    assert sample(text, "http_requests_in_flight") == 1
+    assert sample(text, 'cache_hit_ratio{cache="users"}') is not None
+    assert "# TYPE cache_hits_total counter" in text
+    assert sample(text, 'cache_misses_total{cache="exercise_catalog"}') is not None
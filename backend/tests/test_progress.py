@@ -0,0 +1,218 @@
+import pytest
+from fastapi import status
+from app.models.models import WorkoutPlan, PlanExercise, Exercise, UserProgramProgress
+
+def create_plan(db, owner_id, exercise_count=3):
+    """Helper function to create a plan with a few exercises"""
+    plan = WorkoutPlan(name="Progress Plan", is_public=False, owner_id=owner_id)
+    db.add(plan)
+    db.commit()
+    db.refresh(plan)
+
+    exercises = []
+    for i in range(exercise_count):
+        exercise = Exercise(name=f"Progress Exercise {i}", category="strength", created_by=owner_id)
+        db.add(exercise)
+        db.commit()
+        db.refresh(exercise)
+        db.add(PlanExercise(workout_plan_id=plan.id, exercise_id=exercise.id, sets=3, reps=8 + i, order=i))
+        exercises.append(exercise)
+    db.commit()
+    return plan, exercises
+
+def test_batch_update_reports_per_item_outcomes(client, user_headers, db, test_user):
+    """Test that the batch update upserts rows and reports each item's outcome"""
+    plan, exercises = create_plan(db, test_user["id"])
+
+    # Existing progress whose next_weight was already set by progression
+    db.add(UserProgramProgress(
+        user_id=test_user["id"],
+        workout_plan_id=plan.id,
+        exercise_id=exercises[1].id,
+        current_weight=40.0,
+        current_reps=9,
+        next_weight=42.5,
+        next_reps=9
+    ))
+    db.add(UserProgramProgress(
+        user_id=test_user["id"],
+        workout_plan_id=plan.id,
+        exercise_id=exercises[2].id,
+        current_weight=60.0,
+        current_reps=10
+    ))
+    db.commit()
+
+    response = client.post(
+        "/api/progress/batch-update",
+        json={
+            "workout_plan_id": plan.id,
+            "updates": [
+                {"exercise_id": exercises[0].id, "current_weight": 20.0},
+                {"exercise_id": exercises[1].id, "current_weight": 45.0},
+                {"exercise_id": exercises[2].id, "current_weight": 60.0},
+                {"exercise_id": 99999, "current_weight": 10.0}
+            ]
+        },
+        headers=user_headers
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["updated_count"] == 2
+    assert data["failed_count"] == 1
+    outcomes = {result["exercise_id"]: result["status"] for result in data["results"]}
+    assert outcomes == {
+        exercises[0].id: "created",
+        exercises[1].id: "updated",
+        exercises[2].id: "unchanged",
+        99999: "failed"
+    }
+
+    db.expire_all()
+    progress = {
+        record.exercise_id: record
+        for record in db.query(UserProgramProgress).filter(UserProgramProgress.workout_plan_id == plan.id)
+    }
+
+    # New rows take their reps from the plan
+    assert progress[exercises[0].id].current_weight == 20.0
+    assert progress[exercises[0].id].current_reps == 8
+    assert progress[exercises[0].id].next_weight == 20.0
+
+    # Existing rows keep progression targets and untouched fields
+    assert progress[exercises[1].id].current_weight == 45.0
+    assert progress[exercises[1].id].next_weight == 42.5
+    assert progress[exercises[1].id].current_reps == 9
+
+def test_batch_update_requires_plan_access(client, user_headers, db, test_admin):
+    """Test that another user's private plan cannot be updated"""
+    plan, exercises = create_plan(db, test_admin["id"], exercise_count=1)
+
+    response = client.post(
+        "/api/progress/batch-update",
+        json={
+            "workout_plan_id": plan.id,
+            "updates": [{"exercise_id": exercises[0].id, "current_weight": 20.0}]
+        },
+        headers=user_headers
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+def test_muscle_volume_rollup_follows_logged_sets(client, user_headers, db, test_user, max_queries):
+    """Test that weekly muscle volume tracks set edits and credits secondary muscles fractionally"""
+    from app.models.models import WeeklyExerciseVolume
+    from app.services.volume_rollup import rebuild_weekly_volume
+    
+    squat = client.post(
+        "/api/exercises",
+        json={"name": "Volume Squat", "muscle_group": "Quads", "secondary_muscle_groups": "Glutes"},
+        headers=user_headers
+    ).json()
+    
+    with max_queries(50) as recorded:
+        response = client.post(
+            "/api/sessions",
+            json={"exercises": [{
+                "exercise_id": squat["id"],
+                "sets_completed": 3,
+                "order": 1,
+                "sets": [
+                    {"reps": 5, "weight": 60.0, "set_number": 1, "is_warmup": True},
+                    {"reps": 5, "weight": 100.0, "set_number": 2},
+                    {"reps": 5, "weight": 100.0, "set_number": 3}
+                ]
+            }]},
+            headers=user_headers
+        )
+    assert response.status_code == status.HTTP_200_OK
+    # Saving the workout adds its volume to the rollup with a single upsert
+    rollup_writes = [
+        count for statement, count in recorded[0][2].statements.items()
+        if statement.startswith("INSERT INTO weekly_exercise_volume")
+    ]
+    assert rollup_writes == [1]
+    session = response.json()
+    session_exercise = session["exercises"][0]
+    base_url = f"/api/sessions/{session['id']}/exercises/{session_exercise['id']}/sets"
+    
+    # Add a set, then edit and delete existing ones
+    response = client.post(base_url, json={"reps": 8, "weight": 80.0, "set_number": 4}, headers=user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    working_sets = sorted(
+        (s for s in session_exercise["sets"] if not s["is_warmup"]), key=lambda s: s["set_number"]
+    )
+    response = client.put(f"{base_url}/{working_sets[0]['id']}", json={"weight": 110.0}, headers=user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    response = client.delete(f"{base_url}/{working_sets[1]['id']}", headers=user_headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    
+    response = client.get("/api/progress/muscle-volume", headers=user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    weeks = response.json()["weeks"]
+    assert len(weeks) == 1
+    muscles = {entry["muscle_group"]: entry for entry in weeks[0]["muscles"]}
+    # Working sets: 5 x 110 and 8 x 80
+    assert muscles["Quads"] == {"muscle_group": "Quads", "hard_sets": 2.0, "tonnage": 1190.0}
+    assert muscles["Glutes"] == {"muscle_group": "Glutes", "hard_sets": 1.0, "tonnage": 595.0}
+    
+    # The incrementally maintained rollup matches a full rebuild
+    incremental = [(row.exercise_id, row.hard_sets, row.tonnage) for row in db.query(WeeklyExerciseVolume)]
+    rebuild_weekly_volume(db, [test_user["id"]])
+    rebuilt = [(row.exercise_id, row.hard_sets, row.tonnage) for row in db.query(WeeklyExerciseVolume)]
+    assert incremental == rebuilt
+    
+    # Deleting the session removes its volume
+    response = client.delete(f"/api/sessions/{session['id']}", headers=user_headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert client.get("/api/progress/muscle-volume", headers=user_headers).json()["weeks"] == []
+
+def test_exercise_history_keyset_pagination(client, user_headers, db, test_user):
+    """Test that history pages follow the cursor without gaps or repeats, newest first"""
+    from datetime import datetime, timedelta
+    from app.models.models import WorkoutSession, SessionExercise, ExerciseSet
+    
+    exercise = Exercise(name="History Squat", category="strength", created_by=test_user["id"])
+    db.add(exercise)
+    db.commit()
+    
+    base = datetime(2024, 1, 1, 9, 0)
+    expected = []
+    # Two entries share a start time, so the session exercise id breaks the tie
+    for day in [0, 1, 2, 2, 3]:
+        session = WorkoutSession(user_id=test_user["id"], start_time=base + timedelta(days=day), status="completed")
+        db.add(session)
+        db.flush()
+        session_exercise = SessionExercise(session_id=session.id, exercise_id=exercise.id, sets_completed=2, order=0)
+        db.add(session_exercise)
+        db.flush()
+        for number in (1, 2):
+            db.add(ExerciseSet(session_exercise_id=session_exercise.id, reps=5, weight=100.0 + day,
+                               set_number=number, perceived_effort=8))
+        expected.append(session_exercise.id)
+    db.commit()
+    expected.reverse()
+    
+    seen = []
+    cursor = None
+    for _ in range(5):
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(f"/api/progress/exercises/{exercise.id}/history", params=params, headers=user_headers)
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        seen.extend(item["session_exercise_id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    
+    assert seen == expected
+    first = client.get(f"/api/progress/exercises/{exercise.id}/history", headers=user_headers).json()["items"][0]
+    assert [(s["set_number"], s["weight"], s["perceived_effort"]) for s in first["sets"]] == [(1, 103.0, 8), (2, 103.0, 8)]
+    
+    response = client.get(
+        f"/api/progress/exercises/{exercise.id}/history", params={"cursor": "not-a-cursor"}, headers=user_headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi import status
+from sqlalchemy import text
+from app.middleware.query_stats import QueryStatsMiddleware
+from tests.test_workout_sessions import create_exercise, log_session
+
+def test_query_count_headers_and_budget(client, user_headers, db, test_user, max_queries):
+    """Test that responses report their SQL statements and the session list does not grow with the data"""
+    squat = create_exercise(db, "Squat", test_user["id"])
+    now = datetime.now(timezone.utc)
+    for day in range(1, 7):
+        log_session(client, user_headers, now - timedelta(days=day), {squat.id: [(5, 100.0)]})
+
+    with max_queries(2) as recorded:
+        response = client.get("/api/sessions", headers=user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 6
+    assert int(response.headers["X-DB-Queries"]) == recorded[0][2].count
+    assert response.headers["X-DB-Time"].endswith("ms")
+
+def test_repeated_statements_are_logged_as_n_plus_one(db, caplog):
+    """Test that a statement run in a loop within one request is reported with its route"""
+    async def endpoint(scope, receive, send):
+        for i in range(5):
+            db.execute(text("SELECT :value"), {"value": i})
+        db.execute(text("SELECT 1"))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+    async def send(message):
+        sent.append(message)
+
+    middleware = QueryStatsMiddleware(endpoint, debug_headers=True)
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(middleware({"type": "http", "method": "GET", "path": "/loop"}, None, send))
+
+    headers = dict(sent[0]["headers"])
+    assert headers[b"x-db-queries"] == b"6"
+    suspects = [record.getMessage() for record in caplog.records if "N+1" in record.getMessage()]
+    assert len(suspects) == 1
+    assert "GET unmatched: ran 5 times: SELECT ?" in suspects[0]
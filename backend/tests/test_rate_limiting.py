@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import pytest
+from fastapi import status
+from app.middleware.rate_limit import (
+    ConcurrencyLimiter,
+    LoadLimiter,
+    RateLimit,
+    RedisBucketStore,
+    load_limiter,
+)
+
+def test_route_group_limits_per_client(client, monkeypatch, user_headers, admin_headers):
+    """Test that clients over their route group's limit get a 429 with Retry-After, per user"""
+    monkeypatch.setitem(load_limiter.limits, "auth", RateLimit(per_minute=6, burst=2))
+    monkeypatch.setitem(load_limiter.limits, "sessions", RateLimit(per_minute=6, burst=1))
+
+    form = {"username": "nobody", "password": "wrong"}
+    assert client.post("/api/auth/login", data=form).status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.post("/api/auth/login", data=form).status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post("/api/auth/login", data=form)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert 1 <= int(response.headers["Retry-After"]) <= 10
+
+    # Each signed-in user has their own bucket, and other groups are unaffected
+    assert client.get("/api/sessions", headers=user_headers).status_code == status.HTTP_200_OK
+    assert client.get("/api/sessions", headers=user_headers).status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert client.get("/api/sessions", headers=admin_headers).status_code == status.HTTP_200_OK
+    assert client.get("/api/exercises", headers=user_headers).status_code == status.HTTP_200_OK
+    assert client.get("/api/health").status_code == status.HTTP_200_OK
+
+    stats = client.get("/api/admin/rate-limiting", headers=admin_headers).json()
+    assert stats["rate_limited"] == {"auth": 1, "sessions": 1}
+
+def test_concurrency_limiter_sheds_when_queue_is_full():
+    """Test that requests beyond the queue depth are rejected instead of waiting"""
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1)
+        assert await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        assert await limiter.acquire() is False
+        limiter.release()
+        assert await waiter
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert (limiter.in_flight, limiter.queued, limiter.peak_queued, limiter.shed) == (0, 0, 1, 1)
+
+def test_redis_bucket_store():
+    """Test that the Redis store's Lua script keeps one expiring, refilling bucket per client key"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs Lua scripts with lupa
+
+    redis = fakeredis.FakeAsyncRedis()
+    store = RedisBucketStore(redis)
+    limit = RateLimit(per_minute=60, burst=2)
+    limiter = LoadLimiter(store=store, limits={"default": limit})
+    scope = {"client": ("10.0.0.1", 1234), "headers": []}
+
+    async def scenario():
+        waits = [await limiter.check_rate(scope, "default") for _ in range(2)]
+        # Half a token refills in half a second; ten seconds later the bucket is full again
+        times = [1000.0, 1000.0, 1000.0, 1000.5, 1010.0, 1010.0, 1010.0]
+        clock_waits = [await store.take("default:user:7", limit, now) for now in times]
+        return waits, clock_waits, sorted(await redis.keys("*")), await redis.ttl("ratelimit:default:ip:10.0.0.1")
+
+    waits, clock_waits, keys, ttl = asyncio.run(scenario())
+    assert waits == [0.0, 0.0]
+    assert clock_waits == [0.0, 0.0, 1.0, 0.5, 0.0, 0.0, 1.0]
+    assert keys == [b"ratelimit:default:ip:10.0.0.1", b"ratelimit:default:user:7"]
+    assert ttl == 3
+
+class UnavailableRedis:
+    """Async Redis client whose server cannot be reached"""
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    async def eval(self, *args):
+        self.calls += 1
+        raise self.error
+
+def test_redis_bucket_store_fails_open(client, monkeypatch, user_headers, caplog):
+    """Test that requests are let through, and the error logged, when Redis is down or slow"""
+    errors = [ConnectionError("Connection refused"), asyncio.TimeoutError()]
+    try:
+        import redis
+        errors.append(redis.ConnectionError("Error 111 connecting to redis:6379"))
+    except ImportError:
+        pass
+
+    for error in errors:
+        unavailable = UnavailableRedis(error)
+        monkeypatch.setattr(load_limiter, "store", RedisBucketStore(unavailable))
+        monkeypatch.setitem(load_limiter.limits, "sessions", RateLimit(per_minute=6, burst=1))
+        caplog.clear()
+        with caplog.at_level(logging.ERROR):
+            for _ in range(3):
+                assert client.get("/api/sessions", headers=user_headers).status_code == status.HTTP_200_OK
+        assert unavailable.calls == 3
+        assert "Rate limit store unavailable" in caplog.text
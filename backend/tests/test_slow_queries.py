@@ -0,0 +1,28 @@
+import pytest
+from fastapi import status
+from app.services.slow_queries import slow_query_log, parameter_shape
+
+def test_slow_queries_are_logged_with_route_and_plan(client, user_headers, admin_headers, monkeypatch):
+    """Test that statements over the threshold are kept with their route, parameter types and plan"""
+    # Treat every statement as slow
+    monkeypatch.setattr(slow_query_log, "threshold_ms", 0.000001)
+    response = client.get("/api/sessions/12345", headers=user_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    slow_query_log.wait_for_plans()
+    monkeypatch.undo()
+
+    response = client.get("/api/admin/slow-queries", params={"limit": 10}, headers=admin_headers)
+    assert response.status_code == status.HTTP_200_OK
+    queries = response.json()["queries"]
+    lookup = next(q for q in queries if "FROM workout_sessions" in q["statement"])
+    assert lookup["route"] == "GET /api/sessions/{session_id}"
+    assert "12345" not in str(lookup["parameters"])
+    assert "int" in str(lookup["parameters"])
+    assert lookup["plan_status"] == "captured"
+    assert any("workout_sessions" in line for line in lookup["plan"])
+
+def test_parameter_shape_hides_values():
+    """Test that only the types of bound parameters are recorded"""
+    assert parameter_shape({"user_id": 3, "name": "secret"}) == {"user_id": "int", "name": "str"}
+    assert parameter_shape((3, "secret")) == ["int", "str"]
+    assert parameter_shape([(1, "a"), (2, "b")], executemany=True) == {"rows": 2, "row": ["int", "str"]}
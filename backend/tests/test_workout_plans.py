@@ -502,4 +502,358 @@ def test_reorder_exercises_in_plan(client, user_headers, db, test_user):
     plan_data = response.json()
     exercises = sorted(plan_data["exercises"], key=lambda x: x["order"])
     assert exercises[0]["exercise_id"] == exercise2.id
-    assert exercises[1]["exercise_id"] == exercise1.id 
\ No newline at end of file
+    assert exercises[1]["exercise_id"] == exercise1.id 
+# Batch edit tests
+def test_batch_edit_workout_plan(client, user_headers, db, test_user, test_exercise):
+    """Test applying adds, updates, removes and metadata changes in one request"""
+    plan = WorkoutPlan(
+        name="Plan for Batch Edit",
+        description="Plan to test batch editing",
+        is_public=True,
+        owner_id=test_user["id"]
+    )
+    db.add(plan)
+    db.commit()
+    db.refresh(plan)
+    
+    keep = PlanExercise(workout_plan_id=plan.id, exercise_id=test_exercise.id, sets=3, reps=10, order=1)
+    drop = PlanExercise(workout_plan_id=plan.id, exercise_id=test_exercise.id, sets=3, reps=10, order=2)
+    db.add_all([keep, drop])
+    db.commit()
+    version = plan.version
+    
+    response = client.patch(
+        f"/api/plans/{plan.id}",
+        json={
+            "version": version,
+            "plan": {"name": "Renamed Plan"},
+            "add": [{"exercise_id": test_exercise.id, "sets": 5, "reps": 5, "order": 3}],
+            "update": [{"id": keep.id, "sets": 4}],
+            "remove": [drop.id]
+        },
+        headers=user_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["name"] == "Renamed Plan"
+    assert data["version"] == version + 1
+    
+    exercises = sorted(data["exercises"], key=lambda x: x["order"])
+    assert [ex["order"] for ex in exercises] == [1, 3]
+    assert exercises[0]["sets"] == 4
+    assert exercises[0]["reps"] == 10
+    assert exercises[1]["sets"] == 5
+
+def test_batch_edit_is_all_or_nothing(client, user_headers, db, test_user, test_exercise):
+    """Test that an invalid exercise reference rejects the whole batch"""
+    plan = WorkoutPlan(
+        name="Plan for Atomic Edit",
+        is_public=True,
+        owner_id=test_user["id"]
+    )
+    db.add(plan)
+    db.commit()
+    db.refresh(plan)
+    
+    existing = PlanExercise(workout_plan_id=plan.id, exercise_id=test_exercise.id, sets=3, reps=10, order=1)
+    db.add(existing)
+    db.commit()
+    
+    response = client.patch(
+        f"/api/plans/{plan.id}",
+        json={
+            "plan": {"name": "Should Not Be Saved"},
+            "add": [{"exercise_id": 99999, "sets": 3, "reps": 10, "order": 2}],
+            "remove": [existing.id]
+        },
+        headers=user_headers
+    )
+    
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    db.expire_all()
+    db_plan = db.query(WorkoutPlan).filter(WorkoutPlan.id == plan.id).first()
+    assert db_plan.name == "Plan for Atomic Edit"
+    assert db_plan.version == 1
+    assert db.query(PlanExercise).filter(PlanExercise.workout_plan_id == plan.id).count() == 1
+
+def test_batch_edit_rejects_stale_version(client, user_headers, db, test_user):
+    """Test that saving against an outdated plan version returns 409"""
+    plan = WorkoutPlan(
+        name="Plan for Version Check",
+        is_public=True,
+        owner_id=test_user["id"]
+    )
+    db.add(plan)
+    db.commit()
+    db.refresh(plan)
+    
+    response = client.patch(
+        f"/api/plans/{plan.id}",
+        json={"version": plan.version + 1, "plan": {"name": "Stale"}},
+        headers=user_headers
+    )
+    
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+# Clone tests
+def create_plan_with_exercises(db, owner_id, exercise_id, count=2):
+    """Helper function to create a public plan with a few exercises"""
+    plan = WorkoutPlan(name="Source Plan", is_public=True, owner_id=owner_id)
+    db.add(plan)
+    db.commit()
+    db.refresh(plan)
+    for i in range(count):
+        db.add(PlanExercise(workout_plan_id=plan.id, exercise_id=exercise_id, sets=3, reps=10 + i, order=i))
+    db.commit()
+    return plan
+
+def test_clone_workout_plan(client, user_headers, db, test_user, test_exercise):
+    """Test that cloning copies every exercise row into the new plan"""
+    source = create_plan_with_exercises(db, test_user["id"], test_exercise.id)
+    
+    response = client.post(f"/api/plans/{source.id}/clone", headers=user_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["name"] == "Copy of Source Plan"
+    assert data["template_plan_id"] is None
+    assert len(data["exercises"]) == 2
+    assert db.query(PlanExercise).filter(PlanExercise.workout_plan_id == data["id"]).count() == 2
+
+def test_copy_on_write_clone_shares_until_edit(client, user_headers, db, test_user, test_exercise):
+    """Test that a copy-on-write clone reads the source rows and copies them on first edit"""
+    source = create_plan_with_exercises(db, test_user["id"], test_exercise.id)
+    source_rows = db.query(PlanExercise).filter(PlanExercise.workout_plan_id == source.id).order_by(PlanExercise.order).all()
+    
+    response = client.post(
+        f"/api/plans/{source.id}/clone",
+        params={"copy_on_write": True},
+        headers=user_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    clone_id = response.json()["id"]
+    assert response.json()["template_plan_id"] == source.id
+    assert db.query(PlanExercise).filter(PlanExercise.workout_plan_id == clone_id).count() == 0
+    
+    # Reads follow the template
+    response = client.get(f"/api/plans/{clone_id}", headers=user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [ex["reps"] for ex in sorted(response.json()["exercises"], key=lambda x: x["order"])] == [10, 11]
+    
+    # Editing with the ids the client saw copies the rows first
+    response = client.put(
+        f"/api/plans/{clone_id}/exercises/{source_rows[0].id}",
+        json={"reps": 15},
+        headers=user_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["workout_plan_id"] == clone_id
+    
+    db.expire_all()
+    clone_reps = sorted(
+        pe.reps for pe in db.query(PlanExercise).filter(PlanExercise.workout_plan_id == clone_id)
+    )
+    source_reps = sorted(
+        pe.reps for pe in db.query(PlanExercise).filter(PlanExercise.workout_plan_id == source.id)
+    )
+    assert clone_reps == [11, 15]
+    assert source_reps == [10, 11]
+    assert db.query(WorkoutPlan).filter(WorkoutPlan.id == clone_id).first().template_plan_id is None
+
+def test_editing_source_detaches_copy_on_write_clones(client, user_headers, db, test_user, test_exercise):
+    """Test that editing or deleting the source keeps the clone's exercise list intact"""
+    source = create_plan_with_exercises(db, test_user["id"], test_exercise.id)
+    
+    response = client.post(
+        f"/api/plans/{source.id}/clone",
+        params={"copy_on_write": True},
+        headers=user_headers
+    )
+    clone_id = response.json()["id"]
+    
+    response = client.delete(f"/api/plans/{source.id}", headers=user_headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    
+    response = client.get(f"/api/plans/{clone_id}", headers=user_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["template_plan_id"] is None
+    assert sorted(ex["reps"] for ex in response.json()["exercises"]) == [10, 11]
+
+def test_activate_creates_progress_records_once(client, user_headers, db, test_user, test_exercise):
+    """Test that activation creates one progress row per exercise and is safe to repeat"""
+    from app.models.models import UserProgramProgress
+    
+    # Same exercise on two days used to violate _user_plan_exercise_uc
+    plan = WorkoutPlan(name="Plan with Repeated Exercise", is_public=True, owner_id=test_user["id"])
+    db.add(plan)
+    db.commit()
+    db.refresh(plan)
+    db.add_all([
+        PlanExercise(workout_plan_id=plan.id, exercise_id=test_exercise.id, sets=3, reps=8, order=0, day_of_week=1),
+        PlanExercise(workout_plan_id=plan.id, exercise_id=test_exercise.id, sets=3, reps=12, order=1, day_of_week=3),
+    ])
+    db.commit()
+    
+    for _ in range(2):
+        response = client.post(f"/api/plans/{plan.id}/activate", headers=user_headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["exercises"]) == 2
+    
+    progress = db.query(UserProgramProgress).filter(
+        UserProgramProgress.user_id == test_user["id"],
+        UserProgramProgress.workout_plan_id == plan.id
+    ).all()
+    assert len(progress) == 1
+    assert progress[0].exercise_id == test_exercise.id
+    assert progress[0].current_reps == 8
+
+# Import tests
+def test_import_single_plan(client, user_headers, db, test_user, test_exercise):
+    """Test importing one exported plan, resolving exercises by id or by name"""
+    import json
+    plan_data = {
+        "name": "Imported Plan",
+        "days_per_week": 3,
+        "exercises": [
+            {"exercise_id": test_exercise.id, "sets": 4, "reps": 6, "order": 0},
+            {"exercise_id": 99999, "exercise_name": test_exercise.name, "reps": 8, "order": 1},
+            {"exercise_id": 99998, "exercise_name": "Unknown Exercise", "order": 2}
+        ]
+    }
+    
+    response = client.post(
+        "/api/plans/import",
+        files={"file": ("plan.json", json.dumps(plan_data, indent=2), "application/json")},
+        headers=user_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["name"] == "Imported Plan"
+    assert data["owner_id"] == test_user["id"]
+    assert sorted(ex["reps"] for ex in data["exercises"]) == [6, 8]
+    assert all(ex["exercise_id"] == test_exercise.id for ex in data["exercises"])
+
+def test_import_ndjson_bundle(client, user_headers, db, test_user, test_exercise, monkeypatch):
+    """Test importing several plans from NDJSON read in small chunks"""
+    import json
+    from app.services import plan_bundles
+    monkeypatch.setattr(plan_bundles, "READ_CHUNK_SIZE", 16)
+    monkeypatch.setattr(plan_bundles, "IMPORT_BATCH_SIZE", 2)
+    
+    lines = [
+        json.dumps({
+            "name": f"Bundle Plan {i}",
+            "exercises": [{"exercise_id": test_exercise.id, "reps": 5 + i}]
+        })
+        for i in range(5)
+    ]
+    
+    response = client.post(
+        "/api/plans/import",
+        files={"file": ("plans.ndjson", "\n".join(lines) + "\n", "application/x-ndjson")},
+        headers=user_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["imported_count"] == 5
+    assert [plan["name"] for plan in data["plans"]] == [f"Bundle Plan {i}" for i in range(5)]
+    assert all(plan["exercises_count"] == 1 for plan in data["plans"])
+    
+    reps = [
+        db.query(PlanExercise).filter(PlanExercise.workout_plan_id == plan["id"]).one().reps
+        for plan in data["plans"]
+    ]
+    assert reps == [5, 6, 7, 8, 9]
+
+def test_import_bundle_is_all_or_nothing(client, user_headers, db, test_user, test_exercise):
+    """Test that an invalid plan in a JSON array bundle rejects the whole import"""
+    import json
+    bundle = [
+        {"name": "Valid Plan", "exercises": [{"exercise_id": test_exercise.id}]},
+        {"name": "Plan Without Exercises"}
+    ]
+    
+    response = client.post(
+        "/api/plans/import",
+        files={"file": ("plans.json", json.dumps(bundle), "application/json")},
+        headers=user_headers
+    )
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "plan #2" in response.json()["detail"]
+    assert db.query(WorkoutPlan).filter(WorkoutPlan.name == "Valid Plan").count() == 0
+    
+    # Truncated files are rejected too
+    response = client.post(
+        "/api/plans/import",
+        files={"file": ("plans.json", json.dumps(bundle)[:-10], "application/json")},
+        headers=user_headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+# Export tests
+def test_export_bundle_ndjson_round_trip(client, user_headers, db, test_user, test_admin, test_exercise):
+    """Test streaming the user's plans as NDJSON and importing them back"""
+    import json
+    create_plan_with_exercises(db, test_user["id"], test_exercise.id, count=2)
+    create_plan_with_exercises(db, test_user["id"], test_exercise.id, count=1)
+    db.add(WorkoutPlan(name="Empty Plan", owner_id=test_user["id"]))
+    db.add(WorkoutPlan(name="Someone Else's Plan", is_public=True, owner_id=test_admin["id"]))
+    db.commit()
+    
+    response = client.get("/api/plans/export", headers=user_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    documents = [json.loads(line) for line in response.text.splitlines()]
+    assert [doc["name"] for doc in documents] == ["Source Plan", "Source Plan", "Empty Plan"]
+    assert [len(doc["exercises"]) for doc in documents] == [2, 1, 0]
+    assert documents[0]["exercises"][0]["exercise_name"] == test_exercise.name
+    
+    response = client.post(
+        "/api/plans/import",
+        files={"file": ("plans.ndjson", response.content, "application/x-ndjson")},
+        headers=user_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert [plan["exercises_count"] for plan in response.json()["plans"]] == [2, 1, 0]
+
+def test_export_bundle_zip_of_public_plans(client, user_headers, admin_headers, db, test_user, test_exercise):
+    """Test that only admins can export every public plan, as a zip of JSON files"""
+    import io
+    import json
+    import zipfile
+    public_plan = create_plan_with_exercises(db, test_user["id"], test_exercise.id)
+    db.add(WorkoutPlan(name="Private Plan", is_public=False, owner_id=test_user["id"]))
+    db.commit()
+    
+    response = client.get("/api/plans/export", params={"scope": "public"}, headers=user_headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    
+    response = client.get(
+        "/api/plans/export",
+        params={"scope": "public", "format": "zip"},
+        headers=admin_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == [f"workout_plan_{public_plan.id}_source_plan.json"]
+    document = json.loads(archive.read(archive.namelist()[0]))
+    assert len(document["exercises"]) == 2
+
+def test_activate_runs_constant_number_of_queries(client, user_headers, db, test_user, test_exercise, max_queries):
+    """Test that activating a plan runs the same number of statements however many exercises it has"""
+    small = create_plan_with_exercises(db, test_user["id"], test_exercise.id, count=2)
+    large = create_plan_with_exercises(db, test_user["id"], test_exercise.id, count=20)
+    
+    with max_queries(6) as recorded:
+        for plan, count in ((small, 2), (large, 20)):
+            response = client.post(f"/api/plans/{plan.id}/activate", headers=user_headers)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.json()["exercises"]) == count
+    assert recorded[0][2].count == recorded[1][2].count
@@ -0,0 +1,90 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi import status
+from app.models.models import Exercise
+
+def create_exercise(db, name, created_by):
+    """Helper function to create a custom exercise directly in the database"""
+    exercise = Exercise(name=name, category="strength", created_by=created_by)
+    db.add(exercise)
+    db.commit()
+    db.refresh(exercise)
+    return exercise
+
+def log_session(client, headers, start_time, exercises, status_value="completed"):
+    """Helper function to log a session with {exercise_id: [(reps, weight), ...]}"""
+    response = client.post(
+        "/api/sessions",
+        json={
+            "start_time": start_time.isoformat(),
+            "status": status_value,
+            "exercises": [
+                {
+                    "exercise_id": exercise_id,
+                    "sets_completed": len(sets),
+                    "order": order,
+                    "sets": [
+                        {"reps": reps, "weight": weight, "set_number": number}
+                        for number, (reps, weight) in enumerate(sets, start=1)
+                    ]
+                }
+                for order, (exercise_id, sets) in enumerate(exercises.items())
+            ]
+        },
+        headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+def test_last_performance_returns_recent_completed_sets(client, user_headers, db, test_user):
+    """Test that the most recent completed performances come back newest first, per exercise"""
+    squat = create_exercise(db, "Squat", test_user["id"])
+    bench = create_exercise(db, "Bench", test_user["id"])
+    never_done = create_exercise(db, "Never Done", test_user["id"])
+    now = datetime.now(timezone.utc)
+
+    oldest = log_session(client, user_headers, now - timedelta(days=7), {squat.id: [(5, 100.0)], bench.id: [(8, 60.0)]})
+    latest = log_session(client, user_headers, now - timedelta(days=2), {squat.id: [(5, 105.0), (5, 105.0)]})
+    # In-progress sessions are not "last time" yet
+    log_session(client, user_headers, now - timedelta(days=1), {squat.id: [(5, 110.0)]}, status_value="in_progress")
+
+    response = client.get(
+        "/api/sessions/last-performance",
+        params={"exercise_ids": [squat.id, bench.id, never_done.id], "limit": 2},
+        headers=user_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = {entry["exercise_id"]: entry["performances"] for entry in response.json()}
+
+    assert [p["session_id"] for p in result[squat.id]] == [latest["id"], oldest["id"]]
+    assert [(s["reps"], s["weight"]) for s in result[squat.id][0]["sets"]] == [(5, 105.0), (5, 105.0)]
+    assert [p["session_id"] for p in result[bench.id]] == [oldest["id"]]
+    assert result[never_done.id] == []
+
+    response = client.get(
+        "/api/sessions/last-performance", params={"exercise_ids": [squat.id]}, headers=user_headers
+    )
+    assert [p["session_id"] for p in response.json()[0]["performances"]] == [latest["id"]]
+
+def test_session_creation_includes_last_performance(client, user_headers, admin_headers, db, test_user):
+    """Test that starting a session shows what the user did last time for each exercise"""
+    squat = create_exercise(db, "Squat", test_user["id"])
+    now = datetime.now(timezone.utc)
+    previous = log_session(client, user_headers, now - timedelta(days=3), {squat.id: [(5, 100.0)]})
+
+    response = client.post(
+        "/api/sessions",
+        json={"exercises": [{"exercise_id": squat.id, "sets_completed": 0, "order": 0}]},
+        headers=user_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    last_performance = response.json()["exercises"][0]["last_performance"]
+    assert len(last_performance) == 1
+    assert last_performance[0]["session_id"] == previous["id"]
+    assert last_performance[0]["sets"][0]["weight"] == 100.0
+
+    # Other users' history is never included
+    response = client.get(
+        "/api/sessions/last-performance", params={"exercise_ids": [squat.id]}, headers=admin_headers
+    )
+    assert response.json() == [{"exercise_id": squat.id, "performances": []}]
@@ -1,6 +1,7 @@
 import React, { createContext, useState, useEffect, useContext } from 'react';
 import axios from 'axios';
 import jwt_decode from 'jwt-decode';
+import { onAccessTokenRefreshed, refreshAccessToken, userApi } from '../utils/api';
 
 // Create context
 const AuthContext = createContext();
@@ -29,6 +30,9 @@ export const AuthProvider = ({ children }) => {
     }
   }, [token]);
 
+  // Follow the refreshes done by the api client, so the state and axios defaults never hold a stale token
+  useEffect(() => onAccessTokenRefreshed(setToken), []);
+
   // Check if token is valid and get user info
   useEffect(() => {
     const initAuth = async () => {
@@ -39,11 +43,16 @@ export const AuthProvider = ({ children }) => {
           const currentTime = Date.now() / 1000;
           
           if (decodedToken.exp < currentTime) {
-            // Token is expired
-            logout();
+            // Token is expired, renew it; the new token re-runs this effect
+            try {
+              await refreshAccessToken();
+              return;
+            } catch (refreshError) {
+              logout();
+            }
           } else {
-            // Token is valid, get user info
-            const response = await axios.get('/api/users/me');
+            // Token is valid, get user info (through the api client, which renews it if it expires)
+            const response = await userApi.getCurrentUser();
             setCurrentUser(response.data);
           }
         } catch (error) {
@@ -84,14 +93,15 @@ export const AuthProvider = ({ children }) => {
       formData.append('password', password);
       
       const response = await axios.post('/api/auth/login', formData);
-      const { access_token } = response.data;
+      const { access_token, refresh_token } = response.data;
       
-      // Save token to local storage and state
+      // Save tokens to local storage and state
       localStorage.setItem('token', access_token);
+      localStorage.setItem('refresh_token', refresh_token);
       setToken(access_token);
       
       // Get user info
-      const userResponse = await axios.get('/api/users/me');
+      const userResponse = await userApi.getCurrentUser();
       setCurrentUser(userResponse.data);
       
       return userResponse.data;
@@ -103,7 +113,13 @@ export const AuthProvider = ({ children }) => {
 
   // Logout a user
   const logout = () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      // Revoke it server-side; signing out locally does not wait for this
+      axios.post('/api/auth/logout', { refresh_token: refreshToken }).catch(() => {});
+    }
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     setToken(null);
     setCurrentUser(null);
     setError(null);
@@ -113,7 +129,7 @@ export const AuthProvider = ({ children }) => {
   const updateProfile = async (userData) => {
     try {
       setError(null);
-      const response = await axios.patch('/api/users/me', userData);
+      const response = await userApi.updateProfile(userData);
       setCurrentUser(response.data);
       return response.data;
     } catch (error) {
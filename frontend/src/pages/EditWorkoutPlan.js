@@ -288,80 +288,48 @@ const EditWorkoutPlan = () => {
       // Update the plan basic details
       const planData = {
         name: planName,
-        description: planDescription,
-        // Keep the is_active status the same
-        is_active: originalPlan.is_active
+        description: planDescription
       };
       
-      console.log('DEBUG - Updating plan with data:', planData);
-      await workoutPlansApi.update(id, planData);
-      
       // Get the original exercises to determine what's changed
       const originalExercises = originalPlan.exercises || [];
       
       // Identify exercises to add (new ones)
       const exercisesToAdd = exercises.filter(ex => !ex.plan_exercise_id);
-      console.log('DEBUG - Exercises to add:', exercisesToAdd);
       
       // Identify exercises to update (existing ones with changes)
       const exercisesToUpdate = exercises.filter(ex => ex.plan_exercise_id);
-      console.log('DEBUG - Exercises to update:', exercisesToUpdate);
       
       // Identify exercises to remove (ones in original plan but not in current exercises)
       const exercisesToRemove = originalExercises.filter(
         origEx => !exercises.some(ex => ex.plan_exercise_id === origEx.id)
       );
-      console.log('DEBUG - Exercises to remove:', exercisesToRemove);
-      
-      // Process all changes in sequence
-      
-      // 1. Remove exercises that were deleted
-      for (const exToRemove of exercisesToRemove) {
-        await workoutPlansApi.removeExercise(id, exToRemove.id);
-      }
       
-      // 2. Add new exercises
-      for (const exToAdd of exercisesToAdd) {
-        // Log weight information for debugging
-        console.log(`Adding exercise: ${exToAdd.name}`);
-        
-        const exerciseData = {
+      // Send every change in a single request so the save is all-or-nothing
+      const changes = {
+        version: originalPlan.version,
+        plan: planData,
+        remove: exercisesToRemove.map(ex => ex.id),
+        add: exercisesToAdd.map(exToAdd => ({
           exercise_id: exToAdd.id,
           sets: exToAdd.sets,
           reps: exToAdd.reps,
           rest_seconds: exToAdd.rest_seconds,
           order: exToAdd.order,
           day_of_week: exToAdd.day_of_week
-        };
-        
-        console.log('DEBUG - Adding exercise with data (no target weight):', {
-          original: exToAdd,
-          formatted: exerciseData,
-        });
-        
-        await workoutPlansApi.addExercise(id, exerciseData);
-      }
-      
-      // 3. Update existing exercises
-      for (const exToUpdate of exercisesToUpdate) {
-        // Log weight information for debugging
-        console.log(`Updating exercise: ${exToUpdate.name || exToUpdate.id}`);
-        
-        const exerciseData = {
+        })),
+        update: exercisesToUpdate.map(exToUpdate => ({
+          id: exToUpdate.plan_exercise_id,
           sets: exToUpdate.sets,
           reps: exToUpdate.reps,
           rest_seconds: exToUpdate.rest_seconds,
           order: exToUpdate.order,
           day_of_week: exToUpdate.day_of_week
-        };
-        
-        console.log('DEBUG - Updating exercise with data (no target weight):', {
-          original: exToUpdate,
-          formatted: exerciseData,
-        });
-        
-        await workoutPlansApi.updateExercise(id, exToUpdate.plan_exercise_id, exerciseData);
-      }
+        }))
+      };
+      
+      console.log('DEBUG - Saving plan changes:', changes);
+      await workoutPlansApi.applyChanges(id, changes);
       
       setSnackbar({
         open: true,
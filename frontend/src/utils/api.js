@@ -25,17 +25,63 @@ api.interceptors.request.use(
   }
 );
 
+// Refresh in flight, shared so concurrent 401s trigger a single refresh
+let refreshPromise = null;
+
+// Called with the new access token after every refresh, so holders of the old one can update
+const accessTokenListeners = new Set();
+
+// Subscribe to access token refreshes; returns a function that unsubscribes
+export const onAccessTokenRefreshed = (listener) => {
+  accessTokenListeners.add(listener);
+  return () => accessTokenListeners.delete(listener);
+};
+
+// Exchange the stored refresh token for a new access token (and a new refresh token).
+// Resolves to the new access token; rejects if there is no refresh token or it was refused.
+export const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshPromise = (refreshToken
+      ? api.post('/api/auth/refresh', { refresh_token: refreshToken })
+      : Promise.reject(new Error('No refresh token'))
+    ).then(response => {
+      const { access_token, refresh_token } = response.data;
+      localStorage.setItem('token', access_token);
+      localStorage.setItem('refresh_token', refresh_token);
+      accessTokenListeners.forEach(listener => listener(access_token));
+      return access_token;
+    }).finally(() => {
+      refreshPromise = null;
+    });
+  }
+  return refreshPromise;
+};
+
 // Add response interceptor to handle errors
 api.interceptors.response.use(
   (response) => {
     return response;
   },
-  (error) => {
+  async (error) => {
     // Handle unauthorized errors (401)
     if (error.response && error.response.status === 401) {
-      // Clear token and redirect to login if not already on login page
+      const config = error.config || {};
+      // Access tokens are short-lived: renew once and retry before giving up
+      if (!config._retried && !(config.url || '').startsWith('/api/auth/')) {
+        config._retried = true;
+        try {
+          const accessToken = await refreshAccessToken();
+          config.headers['Authorization'] = `Bearer ${accessToken}`;
+          return api(config);
+        } catch (refreshError) {
+          // Fall through to the login redirect
+        }
+      }
+      // Clear tokens and redirect to login if not already on login page
       if (window.location.pathname !== '/login') {
         localStorage.removeItem('token');
+        localStorage.removeItem('refresh_token');
         window.location.href = '/login';
       }
     }
@@ -73,6 +119,8 @@ export const workoutPlansApi = {
   },
   deleteExercise: (planId, exerciseId) => 
     api.delete(`/api/plans/${planId}/exercises/${exerciseId}`),
+  // Save metadata and exercise adds/updates/removes in one all-or-nothing request
+  applyChanges: (id, changes) => api.patch(`/api/plans/${id}`, changes),
   export: (id) => api.get(`/api/plans/${id}/export`, { responseType: 'blob' }),
   import: (formData, weightUnit = "kg") => {
     // Add weight unit to form data if provided
@@ -94,6 +142,12 @@ export const workoutPlansApi = {
 export const sessionsApi = {
   getAll: (params) => api.get('/api/sessions', { params }),
   getById: (id) => api.get(`/api/sessions/${id}`),
+  getLastPerformance: (exerciseIds, limit = 1) => {
+    // Repeat exercise_ids for each id, as FastAPI expects for list parameters
+    const params = new URLSearchParams({ limit });
+    exerciseIds.forEach((id) => params.append('exercise_ids', id));
+    return api.get('/api/sessions/last-performance', { params });
+  },
   create: (sessionData) => api.post('/api/sessions', sessionData),
   update: (id, sessionData) => api.patch(`/api/sessions/${id}`, sessionData),
   delete: (id) => api.delete(`/api/sessions/${id}`),
@@ -119,7 +173,10 @@ export const sessionsApi = {
 // Exercises API
 export const exercisesApi = {
   getAll: () => api.get('/api/exercises'),
+  getFacets: (filters = {}) => api.get('/api/exercises/facets', { params: filters }),
+  autocomplete: (q, limit = 10) => api.get('/api/exercises/autocomplete', { params: { q, limit } }),
   getById: (id) => api.get(`/api/exercises/${id}`),
+  getSubstitutes: (id, limit = 5) => api.get(`/api/exercises/${id}/substitutes`, { params: { limit } }),
   create: (exerciseData) => api.post('/api/exercises', exerciseData),
   update: (id, exerciseData) => api.put(`/api/exercises/${id}`, exerciseData),
   delete: (id) => api.delete(`/api/exercises/${id}`),
@@ -134,6 +191,8 @@ export const exercisesApi = {
 // Progress API
 export const progressApi = {
   getExerciseProgress: (exerciseId) => api.get(`/api/progress/exercises/${exerciseId}`),
+  getExerciseHistory: (exerciseId, cursor = null, limit = 20) =>
+    api.get(`/api/progress/exercises/${exerciseId}/history`, { params: { limit, ...(cursor ? { cursor } : {}) } }),
   getWorkoutFrequency: (period) => api.get('/api/progress/frequency', { params: { period } }),
   getVolumeProgress: (exerciseId) => api.get(`/api/progress/volume/${exerciseId}`),
   getPersonalRecords: () => api.get('/api/progress/records'),
@@ -21,20 +21,28 @@ function render(ui, { route = '/', ...renderOptions } = {}) {
   return rtlRender(ui, { wrapper: Wrapper, ...renderOptions });
 }
 
-// Mock axios for API calls
-jest.mock('axios', () => ({
-  defaults: {
-    baseURL: 'http://localhost:8000',
-    headers: {
-      common: {}
-    }
-  },
-  get: jest.fn(() => Promise.resolve({ data: {} })),
-  post: jest.fn(() => Promise.resolve({ data: {} })),
-  put: jest.fn(() => Promise.resolve({ data: {} })),
-  patch: jest.fn(() => Promise.resolve({ data: {} })),
-  delete: jest.fn(() => Promise.resolve({ data: {} })),
-}));
+// Mock axios for API calls; instances from axios.create() share the same mocks
+jest.mock('axios', () => {
+  const mockAxios = {
+    defaults: {
+      baseURL: 'http://localhost:8000',
+      headers: {
+        common: {}
+      }
+    },
+    interceptors: {
+      request: { use: jest.fn() },
+      response: { use: jest.fn() },
+    },
+    get: jest.fn(() => Promise.resolve({ data: {} })),
+    post: jest.fn(() => Promise.resolve({ data: {} })),
+    put: jest.fn(() => Promise.resolve({ data: {} })),
+    patch: jest.fn(() => Promise.resolve({ data: {} })),
+    delete: jest.fn(() => Promise.resolve({ data: {} })),
+  };
+  mockAxios.create = jest.fn(() => mockAxios);
+  return mockAxios;
+});
 
 // Mock localStorage
 const localStorageMock = (() => {